@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import List, Literal
 import os
 from dotenv import load_dotenv
 
@@ -19,6 +19,11 @@ class Settings(BaseSettings):
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WORKERS: int = 1  # Worker processes started by "python -m app.serve"
+    DB_MIGRATE_ON_STARTUP: bool = True  # Set up the schema when a process starts; app.serve migrates once and turns it off
+    WARM_UP_ROUTES: int = 0  # Most-read saved routes each worker loads before serving; 0 disables
+    WARM_UP_ROUTE_PAIRS: int = 0  # Most-used cached routes refreshed and loaded before serving; 0 disables
+    ACCESS_STATS_FLUSH_INTERVAL: float = 30.0  # Seconds between writes of the read counts warm-up picks from
     
     # CORS Configuration
     CORS_ORIGINS: List[str] = ["http://localhost:3000"]
@@ -26,10 +31,97 @@ class Settings(BaseSettings):
 
     # Database settings
     DATABASE_URL: str = "sqlite:///./app/routes.db"
+    ROUTE_STORAGE_FORMAT: Literal["json", "polyline6", "chunked"] = "json"  # How saved route geometry is stored
+    ROUTE_CHUNK_POINTS: int = 128  # Average points per deduplicated geometry chunk ("chunked" storage)
+    ROUTE_CHUNK_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # Decoded geometry chunks kept in memory
+    ROUTE_LOD_ZOOMS: List[int] = [5, 8, 11, 14]  # Map zoom levels simplified geometry is stored for; [] disables
+    ROUTE_LOD_PIXEL_TOLERANCE: float = 1.0  # Screen pixels a stored level may deviate from the full geometry
+    ROUTE_GEOMETRY_MAX_AGE: int = 3600  # Cache-Control max-age in seconds for GET /routes/{id}/geometry
+    DB_POOL_SIZE: int = 5  # Connections kept open in the async engine pool
+    DB_MAX_OVERFLOW: int = 10  # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free pooled connection
+    DB_POOL_RECYCLE: int = 3600  # Seconds before a pooled connection is replaced
+    SQLITE_WAL: bool = True  # Use write-ahead logging so reads don't wait on writes
+    SQLITE_BUSY_TIMEOUT: float = 5.0  # Seconds SQLite waits on a locked database
+    ROUTE_IMPORT_BATCH_SIZE: int = 1000  # Routes inserted per transaction by bulk import
+    ROUTE_EXPORT_BATCH_SIZE: int = 500  # Rows fetched per round trip by streaming export
     
+    # Routing backend settings
+    ROUTING_BACKEND: Literal["osrm", "local"] = "osrm"  # Where routes come from
+    LOCAL_GRAPH_PATH: str | None = None  # Built graph directory, or an .osm file to build at startup
+    LOCAL_GRAPH_SNAP_DISTANCE: float = 1000.0  # Meters a waypoint may be from the nearest road
+
     # OSRM settings
     OSRM_SERVER_URL: str = "http://router.project-osrm.org"
+    OSRM_SERVER_URLS: List[str] = []  # Several servers as "[profile=]url", e.g. ["driving=http://osrm-1:5000"]; overrides OSRM_SERVER_URL
     OSRM_PROFILE: str = "driving"
+    OSRM_BALANCER: Literal["least_outstanding", "ewma"] = "least_outstanding"  # How a server is chosen per call
+    OSRM_HEALTH_CHECK_INTERVAL: float = 10.0  # Seconds between server probes when there are several; 0 disables
+    OSRM_HEALTH_CHECK_TIMEOUT: float = 2.0  # Seconds a probe may take
+    OSRM_UNHEALTHY_THRESHOLD: int = 2  # Failed probes in a row that take a server out of rotation
+    OSRM_TIMEOUT: float = 10.0  # Seconds per OSRM request
+    OSRM_MAX_CONNECTIONS: int = 100  # Upper bound on pooled connections
+    OSRM_MAX_KEEPALIVE_CONNECTIONS: int = 20  # Idle connections kept open
+    OSRM_KEEPALIVE_EXPIRY: float = 30.0  # Seconds before an idle connection is closed
+    OSRM_HTTP2: bool = False  # Requires the optional "h2" package
+    OSRM_TABLE_MAX_COORDINATES: int = 100  # OSRM --max-table-size; the public demo server allows 100
+    OSRM_TABLE_CONCURRENCY: int = 8  # Matrix tiles requested at the same time
+    MATRIX_MAX_ELEMENTS: int = 250000  # Largest origins x destinations matrix accepted
+
+    # OSRM resilience settings
+    OSRM_RETRY_ATTEMPTS: int = 2  # Retries after a failed OSRM call (connection errors, 5xx, 429)
+    OSRM_RETRY_BACKOFF: float = 0.1  # Base seconds of the jittered exponential backoff
+    OSRM_RETRY_BACKOFF_MAX: float = 2.0  # Upper bound on a single backoff
+    OSRM_RETRY_BUDGET_RATIO: float = 0.1  # Retries and hedges allowed per request, on average
+    OSRM_RETRY_BUDGET_MIN_PER_SECOND: float = 1.0  # Retries always allowed per second at low traffic
+    OSRM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open an OSRM server's circuit
+    OSRM_BREAKER_RESET_TIMEOUT: float = 30.0  # Seconds an open circuit fails fast before a trial call
+    OSRM_HEDGE_URL: str | None = None  # Second OSRM server raced against slow calls, e.g. "http://osrm-b:5000"
+    OSRM_HEDGE_QUANTILE: float = 0.95  # Hedge once a call is slower than this latency quantile
+    OSRM_HEDGE_DELAY: float = 0.5  # Hedge delay in seconds until enough latencies are observed
+
+    # Route cache settings
+    ROUTE_CACHE_ENABLED: bool = True
+    ROUTE_CACHE_TTL: float = 3600.0  # Seconds an in-memory entry stays fresh
+    ROUTE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Size bound of the in-memory tier
+    ROUTE_CACHE_PRECISION: int = 5  # Decimal places used when keying coordinates (~1 m)
+    ROUTE_CACHE_PERSISTENT_PATH: str | None = None  # SQLite file for the persistent tier, e.g. "./app/route_cache.db"
+    ROUTE_CACHE_PERSISTENT_TTL: float = 7 * 24 * 3600.0  # Seconds a persisted entry stays fresh
+    ROUTE_CACHE_STALE_TTL: float = 24 * 3600.0  # Seconds past expiry an entry may be served while OSRM is down
+    ROUTE_COALESCING_ENABLED: bool = True  # Share one OSRM call between identical in-flight requests
+    ROUTE_LEGS_ENABLED: bool = False  # Calculate and cache multi-waypoint routes one leg per waypoint pair, so edits reuse legs
+    ROUTE_LEG_CONCURRENCY: int = 8  # Legs of one route fetched at the same time
+
+    # Route abstraction settings
+    ROUTE_SIMPLIFY_TOLERANCE: float | None = None  # Default tolerance in meters when a request sets none
+
+    # Batch calculation settings
+    BATCH_MAX_SIZE: int = 1000  # Maximum number of routes in one batch request
+    BATCH_MAX_CONCURRENCY: int = 16  # Routes of one batch calculated at the same time
+    BATCH_ITEM_TIMEOUT: float = 15.0  # Seconds allowed per route in a batch
+
+    # Response settings
+    RESPONSE_COMPRESSION_ENABLED: bool = True  # gzip, or brotli if the "brotli" package is installed, when accepted
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024  # Smaller responses are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 5  # 1 (fastest) to 9 (smallest)
+    RESPONSE_BROTLI_QUALITY: int = 4  # 0 (fastest) to 11 (smallest)
+
+    # Metrics and profiling settings
+    METRICS_ENABLED: bool = True  # Serve Prometheus metrics on /metrics
+    PROFILING_ENABLED: bool = False  # Allow "X-Profile: 1" requests to record a sampled profile
+    PROFILE_DIR: str = "./profiles"  # Where sampled profiles are written as folded stacks
+    PROFILE_SAMPLE_INTERVAL: float = 0.001  # Seconds between profiler stack samples
+
+    # Logging settings
+    LOG_LEVEL: str = "INFO"  # Level of the app's loggers: DEBUG, INFO, WARNING or ERROR
+    LOG_FORMAT: Literal["text", "json"] = "text"  # "json" writes one JSON object per line
+    LOG_SAMPLE_RATE: float = 0.01  # Share of high-volume events (per-request lines, route debug) kept
+    LOG_SLOW_REQUEST_SECONDS: float = 1.0  # Requests at least this slow are always logged, as warnings
+    LOG_QUEUE_SIZE: int = 10000  # Records buffered for the writer thread before new ones are dropped
+
+    # Waypoint order optimization settings
+    ROUTE_OPTIMIZE_MAX_WAYPOINTS: int = 100  # Largest request that may use optimize_order
+    ROUTE_OPTIMIZE_TIME_BUDGET: float = 0.2  # Seconds the solver may spend improving an order
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,217 @@
+"""Structured, non-blocking logging for the ``app`` package.
+
+``configure_logging()`` sets the ``app`` logger level from ``LOG_LEVEL`` and hands
+records to a bounded in-memory queue; a listener thread formats and writes them,
+so a slow terminal or log shipper never stalls the event loop. When the queue is
+full, records are dropped and counted instead of waited on.
+
+Call sites pass %-style arguments (``logger.debug("... %s", value)``) so nothing is
+formatted for disabled levels. High-volume events add ``extra=sampled()`` and are
+kept at ``LOG_SAMPLE_RATE``; warnings and errors are never sampled out. Other
+``extra`` fields become structured fields of the record.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+from app.core.config import get_settings
+
+settings = get_settings()
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample_rate"}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with structured fields appended as ``key=value``."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id on the calling thread, before they are queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps records marked with ``sample_rate`` at that rate; WARNING and above always pass."""
+
+    def __init__(self):
+        super().__init__()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if rate is None or record.levelno >= logging.WARNING or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge the arguments into the message and leave the rest to the listener's formatter.
+
+        The base class formats the whole record, traceback included, on the
+        calling thread and then drops ``exc_info``. Here only ``msg % args`` is
+        resolved, since the arguments may change before the listener runs. The
+        traceback stays on the record so the listener can format it, as a
+        separate field in JSON output.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_sampling = SamplingFilter()
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def sampled(rate: Optional[float] = None) -> Dict[str, float]:
+    """``extra`` for a high-volume event, kept at ``rate`` (default ``LOG_SAMPLE_RATE``)."""
+    return {"sample_rate": settings.LOG_SAMPLE_RATE if rate is None else rate}
+
+
+def configure_logging() -> None:
+    """Route ``app.*`` loggers through the queue; safe to call more than once."""
+    global _handler, _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _handler = DroppingQueueHandler(log_queue)
+    _handler.addFilter(_sampling)
+    _handler.addFilter(RequestContextFilter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    app_logger.addHandler(_handler)
+    app_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger("app").removeHandler(_handler)
+        _handler = _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "sampled_out": _sampling.dropped,
+        "queue_full": _handler.dropped if _handler is not None else 0,
+    }
+
+
+class RequestLogMiddleware:
+    """ASGI middleware assigning a request id and logging one structured line per request.
+
+    The id comes from an incoming ``X-Request-ID`` header or is generated, and is
+    echoed in the response. Requests are logged at INFO (sampled); slower than
+    ``LOG_SLOW_REQUEST_SECONDS`` at WARNING and 5xx responses at ERROR.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self.logger = logging.getLogger("app.requests")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope.get("headers", [])).get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            if status >= 500:
+                level, extra = logging.ERROR, {}
+            elif elapsed >= settings.LOG_SLOW_REQUEST_SECONDS:
+                level, extra = logging.WARNING, {}
+            else:
+                level, extra = logging.INFO, sampled()
+            if self.logger.isEnabledFor(level):
+                self.logger.log(level, "%s %s %d", scope["method"], scope["path"], status, extra={
+                    **extra,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                })
+            request_id_var.reset(token)
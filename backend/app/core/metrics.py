@@ -0,0 +1,261 @@
+"""Latency histograms, Prometheus text exposition and an opt-in per-request profiler.
+
+``record_stage(operation, stage)`` times one step of a request into the
+``route_stage_seconds`` histogram. ``MetricsMiddleware`` times whole requests,
+and ``TimedRoute`` splits each endpoint call into request parsing (body read,
+JSON decode and Pydantic validation), the handler itself and response
+serialization. ``render_metrics()`` returns everything in the Prometheus text
+format served on ``/metrics``.
+"""
+from bisect import bisect_left
+from collections import Counter as Tally
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from fastapi.routing import APIRoute
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Starlette appends the charset to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; fine-grained at the low end where most stages fall
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, like a Prometheus client histogram."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, then +Inf count, then sum
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative:g}")
+        return lines
+
+
+# Callables returning (name, type, help, [(labels dict, value), ...]) for values owned elsewhere
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request.", ("method", "route", "status")
+)
+STAGE_SECONDS = Histogram(
+    "route_stage_seconds", "Time spent in one stage of an operation.", ("operation", "stage")
+)
+_collectors: List[Collector] = []
+
+
+def register_collector(collector: Collector) -> None:
+    """Add gauges or counters that are read from another component at scrape time."""
+    _collectors.append(collector)
+
+
+class record_stage:
+    """Time the enclosed block into ``route_stage_seconds{operation, stage}``.
+
+    A plain class rather than ``@contextmanager``, which costs several times more per use.
+    """
+
+    __slots__ = ("operation", "stage", "started")
+
+    def __init__(self, operation: str, stage: str):
+        self.operation = operation
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.operation, self.stage)
+
+
+def render_metrics() -> str:
+    lines = REQUEST_SECONDS.render() + STAGE_SECONDS.render()
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+class _RequestTimings:
+    __slots__ = ("started", "handler_finished")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.handler_finished: Optional[float] = None
+
+
+_current_request: ContextVar[Optional[_RequestTimings]] = ContextVar("current_request", default=None)
+
+
+class TimedRoute(APIRoute):
+    """API route that records request parsing, handler and serialization time per endpoint."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        operation = endpoint.__name__
+        if getattr(endpoint, "_timed", False):
+            # include_router() rebuilds routes from already-wrapped endpoints
+            super().__init__(path, endpoint, **kwargs)
+            self.operation = operation
+            return
+
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args: Any, **kw: Any) -> Any:
+            timings = _current_request.get()
+            started = time.perf_counter()
+            if timings is not None:
+                STAGE_SECONDS.observe(started - timings.started, operation, "request_parse")
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                finished = time.perf_counter()
+                STAGE_SECONDS.observe(finished - started, operation, "handler")
+                if timings is not None:
+                    timings.handler_finished = finished
+
+        timed_endpoint._timed = True
+        super().__init__(path, timed_endpoint, **kwargs)
+        self.operation = operation
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval from a background thread.
+
+    Samples are folded into ``frame;frame;frame count`` lines, the input format of
+    flamegraph.pl and speedscope. Profiling the event-loop thread captures every
+    request running concurrently, not just the one that asked for the profile.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Tally = Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def save_profile(profiler: SamplingProfiler, profile_id: str) -> None:
+    """Stop ``profiler`` and write its folded stacks to ``PROFILE_DIR/<profile_id>.folded``."""
+    profiler.stop()
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILE_DIR, f"{profile_id}.folded"), "w") as f:
+        f.write(profiler.folded())
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and, on request, a sampled profile.
+
+    With ``PROFILING_ENABLED``, a request carrying ``X-Profile: 1`` is profiled and
+    the folded stacks are written to ``PROFILE_DIR/<id>.folded``; the id is returned
+    in the ``X-Profile-Id`` response header.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = _RequestTimings(time.perf_counter())
+        token = _current_request.set(timings)
+        status = 500
+        profiler, profile_id = None, None
+        if settings.PROFILING_ENABLED and (b"x-profile", b"1") in scope.get("headers", []):
+            profile_id = uuid.uuid4().hex
+            profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL).start()
+
+        async def send_with_metrics(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            finished = time.perf_counter()
+            _current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(finished - timings.started, scope["method"], path, str(status))
+            if timings.handler_finished is not None and isinstance(route, TimedRoute):
+                STAGE_SECONDS.observe(finished - timings.handler_finished, route.operation, "response_serialize")
+            if profiler is not None:
+                # Joining the sampler thread and writing the file would block the event loop
+                await asyncio.to_thread(save_profile, profiler, profile_id)
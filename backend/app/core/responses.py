@@ -0,0 +1,60 @@
+"""Fast JSON rendering for geometry-heavy responses.
+
+FastAPI turns a returned model into plain Python objects, one dict per route
+point, and then runs ``json.dumps`` over them. Endpoints that return route
+geometry hand their models to :class:`FastJSONResponse` instead. It renders them
+with orjson and writes each ``Geometry`` straight from its coordinate array.
+"""
+from typing import Any, List
+import re
+import secrets
+import numpy as np
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+from app.models.geometry import Geometry
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def geometry_json(latlon: np.ndarray) -> bytes:
+    """``[{"latitude": ..., "longitude": ...}, ...]`` for an (N, 2) array, without building per-point objects."""
+    if not len(latlon):
+        return b"[]"
+    pairs = orjson.dumps(np.ascontiguousarray(latlon, dtype=np.float64), option=orjson.OPT_SERIALIZE_NUMPY)
+    # pairs is b"[[lat,lon],[lat,lon]]"; numbers never contain brackets or commas
+    body = pairs[2:-2].replace(b"],[", b"\n").replace(b",", b',"longitude":').replace(b"\n", b'},{"latitude":')
+    return b'[{"latitude":' + body + b"}]"
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize models, and lists or dicts of them, to the same JSON as their response models.
+
+    Geometry is rendered separately from the rest of the document. Each
+    ``Geometry`` is first written as a unique placeholder string, which is then
+    replaced by its encoded coordinates.
+    """
+    token = secrets.token_hex(8)
+    fragments: List[bytes] = []
+
+    def default(value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            # Python mode keeps Geometry objects intact (see Geometry's serializer)
+            return value.model_dump()
+        if isinstance(value, Geometry):
+            fragments.append(geometry_json(value.latlon))
+            return f"{token}:{len(fragments) - 1}"
+        raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+    rendered = orjson.dumps(content, default=default, option=_OPTIONS)
+    if not fragments:
+        return rendered
+    placeholder = re.compile(b'"' + token.encode() + rb':(\d+)"')
+    return placeholder.sub(lambda match: fragments[int(match.group(1))], rendered)
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with :func:`dumps`; return it with a model to skip FastAPI's encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,220 @@
+"""Reading, reporting on and migrating to deduplicated ("chunked") route geometry.
+
+With ``ROUTE_STORAGE_FORMAT=chunked``, a saved route stores only the ordered
+hashes of its geometry chunks; the chunks live once each in ``route_chunks``.
+Chunks never change once written, so decoded chunks are kept in an in-process
+LRU cache and routes that share geometry share the cached arrays.
+
+Existing databases can be converted and reported on from the command line:
+
+    python -m app.db.chunks migrate --vacuum
+    python -m app.db.chunks report
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import argparse
+import asyncio
+import json
+import logging
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from app.core.config import get_settings
+from app.models.geometry import Geometry
+from app.services.chunking import decode_chunk
+from .models import RouteChunk, RouteModel
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Chunk hashes looked up per query, well under SQLite's bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+class ChunkCache:
+    """LRU cache of decoded chunks by hash, bounded by array bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._chunks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def get(self, digest: str) -> Optional[np.ndarray]:
+        chunk = self._chunks.get(digest)
+        if chunk is None:
+            self.misses += 1
+            return None
+        self._chunks.move_to_end(digest)
+        self.hits += 1
+        return chunk
+
+    def put(self, digest: str, chunk: np.ndarray) -> None:
+        if digest in self._chunks or chunk.nbytes > self.max_bytes:
+            return
+        chunk.setflags(write=False)
+        self._chunks[digest] = chunk
+        self.size_bytes += chunk.nbytes
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._chunks.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._chunks), "size_bytes": self.size_bytes, "hits": self.hits, "misses": self.misses}
+
+
+chunk_cache = ChunkCache(settings.ROUTE_CHUNK_CACHE_MAX_BYTES)
+
+
+async def load_route_geometry(db: AsyncSession, routes: Iterable[RouteModel]) -> None:
+    """Assemble the geometry of chunked routes so ``RouteModel.route`` can be read.
+
+    The routes must have been loaded with ``undefer_group("geometry")``. Chunks
+    missing from the cache are fetched in a few batched queries for all routes.
+    """
+    pending = [
+        route for route in routes
+        if route.__dict__.get("_loaded_geometry") is None and route.route_chunks is not None
+    ]
+    if not pending:
+        return
+
+    chunks: Dict[str, np.ndarray] = {}
+    missing: List[str] = []
+    for digest in {digest for route in pending for digest in route.route_chunks}:
+        chunk = chunk_cache.get(digest)
+        if chunk is None:
+            missing.append(digest)
+        else:
+            chunks[digest] = chunk
+    for i in range(0, len(missing), _LOOKUP_BATCH):
+        query = select(RouteChunk.hash, RouteChunk.encoding, RouteChunk.data).where(
+            RouteChunk.hash.in_(missing[i:i + _LOOKUP_BATCH])
+        )
+        for digest, encoding, data in await db.execute(query):
+            chunks[digest] = decode_chunk(encoding, data)
+            chunk_cache.put(digest, chunks[digest])
+
+    for route in pending:
+        try:
+            parts = [chunks[digest] for digest in route.route_chunks]
+        except KeyError as e:
+            raise RuntimeError(f"Route {route.id} references missing geometry chunk {e.args[0]}")
+        route._loaded_geometry = Geometry(np.concatenate(parts) if parts else np.empty((0, 2)))
+
+
+async def storage_report(db: AsyncSession) -> Dict[str, Any]:
+    """Space used by saved-route geometry per storage format, and what deduplication saves.
+
+    ``logical_bytes`` is what the chunked routes would take with every chunk stored
+    per route; ``stored_bytes`` is the unique chunks plus the hash lists that
+    reference them. Sizes are of the stored values, not of database pages.
+    """
+    routes = RouteModel.__table__
+    chunks = RouteChunk.__table__
+    formats = (await db.execute(select(
+        func.count().filter(routes.c.route_chunks.isnot(None)),
+        func.count().filter(routes.c.route_chunks.is_(None) & routes.c.route_polyline.isnot(None)),
+        func.count().filter(routes.c.route_chunks.is_(None) & routes.c.route_polyline.is_(None)),
+        func.coalesce(func.sum(func.length(routes.c.route_polyline)), 0),
+        # Chunked rows keep a "[]" placeholder in the route column; leave it out
+        func.coalesce(func.sum(func.length(routes.c.route)).filter(
+            routes.c.route_chunks.is_(None) & routes.c.route_polyline.is_(None)
+        ), 0),
+        func.coalesce(func.sum(func.length(routes.c.route_chunks)), 0),
+    ))).one()
+    unique = (await db.execute(select(
+        func.count(), func.coalesce(func.sum(chunks.c.points), 0), func.coalesce(func.sum(func.length(chunks.c.data)), 0),
+    ))).one()
+    # One row per chunk reference, including repeats within a route
+    referenced = (await db.execute(text(
+        "SELECT COUNT(*), COALESCE(SUM(c.points), 0), COALESCE(SUM(LENGTH(c.data)), 0) "
+        "FROM routes AS r, json_each(r.route_chunks) AS j JOIN route_chunks AS c ON c.hash = j.value"
+    ))).one()
+
+    stored_bytes = unique[2] + formats[5]
+    report = {
+        "routes": {"chunked": formats[0], "polyline6": formats[1], "json": formats[2]},
+        "unchunked_bytes": {"polyline6": formats[3], "json": formats[4]},
+        "chunks": {
+            "unique": unique[0],
+            "references": referenced[0],
+            "unique_points": unique[1],
+            "referenced_points": referenced[1],
+        },
+        "logical_bytes": referenced[2],
+        "stored_bytes": stored_bytes,
+        "saved_bytes": referenced[2] - stored_bytes,
+        "dedup_ratio": round(referenced[2] / stored_bytes, 3) if stored_bytes else None,
+        "chunk_cache": chunk_cache.stats(),
+    }
+    if db.bind.dialect.name == "sqlite":
+        page_size = (await db.execute(text("PRAGMA page_size"))).scalar()
+        page_count = (await db.execute(text("PRAGMA page_count"))).scalar()
+        free_pages = (await db.execute(text("PRAGMA freelist_count"))).scalar()
+        report["database"] = {"file_bytes": page_size * page_count, "free_bytes": page_size * free_pages}
+    return report
+
+
+async def migrate_to_chunks(batch_size: int = 200) -> int:
+    """Rewrite every route not yet chunked into chunked storage; returns how many were converted."""
+    from .database import SessionLocal, engine
+
+    if engine.dialect.name != "sqlite":
+        raise ValueError("Chunked storage needs a SQLite database")
+    settings.ROUTE_STORAGE_FORMAT = "chunked"
+    converted = 0
+    last_id = ""
+    while True:
+        async with SessionLocal() as session:
+            query = (
+                select(RouteModel)
+                .options(undefer_group("geometry"))
+                .where(RouteModel.route_chunks.is_(None), RouteModel.id > last_id)
+                .order_by(RouteModel.id)
+                .limit(batch_size)
+            )
+            batch: Sequence[RouteModel] = (await session.execute(query)).scalars().all()
+            if not batch:
+                return converted
+            for route in batch:
+                route.route = route.route
+            await session.commit()
+            converted += len(batch)
+            last_id = batch[-1].id
+            logger.info("Converted %d routes to chunked geometry", converted)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from .database import SessionLocal, engine
+    from .schema import init_db
+
+    await init_db(engine)
+    if args.command == "migrate":
+        converted = await migrate_to_chunks(args.batch_size)
+        print(f"Converted {converted} routes to chunked geometry")
+        if args.vacuum and engine.dialect.name == "sqlite":
+            async with engine.connect() as conn:
+                await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text("VACUUM"))
+    async with SessionLocal() as session:
+        print(json.dumps(await storage_report(session), indent=2))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["report", "migrate"])
+    parser.add_argument("--batch-size", type=int, default=200, help="Routes converted per transaction")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite file after migrating")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
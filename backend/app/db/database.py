@@ -1,20 +1,58 @@
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import get_settings
 
 settings = get_settings()
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+def async_database_url(url: str) -> str:
+    """Map a plain SQLite URL onto the aiosqlite driver; other URLs are used as given."""
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        return str(parsed.set(drivername="sqlite+aiosqlite"))
+    return url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+_is_file_db = _is_sqlite and _url.database not in (None, "", ":memory:")
+
+if settings.ROUTE_STORAGE_FORMAT == "chunked" and not _is_sqlite:
+    # Chunk storage relies on SQLite's upsert, json_each triggers and single writer
+    raise ValueError("ROUTE_STORAGE_FORMAT=chunked needs a SQLite DATABASE_URL")
+
+engine_options = {}
+if not _is_sqlite or _is_file_db:
+    # aiosqlite defaults to NullPool for file databases, which opens a new
+    # connection (and worker thread) for every session; keep a pool instead.
+    engine_options = {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **engine_options)
+
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if settings.SQLITE_WAL and _is_file_db:
+            # WAL lets readers proceed while a write is in progress
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT * 1000)}")
+        cursor.close()
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
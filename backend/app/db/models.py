@@ -1,12 +1,34 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, JSON, event
-from sqlalchemy.orm import validates
+from typing import Dict, List
+from sqlalchemy import Column, String, Float, DateTime, Integer, JSON, LargeBinary, Text, Index, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, deferred, validates
 import uuid
+import numpy as np
 from .database import Base
+from app.core.config import get_settings
+from app.models.geometry import Geometry
+from app.services import polyline
+from app.services.chunking import chunk_hash, encode_chunk, split_points
+from app.services.pyramid import build_levels
+from app.services.spatial import bounds
 import json
 
+settings = get_settings()
+
+# Polyline precision used for stored geometry; OSRM coordinates carry six decimals
+STORAGE_POLYLINE_PRECISION = 6
+
 class RouteModel(Base):
     __tablename__ = "routes"
+    __table_args__ = (
+        # Keyset pagination and filtering for GET /routes/ (see app/db/queries.py)
+        Index("ix_routes_created_at_id", "created_at", "id"),
+        Index("ix_routes_title_id", "title", "id"),
+        Index("ix_routes_distance_id", "distance", "id"),
+        Index("ix_routes_duration_id", "duration", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
@@ -14,11 +36,75 @@ class RouteModel(Base):
     origin = Column(JSON, nullable=False)  # Origin point coordinates
     destination = Column(JSON, nullable=False)  # Destination point coordinates
     waypoints = Column(JSON, nullable=False, default=list)  # List of intermediate waypoints
-    route = Column(JSON, nullable=False)  # List of coordinates forming the route
+    # Geometry is deferred so listing routes doesn't load it; use undefer_group("geometry") to fetch it
+    _route = deferred(Column("route", JSON, nullable=False, default=list), group="geometry")  # List of coordinates forming the route
+    route_polyline = deferred(Column(Text, nullable=True), group="geometry")  # Same geometry as an encoded polyline (precision 6)
+    route_chunks = deferred(Column(JSON(none_as_null=True), nullable=True), group="geometry")  # Ordered RouteChunk hashes ("chunked" storage)
+    # Simplified geometry per map zoom level, {"<zoom>": polyline6}, for GET /routes/{id}/geometry
+    route_levels = deferred(Column(JSON(none_as_null=True), nullable=True), group="levels")
     distance = Column(Float, nullable=False)
     duration = Column(Float, nullable=False)
+    # Bounding box of the geometry; mirrored into an R*Tree on SQLite (see app/db/schema.py)
+    min_lat = Column(Float, nullable=True)
+    min_lon = Column(Float, nullable=True)
+    max_lat = Column(Float, nullable=True)
+    max_lon = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    @property
+    def route(self) -> Geometry:
+        """Route geometry, whichever format it is stored in.
+
+        Chunked geometry has to be loaded first with ``app.db.chunks.load_route_geometry``.
+        """
+        loaded = self.__dict__.get("_loaded_geometry")
+        if loaded is not None:
+            return loaded
+        if self.route_chunks is not None:
+            raise RuntimeError(f"Geometry chunks of route {self.id} have not been loaded")
+        if self.route_polyline is not None:
+            return Geometry.from_polyline(self.route_polyline, STORAGE_POLYLINE_PRECISION)
+        return Geometry.from_dicts(self._route or [])
+
+    @route.setter
+    def route(self, value):
+        if isinstance(value, str):
+            value = json.loads(value)
+        geometry = value if isinstance(value, Geometry) else Geometry.from_dicts(value)
+        self.min_lat, self.min_lon, self.max_lat, self.max_lon = bounds(geometry.latlon) or (None,) * 4
+        self.route_levels = build_levels(geometry.latlon, settings.ROUTE_LOD_ZOOMS, settings.ROUTE_LOD_PIXEL_TOLERANCE)
+        self._loaded_geometry = None
+        self.route_chunks = None
+        if settings.ROUTE_STORAGE_FORMAT == "chunked":
+            self._store_chunked(geometry)
+            return
+        if settings.ROUTE_STORAGE_FORMAT == "polyline6":
+            # Only switch format when decoding gives back exactly the same coordinates
+            if polyline.is_lossless(geometry.latlon, STORAGE_POLYLINE_PRECISION):
+                self.route_polyline = geometry.to_polyline(STORAGE_POLYLINE_PRECISION)
+                self._route = []
+                return
+        self.route_polyline = None
+        self._route = geometry.to_dicts()
+
+    def _store_chunked(self, geometry: Geometry) -> None:
+        """Reference the geometry as content-addressed chunks; new chunks are written on flush."""
+        hashes: List[str] = []
+        pending: Dict[str, np.ndarray] = {}
+        start = 0
+        for end in split_points(geometry.latlon, settings.ROUTE_CHUNK_POINTS,
+                                settings.ROUTE_CHUNK_POINTS // 4, settings.ROUTE_CHUNK_POINTS * 4):
+            piece = geometry.latlon[start:end]
+            digest = chunk_hash(piece)
+            hashes.append(digest)
+            pending.setdefault(digest, piece)
+            start = end
+        self.route_chunks = hashes
+        self.route_polyline = None
+        self._route = []
+        self._pending_chunks = pending
+        self._loaded_geometry = geometry
+
     @validates('origin', 'destination')
     def validate_point(self, key, value):
         if isinstance(value, str):
@@ -55,4 +141,66 @@ class RouteModel(Base):
             if not isinstance(coords, dict) or 'latitude' not in coords or 'longitude' not in coords:
                 raise ValueError(f"Waypoint at position {i} has invalid coordinates")
         
-        return value 
\ No newline at end of file
+        return value
+
+
+class RouteChunk(Base):
+    """A piece of route geometry stored once and shared by every route that contains it.
+
+    ``hash`` is the content address from ``app.services.chunking.chunk_hash``.
+    ``refs`` counts the routes referencing the chunk; on SQLite it is maintained by
+    triggers (see ``app/db/schema.py``), which also delete chunks no route uses.
+    """
+    __tablename__ = "route_chunks"
+
+    hash = Column(String(32), primary_key=True)
+    encoding = Column(String(16), nullable=False)  # app.services.chunking.POLYLINE6 or FLOAT64
+    points = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    refs = Column(Integer, nullable=False, default=0)
+
+
+class RouteAccess(Base):
+    """How often a saved route has been read, so warm-up can load the most read ones first.
+
+    Reads are counted in memory and added here in batches (see
+    ``app/services/access.py``). Rows are deleted with their route by a trigger.
+    """
+    __tablename__ = "route_access"
+
+    route_id = Column(String(36), primary_key=True)
+    hits = Column(Integer, nullable=False, default=0, index=True)
+    last_accessed_at = Column(DateTime, nullable=False)
+
+
+def store_route_chunks(connection: Connection, chunks: Dict[str, np.ndarray], batch_size: int = 500) -> int:
+    """Insert the chunks that aren't stored yet; returns how many were new.
+
+    Every chunk is written, stored or not: checking first would leave a window
+    in which a concurrent delete drops a chunk the caller's route is about to
+    reference. Run in the route's transaction, the insert keeps the chunk
+    (SQLite lets one writer in at a time) until the route row counts it.
+    """
+    table = RouteChunk.__table__
+    statement = sqlite_insert(table).on_conflict_do_nothing(index_elements=["hash"])
+    hashes = list(chunks)
+    inserted = 0
+    for i in range(0, len(hashes), batch_size):
+        rows = []
+        for digest in hashes[i:i + batch_size]:
+            encoding, data = encode_chunk(chunks[digest])
+            rows.append({"hash": digest, "encoding": encoding, "points": len(chunks[digest]), "data": data, "refs": 0})
+        inserted += connection.execute(statement, rows).rowcount
+    return inserted
+
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_chunks(session: Session, flush_context, instances) -> None:
+    """Write new geometry chunks before the routes that reference them are inserted."""
+    pending: Dict[str, np.ndarray] = {}
+    for obj in [*session.new, *session.dirty]:
+        if isinstance(obj, RouteModel) and obj.__dict__.get("_pending_chunks"):
+            pending.update(obj._pending_chunks)
+            obj._pending_chunks = None
+    if pending:
+        store_route_chunks(session.connection(), pending)
@@ -0,0 +1,150 @@
+from datetime import datetime
+from typing import Any, List, Literal, Optional, Tuple
+import base64
+import json
+from sqlalchemy import Select, and_, column, or_, select, table, tuple_, union
+from .models import RouteModel
+from app.services.spatial import Box
+
+# R*Tree virtual tables created in app/db/schema.py (SQLite only)
+route_bounds_rtree = table(
+    "route_bounds_rtree",
+    column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"), column("route_id"),
+)
+route_endpoints_rtree = table(
+    "route_endpoints_rtree",
+    column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"), column("route_id"), column("kind"),
+)
+
+RouteEndpoint = Literal["origin", "destination"]
+RouteSortField = Literal["created_at", "title", "distance", "duration"]
+SortOrder = Literal["asc", "desc"]
+
+# Every sort column has a (column, id) index, so each page is an index range scan
+SORT_COLUMNS = {
+    "created_at": RouteModel.created_at,
+    "title": RouteModel.title,
+    "distance": RouteModel.distance,
+    "duration": RouteModel.duration,
+}
+
+
+def encode_cursor(sort: RouteSortField, value: Any, route_id: str) -> str:
+    """Opaque cursor pointing just past the route with ``value`` and ``route_id``."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, route_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: RouteSortField) -> Tuple[Any, str]:
+    """Decode a cursor made by :func:`encode_cursor` for the same sort field."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, route_id = json.loads(payload)
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor was issued for sort={cursor_sort}, not sort={sort}")
+    return value, route_id
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_route_query(
+    limit: int,
+    cursor: Optional[str] = None,
+    sort: RouteSortField = "created_at",
+    order: SortOrder = "desc",
+    title_prefix: Optional[str] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Select:
+    """Select one page of saved routes, ordered by ``sort`` then ``id``.
+
+    Paging is keyset-based: ``cursor`` is the value returned for the previous page,
+    so deep pages cost the same as the first one. Filters are range conditions on
+    indexed columns; ``title_prefix`` is case-sensitive. One extra row is selected
+    so :func:`split_page` can tell whether another page follows.
+    """
+    column = SORT_COLUMNS[sort]
+    query = select(RouteModel)
+
+    if title_prefix:
+        query = query.where(RouteModel.title >= title_prefix, RouteModel.title < _prefix_upper_bound(title_prefix))
+    if min_distance is not None:
+        query = query.where(RouteModel.distance >= min_distance)
+    if max_distance is not None:
+        query = query.where(RouteModel.distance <= max_distance)
+    if min_duration is not None:
+        query = query.where(RouteModel.duration >= min_duration)
+    if max_duration is not None:
+        query = query.where(RouteModel.duration <= max_duration)
+    if created_after is not None:
+        query = query.where(RouteModel.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(RouteModel.created_at < created_before)
+
+    if cursor is not None:
+        value, route_id = decode_cursor(cursor, sort)
+        key = tuple_(column, RouteModel.id)
+        query = query.where(key < tuple_(value, route_id) if order == "desc" else key > tuple_(value, route_id))
+
+    if order == "desc":
+        query = query.order_by(column.desc(), RouteModel.id.desc())
+    else:
+        query = query.order_by(column.asc(), RouteModel.id.asc())
+    return query.limit(limit + 1)
+
+
+def split_page(rows: List[RouteModel], sort: RouteSortField, limit: int) -> Tuple[List[RouteModel], Optional[str]]:
+    """Trim the look-ahead row and return the page with the cursor for the next one, if any."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(sort, getattr(last, sort), last.id)
+
+
+def _intersects(columns, box: Box):
+    south, west, north, east = box
+    return and_(columns.min_lat <= north, columns.max_lat >= south, columns.min_lon <= east, columns.max_lon >= west)
+
+
+def _rtree_candidates(rtree, boxes: List[Box], *conditions) -> Select:
+    # One R*Tree lookup per box; an OR of boxes would fall back to a full scan
+    ids = union(*(select(rtree.c.route_id).where(_intersects(rtree.c, box), *conditions) for box in boxes)).subquery()
+    return select(RouteModel).join(ids, ids.c.route_id == RouteModel.id)
+
+
+def bbox_candidates_query(boxes: List[Box], use_rtree: bool) -> Select:
+    """Routes whose bounding box intersects any of ``boxes``, newest first.
+
+    With ``use_rtree`` the R*Tree prunes the candidates; otherwise the bounding-box
+    columns on ``routes`` are compared directly.
+    """
+    if use_rtree:
+        query = _rtree_candidates(route_bounds_rtree, boxes)
+    else:
+        query = select(RouteModel).where(or_(*(_intersects(RouteModel, box) for box in boxes)))
+    return query.order_by(RouteModel.created_at.desc(), RouteModel.id.desc())
+
+
+def endpoint_candidates_query(boxes: List[Box], endpoint: RouteEndpoint, use_rtree: bool) -> Select:
+    """Routes whose ``endpoint`` may lie in one of ``boxes``.
+
+    Without the R*Tree every route is a candidate, since endpoints aren't
+    stored in indexed columns.
+    """
+    if use_rtree:
+        return _rtree_candidates(route_endpoints_rtree, boxes, route_endpoints_rtree.c.kind == endpoint)
+    return select(RouteModel)
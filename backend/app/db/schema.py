@@ -0,0 +1,200 @@
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+import logging
+from .database import Base
+from .models import RouteModel, STORAGE_POLYLINE_PRECISION
+from app.models.geometry import Geometry
+from app.services.spatial import bounds
+
+logger = logging.getLogger(__name__)
+
+# R*Tree indexes over saved routes, kept in sync with the routes table by triggers.
+# Rows are matched back to routes through the route_id auxiliary column rather than
+# rowid, which VACUUM may renumber. R*Trees store 32-bit floats rounded outwards, so
+# they only prune candidates; callers still run an exact test on what they return.
+SPATIAL_TABLES = {
+    "route_bounds_rtree": "CREATE VIRTUAL TABLE route_bounds_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon, +route_id)",
+    "route_endpoints_rtree": "CREATE VIRTUAL TABLE route_endpoints_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon, +route_id, +kind)",
+}
+
+_INSERT_BOUNDS = """
+    INSERT INTO route_bounds_rtree (min_lat, max_lat, min_lon, max_lon, route_id)
+    SELECT {row}.min_lat, {row}.max_lat, {row}.min_lon, {row}.max_lon, {row}.id {where}
+"""
+_INSERT_ENDPOINTS = """
+    INSERT INTO route_endpoints_rtree (min_lat, max_lat, min_lon, max_lon, route_id, kind)
+    SELECT json_extract({row}.{kind}, '$.latitude'), json_extract({row}.{kind}, '$.latitude'),
+           json_extract({row}.{kind}, '$.longitude'), json_extract({row}.{kind}, '$.longitude'), {row}.id, '{kind}' {where}
+"""
+# Look rows up by their old box so deletes are index lookups, not scans
+_DELETE_BOUNDS = """
+    DELETE FROM route_bounds_rtree WHERE id IN (
+        SELECT id FROM route_bounds_rtree
+        WHERE min_lat <= OLD.max_lat AND max_lat >= OLD.min_lat AND min_lon <= OLD.max_lon AND max_lon >= OLD.min_lon
+          AND route_id = OLD.id
+    )
+"""
+_DELETE_ENDPOINTS = """
+    DELETE FROM route_endpoints_rtree WHERE id IN (
+        SELECT id FROM route_endpoints_rtree
+        WHERE min_lat <= json_extract(OLD.{kind}, '$.latitude') AND max_lat >= json_extract(OLD.{kind}, '$.latitude')
+          AND min_lon <= json_extract(OLD.{kind}, '$.longitude') AND max_lon >= json_extract(OLD.{kind}, '$.longitude')
+          AND route_id = OLD.id AND kind = '{kind}'
+    )
+"""
+
+def _index_statements(row: str, source: str = "") -> str:
+    """INSERTs that index ``row``: ``NEW`` inside a trigger, or ``routes`` with ``source="FROM routes"``."""
+    statements = [_INSERT_BOUNDS.format(row=row, where=f"{source} WHERE {row}.min_lat IS NOT NULL")]
+    statements += [_INSERT_ENDPOINTS.format(row=row, kind=kind, where=source) for kind in ("origin", "destination")]
+    return ";".join(statements)
+
+_DELETE_ALL = ";".join([_DELETE_BOUNDS] + [_DELETE_ENDPOINTS.format(kind=kind) for kind in ("origin", "destination")])
+
+SPATIAL_TRIGGERS = {
+    "routes_spatial_insert": f"CREATE TRIGGER routes_spatial_insert AFTER INSERT ON routes BEGIN {_index_statements('NEW')}; END",
+    "routes_spatial_delete": f"CREATE TRIGGER routes_spatial_delete AFTER DELETE ON routes BEGIN {_DELETE_ALL}; END",
+    "routes_spatial_update": (
+        "CREATE TRIGGER routes_spatial_update AFTER UPDATE OF min_lat, min_lon, max_lat, max_lon, origin, destination ON routes "
+        f"BEGIN {_DELETE_ALL}; {_index_statements('NEW')}; END"
+    ),
+}
+
+# Reference counts of shared geometry chunks. A route counts once per distinct
+# chunk it uses; chunks left without references are deleted with their last route.
+_ADD_CHUNK_REFS = "UPDATE route_chunks SET refs = refs + 1 WHERE hash IN (SELECT value FROM json_each(NEW.route_chunks))"
+_DROP_CHUNK_REFS = (
+    "UPDATE route_chunks SET refs = refs - 1 WHERE hash IN (SELECT value FROM json_each(OLD.route_chunks));"
+    "DELETE FROM route_chunks WHERE refs <= 0 AND hash IN (SELECT value FROM json_each(OLD.route_chunks))"
+)
+
+CHUNK_TRIGGERS = {
+    "routes_chunks_insert": (
+        "CREATE TRIGGER routes_chunks_insert AFTER INSERT ON routes WHEN NEW.route_chunks IS NOT NULL "
+        f"BEGIN {_ADD_CHUNK_REFS}; END"
+    ),
+    "routes_chunks_delete": (
+        "CREATE TRIGGER routes_chunks_delete AFTER DELETE ON routes WHEN OLD.route_chunks IS NOT NULL "
+        f"BEGIN {_DROP_CHUNK_REFS}; END"
+    ),
+    # Add before dropping so chunks shared by the old and new geometry survive;
+    # json_each(NULL) yields nothing, so either side may be NULL
+    "routes_chunks_update": (
+        "CREATE TRIGGER routes_chunks_update AFTER UPDATE OF route_chunks ON routes "
+        "WHEN OLD.route_chunks IS NOT NEW.route_chunks "
+        f"BEGIN {_ADD_CHUNK_REFS}; {_DROP_CHUNK_REFS}; END"
+    ),
+}
+
+# Read counts (see RouteAccess) go with their route
+ACCESS_TRIGGERS = {
+    "routes_access_delete": (
+        "CREATE TRIGGER routes_access_delete AFTER DELETE ON routes "
+        "BEGIN DELETE FROM route_access WHERE route_id = OLD.id; END"
+    ),
+}
+
+def upgrade_schema(conn: Connection) -> None:
+    """Add columns and indexes that were introduced after a table was first created.
+
+    ``create_all`` only creates missing tables, so databases created by an older
+    version of the app need new nullable columns and indexes added in place.
+    Columns listed in ``COLUMN_BACKFILLS`` are filled in right after they are
+    added. That happens in the same transaction, so each backfill runs exactly once.
+    """
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            logger.info("Adding column %s.%s", table.name, column.name)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+            added.append((table.name, column.name))
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                logger.info("Creating index %s", index.name)
+                index.create(conn)
+    for key in added:
+        if key in COLUMN_BACKFILLS:
+            COLUMN_BACKFILLS[key](conn)
+
+def backfill_route_bounds(conn: Connection, batch_size: int = 500) -> None:
+    """Fill in bounding boxes for routes saved before they were recorded.
+
+    Runs once, when ``upgrade_schema`` adds the bounds columns. Routes with empty
+    geometry have no bounding box and keep NULL bounds.
+    """
+    table = RouteModel.__table__
+    query = (
+        select(table.c.id, table.c.route, table.c.route_polyline)
+        .where(table.c.min_lat.is_(None))
+        .order_by(table.c.id)
+        .limit(batch_size)
+    )
+    last_id = ""
+    while True:
+        rows = conn.execute(query.where(table.c.id > last_id)).all()
+        if not rows:
+            break
+        updated = 0
+        for route_id, route, route_polyline in rows:
+            if route_polyline is not None:
+                geometry = Geometry.from_polyline(route_polyline, STORAGE_POLYLINE_PRECISION)
+            else:
+                geometry = Geometry.from_dicts(route or [])
+            box = bounds(geometry.latlon)
+            if box is not None:
+                conn.execute(update(table).where(table.c.id == route_id).values(
+                    min_lat=box[0], min_lon=box[1], max_lat=box[2], max_lon=box[3]
+                ))
+                updated += 1
+        logger.info("Backfilled bounding boxes for %d routes", updated)
+        last_id = rows[-1][0]
+
+# One-shot data migrations, keyed by the column whose addition triggers them
+COLUMN_BACKFILLS = {
+    ("routes", "min_lat"): backfill_route_bounds,
+}
+
+def create_spatial_index(conn: Connection) -> None:
+    """Create the SQLite R*Tree indexes over saved routes and the triggers that maintain them."""
+    if conn.dialect.name != "sqlite":
+        return
+    existing = {name for (name,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+    for name, ddl in SPATIAL_TABLES.items():
+        if name not in existing:
+            logger.info("Creating spatial index %s", name)
+            conn.execute(text(ddl))
+    if not set(SPATIAL_TABLES) <= existing:
+        # Index routes that were saved before the R*Tree existed
+        conn.execute(text("DELETE FROM route_bounds_rtree"))
+        conn.execute(text("DELETE FROM route_endpoints_rtree"))
+        for statement in _index_statements("routes", "FROM routes").split(";"):
+            conn.execute(text(statement))
+    for name, ddl in SPATIAL_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(text(ddl))
+
+def create_triggers(conn: Connection) -> None:
+    """Create the SQLite triggers that reference-count shared geometry chunks and drop read counts of deleted routes."""
+    if conn.dialect.name != "sqlite":
+        return
+    existing = {name for (name,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+    for name, ddl in {**CHUNK_TRIGGERS, **ACCESS_TRIGGERS}.items():
+        if name not in existing:
+            conn.execute(text(ddl))
+
+async def init_db(engine: AsyncEngine) -> None:
+    """Create missing tables and bring existing ones up to date."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+        await conn.run_sync(create_spatial_index)
+        await conn.run_sync(create_triggers)
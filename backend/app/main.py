@@ -1,19 +1,57 @@
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app.core.compression import CompressionMiddleware, brotli
 from app.core.config import get_settings
+from app.core.log import RequestLogMiddleware, configure_logging, logging_stats
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, register_collector, render_metrics
+from app.core.responses import FastJSONResponse
 from app.routes.route import router
 from app.db.database import engine
 from app.db import models
+from app.db.schema import init_db
+from app.services.osrm import init_osrm_client, close_osrm_client, get_osrm_pool, get_retry_budget
+from app.services.access import flush_access_stats, run_access_flusher
+from app.services.cache import get_route_cache
+from app.services.singleflight import get_route_flights
+from app.services.routing import get_routing_backend
+from app.services.warmup import warm_up_worker
 
 settings = get_settings()
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables, unless app.serve already did before starting the workers
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await init_db(engine)
+    # One pooled OSRM client is shared by every request for the app's lifetime
+    await init_osrm_client()
+    # Load the routing backend (and any local road graph) before serving requests
+    get_routing_backend()
+    if settings.WARM_UP_ROUTES or settings.WARM_UP_ROUTE_PAIRS:
+        await warm_up_worker(settings.WARM_UP_ROUTES, settings.WARM_UP_ROUTE_PAIRS)
+    flusher = asyncio.create_task(run_access_flusher(settings.ACCESS_STATS_FLUSH_INTERVAL))
+    try:
+        yield
+    finally:
+        flusher.cancel()
+        await flush_access_stats()
+        await close_osrm_client()
+        await engine.dispose()
+        get_route_cache().close()
+        get_route_cache.cache_clear()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="Backend API for Abstract Route Application with support for waypoints",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS
@@ -24,11 +62,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(router, prefix=settings.API_V1_STR)
 
+def service_metrics():
+    """Cache, coalescing and OSRM pool counters for the /metrics scrape."""
+    cache = get_route_cache().stats()
+    flights = get_route_flights().stats()
+    endpoints = get_osrm_pool().endpoints
+    return [
+        ("route_cache_lookups_total", "counter", "Route cache lookups by result.", [
+            ({"result": "hit"}, cache["hits"]),
+            ({"result": "persistent_hit"}, cache["persistent_hits"]),
+            ({"result": "stale_hit"}, cache["stale_hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("route_cache_size_bytes", "gauge", "Bytes held by the in-memory route cache.", [({}, cache["size_bytes"])]),
+        ("route_coalesced_calls_total", "counter", "Route calls that joined an identical in-flight call.", [
+            ({}, flights["collapsed"]),
+        ]),
+        ("osrm_in_flight", "gauge", "OSRM calls in flight per server.", [
+            ({"server": e.base_url}, e.in_flight) for e in endpoints
+        ]),
+        ("osrm_server_healthy", "gauge", "Whether an OSRM server is in rotation.", [
+            ({"server": e.base_url}, float(e.healthy and e.breaker.state != "open")) for e in endpoints
+        ]),
+        ("osrm_retry_budget_tokens", "gauge", "Retries and hedges currently allowed.", [
+            ({}, get_retry_budget().stats()["tokens"]),
+        ]),
+        ("log_records_dropped_total", "counter", "Log records not written, by reason.", [
+            ({"reason": reason}, count) for reason, count in logging_stats().items()
+        ]),
+    ]
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    register_collector(service_metrics)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint."""
+        return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    if brotli is None:
+        logger.info("The 'brotli' package is not installed; responses are compressed with gzip only")
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+    )
+
+# Added last so it is outermost and every other middleware logs under the request id
+app.add_middleware(RequestLogMiddleware)
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,90 @@
+from typing import Any, Dict, Iterable, List, Sequence
+import numpy as np
+from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler, TypeAdapter
+from pydantic_core import core_schema
+from app.services import polyline
+
+
+class Geometry:
+    """Route geometry held as a single (N, 2) float array of (latitude, longitude).
+
+    Used in place of a list of ``Coordinates`` models so long routes are parsed,
+    simplified, cached and stored without building one Pydantic object per point.
+    In API schemas it still validates from, and serializes to, the public
+    ``[{"latitude": ..., "longitude": ...}]`` list.
+    """
+
+    __slots__ = ("latlon",)
+
+    def __init__(self, latlon: Any):
+        self.latlon = np.asarray(latlon, dtype=float).reshape(-1, 2)
+
+    @classmethod
+    def from_osrm(cls, coordinates: Sequence[Sequence[float]]) -> "Geometry":
+        """Build from OSRM GeoJSON coordinates, which are (longitude, latitude) pairs."""
+        return cls(np.asarray(coordinates, dtype=float).reshape(-1, 2)[:, ::-1])
+
+    @classmethod
+    def from_dicts(cls, points: Iterable[Any]) -> "Geometry":
+        """Build from ``{"latitude", "longitude"}`` dicts or objects with those attributes."""
+        try:
+            return cls([
+                (p["latitude"], p["longitude"]) if isinstance(p, dict) else (p.latitude, p.longitude)
+                for p in points
+            ])
+        except (KeyError, AttributeError, TypeError):
+            raise ValueError("Every route point needs a latitude and a longitude")
+
+    @classmethod
+    def from_polyline(cls, encoded: str, precision: int = 5) -> "Geometry":
+        return cls(polyline.decode_array(encoded, precision))
+
+    def to_dicts(self) -> List[Dict[str, float]]:
+        return [{"latitude": lat, "longitude": lon} for lat, lon in self.latlon.tolist()]
+
+    def to_coordinates(self) -> List[Any]:
+        from app.models.route import Coordinates
+        return [Coordinates(latitude=lat, longitude=lon) for lat, lon in self.latlon.tolist()]
+
+    def to_polyline(self, precision: int = 5) -> str:
+        return polyline.encode(self.latlon, precision)
+
+    def __len__(self) -> int:
+        return len(self.latlon)
+
+    def __getitem__(self, index: Any) -> "Geometry":
+        return Geometry(self.latlon[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Geometry):
+            return NotImplemented
+        return bool(np.array_equal(self.latlon, other.latlon))
+
+    def __repr__(self) -> str:
+        return f"Geometry({len(self)} points)"
+
+    @classmethod
+    def _validate(cls, value: Any) -> "Geometry":
+        if isinstance(value, Geometry):
+            return value
+        if isinstance(value, np.ndarray):
+            return cls(value)
+        if isinstance(value, (list, tuple)):
+            return cls.from_dicts(value)
+        raise ValueError("Route geometry must be a list of coordinates")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            # JSON mode only: model_dump() keeps the Geometry so app.core.responses can encode the array directly
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda geometry: geometry.to_dicts(), when_used="json"
+            ),
+        )
+
+    @classmethod
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler: GetJsonSchemaHandler) -> Dict[str, Any]:
+        # Document the public wire format rather than the internal array
+        from app.models.route import Coordinates
+        return handler(TypeAdapter(List[Coordinates]).core_schema)
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from uuid import UUID, uuid4
+from app.models.geometry import Geometry
+
+# Wire formats for route geometry: a list of coordinate objects, or an encoded polyline
+GeometryFormat = Literal["coordinates", "polyline", "polyline6"]
+POLYLINE_PRECISION = {"polyline": 5, "polyline6": 6}
 
 class Coordinates(BaseModel):
     latitude: float
@@ -28,24 +33,91 @@ class Waypoint(BaseModel):
 
 class RouteRequest(BaseModel):
     waypoints: List[Waypoint] = Field(..., description="List of waypoints including origin and destination")
+    simplify_tolerance: Optional[float] = Field(
+        None, gt=0, description="Simplify the route geometry to this tolerance in meters"
+    )
+    max_points: Optional[int] = Field(
+        None, ge=2, description="Maximum number of points in the returned route geometry"
+    )
+    simplify_method: Literal["douglas-peucker", "visvalingam"] = Field(
+        "douglas-peucker", description="Algorithm used when simplifying the route geometry"
+    )
+    optimize_order: bool = Field(False, description="Visit the waypoints in the order with the shortest travel time")
+    fixed_start: bool = Field(True, description="With optimize_order, keep the first waypoint as the start")
+    fixed_end: bool = Field(True, description="With optimize_order, keep the last waypoint as the end")
+
+class WaypointEdit(BaseModel):
+    op: Literal["add", "move", "remove"] = Field(..., description="Insert, replace or delete one waypoint")
+    index: int = Field(..., ge=0, description="Position of the waypoint; for add, where the new waypoint is inserted")
+    waypoint: Optional[Waypoint] = Field(None, description="The new or moved waypoint; required for add and move")
+
+class RouteEditRequest(RouteRequest):
+    edit: WaypointEdit = Field(..., description="Edit applied to the waypoints, which are those before the edit")
+
+class RouteLeg(BaseModel):
+    distance: float = Field(..., description="Leg distance in meters")
+    duration: float = Field(..., description="Leg duration in seconds")
 
 class AbstractedRoute(BaseModel):
-    route: List[Coordinates] = Field(..., description="List of coordinates forming the route")
+    route: Optional[Geometry] = Field(
+        ..., description="List of coordinates forming the route; null when an encoded polyline is returned"
+    )
+    polyline: Optional[str] = Field(None, description="Route geometry as an encoded polyline, when requested")
+    polyline_precision: Optional[int] = Field(None, description="Decimal precision of the encoded polyline")
     distance: float = Field(..., description="Total distance in meters")
     duration: float = Field(..., description="Total duration in seconds")
+    legs: Optional[List[RouteLeg]] = Field(
+        None, description="Distance and duration between consecutive waypoints, when calculated per leg"
+    )
+    waypoint_order: Optional[List[int]] = Field(
+        None, description="Indices of the request waypoints in visiting order, when optimize_order is set"
+    )
+    stale: Optional[bool] = Field(
+        None, description="True when OSRM was unavailable and an expired cached route was served"
+    )
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class RouteEditResponse(AbstractedRoute):
+    waypoints: List[Waypoint] = Field(..., description="Waypoints after the edit, to send with the next edit")
+    changed_legs: List[int] = Field(..., description="Indices of the legs the edit recalculated")
+
 class RouteError(BaseModel):
     error: str = Field(..., description="Error type or category")
     details: str = Field(..., description="Detailed error message")
 
-class RouteBase(BaseModel):
+class BatchRouteRequest(BaseModel):
+    requests: List[RouteRequest] = Field(..., description="Route requests to calculate")
+
+class BatchRouteItem(BaseModel):
+    index: int = Field(..., description="Position of the request in the batch")
+    route: Optional[AbstractedRoute] = Field(None, description="Calculated route, if successful")
+    error: Optional[RouteError] = Field(None, description="Error for this request, if it failed")
+
+class BatchRouteResponse(BaseModel):
+    results: List[BatchRouteItem] = Field(..., description="Per-request results in input order")
+
+class MatrixRequest(BaseModel):
+    origins: List[Coordinates] = Field(..., description="Origin coordinates (matrix rows)")
+    destinations: Optional[List[Coordinates]] = Field(
+        None, description="Destination coordinates (matrix columns); defaults to the origins"
+    )
+
+class MatrixResponse(BaseModel):
+    rows: int = Field(..., description="Number of origins")
+    cols: int = Field(..., description="Number of destinations")
+    durations: List[Optional[float]] = Field(
+        ..., description="Row-major durations in seconds; null where no route exists"
+    )
+    distances: List[Optional[float]] = Field(
+        ..., description="Row-major distances in meters; null where no route exists"
+    )
+
+class RouteInfo(BaseModel):
     title: str
     description: str
     origin: Coordinates
     destination: Coordinates
     waypoints: List[Waypoint] = Field(default_factory=list)
-    route: List[Coordinates]
     distance: float
     duration: float
 
@@ -65,19 +137,68 @@ class RouteBase(BaseModel):
             return [Waypoint.from_dict(wp) for wp in v]
         return v
 
-    @field_validator('route', mode='before')
-    @classmethod
-    def validate_route(cls, v):
-        if isinstance(v, list):
-            return [Coordinates.from_dict(coord) for coord in v]
-        return v
+class RouteBase(RouteInfo):
+    route: Optional[Geometry] = None
+    polyline: Optional[str] = None
+    polyline_precision: Optional[int] = None
 
 class RouteCreate(RouteBase):
-    pass
+    @model_validator(mode='after')
+    def decode_polyline(self) -> 'RouteCreate':
+        # Clients may upload the geometry as an encoded polyline instead of coordinates
+        if self.route is None:
+            if self.polyline is None:
+                raise ValueError("Either route or polyline is required")
+            try:
+                self.route = Geometry.from_polyline(self.polyline, self.polyline_precision or 5)
+            except ValueError as e:
+                raise ValueError(f"Invalid polyline: {str(e)}")
+        self.polyline = None
+        self.polyline_precision = None
+        return self
 
 class Route(RouteBase):
     id: UUID = Field(default_factory=uuid4)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class RouteSummary(RouteInfo):
+    """A saved route without its geometry, for list views."""
+    id: UUID
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class RouteGeometry(BaseModel):
+    """A saved route's geometry, simplified for a map zoom level."""
+    id: UUID
+    zoom: Optional[int] = Field(None, description="Zoom level the geometry is simplified for; null at full resolution")
+    points: int = Field(..., description="Number of points in the geometry")
+    route: Optional[Geometry] = None
+    polyline: Optional[str] = None
+    polyline_precision: Optional[int] = None
+
+class RouteImport(RouteCreate):
+    """One record of a bulk import; ``id`` and ``created_at`` are kept when given."""
+    id: Optional[UUID] = None
+    created_at: Optional[datetime] = None
+
+class RouteImportError(BaseModel):
+    line: int  # 1-based line number in the uploaded file
+    error: str
+
+class RouteImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[RouteImportError] = Field(default_factory=list)
+
+def apply_geometry_format(route: BaseModel, geometry_format: GeometryFormat) -> BaseModel:
+    """Return ``route`` with its geometry in the requested wire format."""
+    if geometry_format == "coordinates" or route.route is None:
+        return route
+    precision = POLYLINE_PRECISION[geometry_format]
+    encoded = route.route.to_polyline(precision)
+    return route.model_copy(update={"route": None, "polyline": encoded, "polyline_precision": precision}) 
\ No newline at end of file
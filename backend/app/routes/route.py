@@ -1,18 +1,81 @@
-from typing import List, Optional
-from fastapi import APIRouter, Query, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Literal, Optional, Union
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import numpy as np
+from fastapi import APIRouter, Query, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from app.core.config import get_settings
+from app.core.metrics import TimedRoute, record_stage
+from app.core.responses import FastJSONResponse, dumps
+from app.db.chunks import load_route_geometry, storage_report
 from app.db.database import get_db
-from app.models.route import RouteRequest, AbstractedRoute, RouteError, Route, RouteCreate, Waypoint, Coordinates
+from app.models.route import (
+    RouteRequest, AbstractedRoute, RouteError, Route, RouteCreate, RouteSummary, Waypoint, Coordinates,
+    RouteEditRequest, RouteEditResponse, RouteGeometry,
+    BatchRouteRequest, BatchRouteResponse, MatrixRequest, MatrixResponse, RouteImportResponse,
+    GeometryFormat, apply_geometry_format
+)
 from app.db.models import RouteModel
+from app.models.geometry import Geometry
+from app.db.queries import (
+    RouteEndpoint, RouteSortField, SortOrder, build_route_query, split_page,
+    bbox_candidates_query, endpoint_candidates_query
+)
 from app.services.route_service import RouteService
+from app.services.osrm import get_osrm_pool, resilience_stats
+from app.services.resilience import UpstreamUnavailableError
+from app.services.routing import get_routing_backend
+from app.services.matrix import get_matrix
+from app.services.access import get_route_access
+from app.services.cache import get_route_cache
+from app.services.singleflight import get_route_flights
+from app.services.route_io import export_geojson, export_ndjson, import_routes
+from app.services.pyramid import LEVEL_POLYLINE_PRECISION, build_levels, pick_level
+from app.services.spatial import circle_bounds, polyline_intersects_box, split_antimeridian, within_radius
 
-router = APIRouter()
+settings = get_settings()
+logger = logging.getLogger(__name__)
+router = APIRouter(route_class=TimedRoute)
 route_service = RouteService()
 
+_ACCEPT_GEOMETRY = re.compile(r"geometry=\"?(coordinates|polyline6|polyline)\b")
+
+def resolve_geometry_format(
+    response: Response,
+    geometry_format: Optional[GeometryFormat] = Query(
+        None, description="Return the route geometry as coordinates (default) or an encoded polyline"
+    ),
+    accept: Optional[str] = Header(None)
+) -> GeometryFormat:
+    """Pick the geometry wire format from the query string or an Accept parameter.
+
+    ``Accept: application/json; geometry=polyline6`` is equivalent to
+    ``?geometry_format=polyline6``; the query parameter wins if both are given.
+    Since the body then depends on ``Accept``, the response gets ``Vary: Accept``;
+    endpoints that return their own response must pass on ``response.headers``.
+    """
+    response.headers.add_vary_header("Accept")
+    if geometry_format is not None:
+        return geometry_format
+    match = _ACCEPT_GEOMETRY.search(accept or "")
+    return match.group(1) if match else "coordinates"
+
+def upstream_unavailable(e: UpstreamUnavailableError) -> HTTPException:
+    """503 for an unavailable routing upstream, with a Retry-After hint when one is known."""
+    headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+    return HTTPException(status_code=503, detail=str(e), headers=headers)
+
 @router.post("/route/calculate/")
 async def calculate_route(
     response: Response,
-    request: RouteRequest
+    request: RouteRequest,
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
 ) -> AbstractedRoute:
     """Calculate a route with waypoints."""
     try:
@@ -24,18 +87,101 @@ async def calculate_route(
         result = await route_service.calculate_route(request)
         if isinstance(result, RouteError):
             raise HTTPException(status_code=400, detail=result.details)
-        return result
+        if result.stale:
+            response.headers["Warning"] = '110 - "Response is Stale"'
+        with record_stage("calculate_route", "geometry_format"):
+            return FastJSONResponse(apply_geometry_format(result, geometry_format), headers=response.headers)
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/route/calculate/edit/")
+async def edit_route(
+    response: Response,
+    request: RouteEditRequest,
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+) -> RouteEditResponse:
+    """Recalculate a route after adding, moving or removing one waypoint.
+
+    The route is calculated per leg, and legs are cached, so only the legs next
+    to the edited waypoint are fetched from the routing backend. Legs are cached
+    by the first edit, or by the first calculation with ``ROUTE_LEGS_ENABLED``;
+    otherwise the first edit fetches every leg.
+    """
+    try:
+        result = await route_service.edit_route(request)
+        if result.stale:
+            response.headers["Warning"] = '110 - "Response is Stale"'
+        return FastJSONResponse(apply_geometry_format(result, geometry_format), headers=response.headers)
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/route/calculate/batch/", response_model=BatchRouteResponse)
+async def calculate_routes_batch(
+    http_request: Request,
+    batch: BatchRouteRequest,
+    stream: bool = Query(False, description="Stream results as NDJSON in completion order")
+):
+    """Calculate many routes in one request.
+
+    Results come back in input order with per-item errors. With ``stream=true``
+    or ``Accept: application/x-ndjson`` each result is written as one JSON line
+    as soon as it is ready, tagged with its input index.
+    """
+    if len(batch.requests) > settings.BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size {len(batch.requests)} exceeds the maximum of {settings.BATCH_MAX_SIZE}"
+        )
+
+    if stream or "application/x-ndjson" in http_request.headers.get("accept", ""):
+        async def ndjson_lines():
+            async for item in route_service.iter_routes_batch(batch.requests):
+                yield dumps(item) + b"\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    try:
+        results = await route_service.calculate_routes_batch(batch.requests)
+        return FastJSONResponse(BatchRouteResponse(results=results))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/route/matrix/", response_model=MatrixResponse)
+async def calculate_matrix(request: MatrixRequest):
+    """Calculate distances and durations between every origin and destination."""
+    try:
+        return await get_matrix(request.origins, request.destinations)
+    except UpstreamUnavailableError as e:
+        raise upstream_unavailable(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/route/stats/")
+async def route_stats():
+    """Report routing-backend, OSRM connection-pool, resilience, route-cache and request-coalescing usage."""
+    return {
+        "routing_backend": get_routing_backend().stats(),
+        "osrm_pool": get_osrm_pool().stats(),
+        "osrm_resilience": resilience_stats(),
+        "route_cache": get_route_cache().stats(),
+        "coalescing": get_route_flights().stats(),
+    }
+
 @router.post("/routes/", response_model=Route)
-async def create_route_db(route: RouteCreate, db: Session = Depends(get_db)):
+async def create_route_db(
+    response: Response,
+    route: RouteCreate,
+    db: AsyncSession = Depends(get_db),
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+):
     """Save a route to the database."""
     try:
-        print("Received route data:", route.dict())
-        
         # Extract origin and destination from waypoints if they exist
         if not route.waypoints:
             route.waypoints = []
@@ -51,17 +197,6 @@ async def create_route_db(route: RouteCreate, db: Session = Depends(get_db)):
             }
             for wp in route.waypoints
         ]
-        print("Converted waypoints:", waypoints_json)
-
-        # Convert route coordinates to list of dicts for JSON storage
-        route_json = [
-            {
-                "latitude": coord.latitude,
-                "longitude": coord.longitude
-            }
-            for coord in route.route
-        ]
-        print("Converted route:", route_json)
 
         # Convert origin and destination to dicts for JSON storage
         origin_json = {
@@ -73,84 +208,292 @@ async def create_route_db(route: RouteCreate, db: Session = Depends(get_db)):
             "latitude": route.destination.latitude,
             "longitude": route.destination.longitude
         }
-        print("Origin:", origin_json)
-        print("Destination:", destination_json)
-
-        db_route = RouteModel(
-            title=route.title,
-            description=route.description,
-            origin=origin_json,
-            destination=destination_json,
-            waypoints=waypoints_json,
-            route=route_json,
-            distance=route.distance,
-            duration=route.duration,
-        )
-        print("Created RouteModel instance")
+
+        with record_stage("create_route_db", "build_model"):
+            # Building the zoom levels and chunks of a long route takes long enough to stall the event loop
+            db_route = await asyncio.to_thread(
+                RouteModel,
+                title=route.title,
+                description=route.description,
+                origin=origin_json,
+                destination=destination_json,
+                waypoints=waypoints_json,
+                route=route.route,
+                distance=route.distance,
+                duration=route.duration,
+            )
         db.add(db_route)
-        print("Added to session")
-        db.commit()
-        print("Committed to database")
-        db.refresh(db_route)
-        return Route.from_orm(db_route)
+        with record_stage("create_route_db", "db_commit"):
+            await db.commit()
+        with record_stage("create_route_db", "db_refresh"):
+            await db.refresh(db_route, attribute_names=[attr.key for attr in RouteModel.__mapper__.column_attrs])
+        with record_stage("create_route_db", "convert"):
+            return FastJSONResponse(apply_geometry_format(Route.from_orm(db_route), geometry_format), headers=response.headers)
     except Exception as e:
-        print("Error saving route:", str(e))
-        db.rollback()
+        logger.exception("Saving route failed")
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/routes/", response_model=List[Route])
-async def list_routes(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """List saved routes."""
+@router.get("/routes/", response_model=List[Union[Route, RouteSummary]])
+async def list_routes(
+    response: Response,
+    skip: int = Query(0, ge=0, description="Rows to skip; prefer cursor for deep pages"),
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    sort: RouteSortField = "created_at",
+    order: SortOrder = "desc",
+    title_prefix: Optional[str] = Query(None, description="Case-sensitive title prefix"),
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_geometry: bool = Query(False, description="Include each route's full geometry"),
+    db: AsyncSession = Depends(get_db),
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+):
+    """List saved routes, newest first by default.
+
+    Pages are keyset-paginated: when more routes follow, the ``X-Next-Cursor``
+    response header holds the ``cursor`` for the next page. Geometry is left out
+    unless ``include_geometry`` is set; fetch a single route by ID to get its geometry.
+    """
     try:
-        print("Fetching routes from database...")
-        routes = db.query(RouteModel).offset(skip).limit(limit).all()
-        print(f"Found {len(routes)} routes")
-        
+        query = build_route_query(
+            limit, cursor=cursor, sort=sort, order=order, title_prefix=title_prefix,
+            min_distance=min_distance, max_distance=max_distance,
+            min_duration=min_duration, max_duration=max_duration,
+            created_after=created_after, created_before=created_before,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if skip:
+            query = query.offset(skip)
+        if include_geometry:
+            query = query.options(undefer_group("geometry"))
+        with record_stage("list_routes", "db_query"):
+            routes, next_cursor = split_page((await db.execute(query)).scalars().all(), sort, limit)
+            if include_geometry:
+                await load_route_geometry(db, routes)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        logger.debug("Listing %d routes", len(routes))
+
         result = []
-        for route in routes:
-            try:
-                print(f"Converting route {route.id}...")
-                print("Route data:", {
-                    'id': route.id,
-                    'title': route.title,
-                    'description': route.description,
-                    'origin': route.origin,
-                    'destination': route.destination,
-                    'waypoints': route.waypoints,
-                    'route': route.route,
-                    'distance': route.distance,
-                    'duration': route.duration,
-                    'created_at': route.created_at
-                })
-                converted_route = Route.from_orm(route)
-                result.append(converted_route)
-            except Exception as e:
-                print(f"Error converting route {route.id}: {str(e)}")
-                raise
+        with record_stage("list_routes", "convert"):
+            for route in routes:
+                try:
+                    if not include_geometry:
+                        result.append(RouteSummary.model_validate(route))
+                        continue
+                    converted_route = Route.from_orm(route)
+                    result.append(apply_geometry_format(converted_route, geometry_format))
+                except Exception as e:
+                    logger.error("Converting route %s failed: %s", route.id, e)
+                    raise
         
-        return result
+        return FastJSONResponse(result, headers=response.headers)
     except Exception as e:
-        print("Error in list_routes:", str(e))
+        logger.exception("Listing routes failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/routes/import", response_model=RouteImportResponse)
+async def import_routes_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Bulk-import saved routes from an NDJSON request body.
+
+    Each line is a route as accepted by ``POST /routes/`` (optionally with ``id`` and
+    ``created_at``) or a GeoJSON Feature. The body is read as a stream and inserted
+    in batches; records that fail are listed by line number.
+    """
+    return await import_routes(db, request.stream())
+
+@router.get("/routes/export")
+async def export_routes_db(
+    response: Response,
+    export_format: Literal["ndjson", "geojson"] = Query("ndjson", alias="format"),
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+):
+    """Stream every saved route as NDJSON or a GeoJSON FeatureCollection, oldest first."""
+    if export_format == "geojson":
+        return StreamingResponse(export_geojson(), media_type="application/geo+json")
+    return StreamingResponse(export_ndjson(geometry_format), media_type="application/x-ndjson", headers=response.headers)
+
+def _has_spatial_index(db: AsyncSession) -> bool:
+    # The R*Tree indexes only exist on SQLite (see app/db/schema.py)
+    return db.get_bind().dialect.name == "sqlite"
+
+@router.get("/routes/search/bbox", response_model=List[RouteSummary])
+async def search_routes_in_bbox(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Find saved routes that pass through a viewport, newest first.
+
+    A viewport with ``west > east`` crosses the antimeridian. Candidates come from
+    the spatial index on route bounding boxes; each one's geometry is then checked
+    against the viewport exactly.
+    """
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north")
+    boxes = split_antimeridian(south, west, north, east)
+    query = bbox_candidates_query(boxes, _has_spatial_index(db)).options(undefer_group("geometry"))
+
+    matches = []
+    candidates = await db.stream_scalars(query.execution_options(yield_per=100))
+    try:
+        async for batch in candidates.partitions():
+            await load_route_geometry(db, batch)
+            for route in batch:
+                latlon = route.route.latlon
+                if any(polyline_intersects_box(latlon, *box) for box in boxes):
+                    matches.append(RouteSummary.model_validate(route))
+                    if len(matches) == limit:
+                        return matches
+    finally:
+        await candidates.close()
+    return matches
+
+@router.get("/routes/search/nearby", response_model=List[RouteSummary])
+async def search_routes_nearby(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=1000),
+    endpoint: RouteEndpoint = Query("origin", description="Match routes that start (origin) or end (destination) nearby"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Find saved routes that start or end within ``radius_km`` of a point, nearest first."""
+    query = endpoint_candidates_query(
+        circle_bounds(latitude, longitude, radius_km * 1000), endpoint, _has_spatial_index(db)
+    )
+    candidates = (await db.execute(query)).scalars().all()
+    points = np.array(
+        [(getattr(route, endpoint)["latitude"], getattr(route, endpoint)["longitude"]) for route in candidates],
+        dtype=float,
+    ).reshape(-1, 2)
+    nearest = within_radius(points, latitude, longitude, radius_km * 1000)[:limit]
+    return [RouteSummary.model_validate(candidates[i]) for i in nearest.tolist()]
+
+@router.get("/routes/storage")
+async def get_route_storage_report(db: AsyncSession = Depends(get_db)):
+    """Report the space saved routes' geometry takes per storage format and what chunk deduplication saves.
+
+    Scans every saved route; meant for operators, not for frequent polling.
+    """
+    return await storage_report(db)
+
 @router.get("/routes/{route_id}", response_model=Route)
-async def get_route_by_id(route_id: str, db: Session = Depends(get_db)):
+async def get_route_by_id(
+    response: Response,
+    route_id: str,
+    db: AsyncSession = Depends(get_db),
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+):
     """Get a specific route by ID."""
-    route = db.query(RouteModel).filter(RouteModel.id == route_id).first()
+    with record_stage("get_route_by_id", "db_query"):
+        route = await db.get(RouteModel, route_id, options=[undefer_group("geometry")])
+        if route is None:
+            raise HTTPException(status_code=404, detail="Route not found")
+        await load_route_geometry(db, [route])
+    get_route_access().record(route_id)
+    with record_stage("get_route_by_id", "convert"):
+        return FastJSONResponse(apply_geometry_format(Route.from_orm(route), geometry_format), headers=response.headers)
+
+def geometry_etag(route: RouteModel, zoom: Optional[int], geometry_format: GeometryFormat) -> str:
+    """ETag of a geometry response, derived without reading any geometry.
+
+    Saved geometry never changes, so the route's identity, the request and the
+    level settings determine the response.
+    """
+    key = repr((
+        route.id, route.created_at.isoformat() if route.created_at else None, route.distance, zoom, geometry_format,
+        settings.ROUTE_LOD_ZOOMS, settings.ROUTE_LOD_PIXEL_TOLERANCE,
+    ))
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+@router.get("/routes/{route_id}/geometry", response_model=RouteGeometry)
+async def get_route_geometry(
+    response: Response,
+    route_id: str,
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level; omit for full resolution"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    geometry_format: GeometryFormat = Depends(resolve_geometry_format)
+):
+    """Get a saved route's geometry simplified for a map zoom level.
+
+    Levels are computed when the route is saved, so a country-wide view gets a
+    few dozen points. Responses carry an ETag and Cache-Control; a request whose
+    If-None-Match still matches gets a 304 without any geometry being read.
+    """
+    with record_stage("get_route_geometry", "db_query"):
+        route = await db.get(RouteModel, route_id)
     if route is None:
         raise HTTPException(status_code=404, detail="Route not found")
-    return Route.from_orm(route)
+    get_route_access().record(route_id)
+    etag = geometry_etag(route, zoom, geometry_format)
+    # Vary: Accept is already set by resolve_geometry_format
+    headers = response.headers
+    headers["ETag"] = etag
+    headers["Cache-Control"] = f"public, max-age={settings.ROUTE_GEOMETRY_MAX_AGE}"
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    async def full_geometry() -> Geometry:
+        await db.refresh(route, attribute_names=["_route", "route_polyline", "route_chunks"])
+        await load_route_geometry(db, [route])
+        return route.route
+
+    with record_stage("get_route_geometry", "load_level"):
+        geometry = level = None
+        if zoom is not None:
+            await db.refresh(route, attribute_names=["route_levels"])
+            levels = route.route_levels
+            if levels is None:
+                # Saved before levels were stored; build them for this response only
+                geometry = await full_geometry()
+                levels = await asyncio.to_thread(
+                    build_levels, geometry.latlon, settings.ROUTE_LOD_ZOOMS, settings.ROUTE_LOD_PIXEL_TOLERANCE
+                )
+            level = pick_level(levels, zoom)
+            if level is not None:
+                geometry = Geometry.from_polyline(levels[level], LEVEL_POLYLINE_PRECISION)
+        if geometry is None:
+            geometry = await full_geometry()
+    with record_stage("get_route_geometry", "convert"):
+        result = RouteGeometry(
+            id=route.id, zoom=int(level) if level is not None else None, points=len(geometry), route=geometry
+        )
+        return FastJSONResponse(apply_geometry_format(result, geometry_format), headers=headers)
 
 @router.delete("/routes/{route_id}")
-async def delete_route(route_id: str, db: Session = Depends(get_db)):
+async def delete_route(route_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a route by ID."""
     try:
-        route = db.query(RouteModel).filter(RouteModel.id == route_id).first()
+        with record_stage("delete_route", "db_query"):
+            route = await db.get(RouteModel, route_id)
         if route is None:
             raise HTTPException(status_code=404, detail="Route not found")
-        db.delete(route)
-        db.commit()
+        with record_stage("delete_route", "db_commit"):
+            await db.delete(route)
+            await db.commit()
         return {"message": "Route deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Production launcher: set up the schema once, warm up, then start the workers.
+
+    python -m app.serve --workers 4
+    python -m app.serve migrate
+
+Each worker is a separate process with its own memory cache. With more than
+one worker the route cache gets a persistent SQLite tier (``--shared-cache``),
+so a route calculated by one worker is served from that file by the others.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from app.core.config import get_settings
+from app.core.log import configure_logging
+
+settings = get_settings()
+# Named explicitly: run with -m, __name__ is "__main__", outside the "app" logger tree
+logger = logging.getLogger("app.serve")
+
+# Shared route cache file used for several workers when ROUTE_CACHE_PERSISTENT_PATH is not set
+DEFAULT_SHARED_CACHE_PATH = "./app/route_cache.db"
+
+
+def configure(name: str, value) -> None:
+    """Set a setting here and in the environment the worker processes start with."""
+    setattr(settings, name, value)
+    os.environ[name] = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+async def migrate() -> None:
+    """Create missing tables and bring existing ones up to date."""
+    from app.db.database import engine
+    from app.db.schema import init_db
+
+    try:
+        await init_db(engine)
+    finally:
+        await engine.dispose()
+
+
+async def refresh_cache(pairs: int) -> None:
+    """Recalculate the most used cached routes that have expired."""
+    from app.services.cache import get_route_cache
+    from app.services.osrm import close_osrm_client, init_osrm_client
+    from app.services.warmup import refresh_hot_routes
+
+    await init_osrm_client()
+    try:
+        refreshed = await refresh_hot_routes(pairs)
+        logger.info("Refreshed %d expired cached routes", refreshed)
+    finally:
+        await close_osrm_client()
+        get_route_cache().close()
+        get_route_cache.cache_clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", choices=["serve", "migrate"], default="serve",
+                        help="'migrate' only sets up the schema (default: serve)")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    parser.add_argument("--shared-cache", default=settings.ROUTE_CACHE_PERSISTENT_PATH,
+                        help=f"Route cache file shared by the workers (default with several workers: {DEFAULT_SHARED_CACHE_PATH})")
+    parser.add_argument("--skip-migrate", action="store_true", help="The schema is already up to date")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.command == "migrate" or not args.skip_migrate:
+        asyncio.run(migrate())
+        logger.info("Database schema is up to date")
+    if args.command == "migrate":
+        return
+    # Workers must not race each other setting up the schema
+    configure("DB_MIGRATE_ON_STARTUP", False)
+
+    shared_cache = args.shared_cache
+    if shared_cache is None and args.workers > 1 and settings.ROUTE_CACHE_ENABLED:
+        shared_cache = DEFAULT_SHARED_CACHE_PATH
+    if shared_cache is not None:
+        configure("ROUTE_CACHE_PERSISTENT_PATH", shared_cache)
+        if settings.WARM_UP_ROUTE_PAIRS:
+            asyncio.run(refresh_cache(settings.WARM_UP_ROUTE_PAIRS))
+
+    import uvicorn
+    logger.info("Starting %d worker(s) on %s:%d", args.workers, args.host, args.port)
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Read counts of saved routes and cached routes, used to pick what to warm up.
+
+Reads are counted in memory and written out every ``ACCESS_STATS_FLUSH_INTERVAL``
+seconds, so counting costs no database write per request. Each worker process
+flushes its own counts; they add up in ``route_access`` and in the shared route
+cache file.
+"""
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import List
+import asyncio
+import logging
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import SessionLocal
+from app.db.models import RouteAccess, RouteModel
+from app.services.cache import get_route_cache
+
+logger = logging.getLogger(__name__)
+
+
+class AccessCounter:
+    """Reads per saved route since the last flush."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+
+    def record(self, route_id: str) -> None:
+        self._counts[route_id] += 1
+
+    def drain(self) -> Counter:
+        counts, self._counts = self._counts, Counter()
+        return counts
+
+
+@lru_cache()
+def get_route_access() -> AccessCounter:
+    """Get the process-wide saved-route read counter."""
+    return AccessCounter()
+
+
+async def flush_route_access(db: AsyncSession) -> int:
+    """Add the counted reads to ``route_access``; returns how many routes were updated."""
+    counts = get_route_access().drain()
+    if not counts:
+        return 0
+    now = datetime.utcnow()
+    insert = sqlite_insert(RouteAccess)
+    await db.execute(
+        insert.on_conflict_do_update(
+            index_elements=["route_id"],
+            set_={"hits": RouteAccess.hits + insert.excluded.hits, "last_accessed_at": insert.excluded.last_accessed_at},
+        ),
+        [{"route_id": route_id, "hits": hits, "last_accessed_at": now} for route_id, hits in counts.items()],
+    )
+    await db.commit()
+    return len(counts)
+
+
+async def flush_access_stats() -> None:
+    """Write out the saved-route and route cache read counts of this process."""
+    try:
+        async with SessionLocal() as db:
+            await flush_route_access(db)
+    except SQLAlchemyError as e:
+        # Counts only rank warm-up candidates; losing one interval's worth is harmless
+        logger.warning("Saved-route read count update failed: %s", e)
+    await get_route_cache().flush_hits()
+
+
+async def run_access_flusher(interval: float) -> None:
+    """Flush read counts every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        await flush_access_stats()
+
+
+async def hottest_route_ids(db: AsyncSession, limit: int) -> List[str]:
+    """IDs of the ``limit`` most read saved routes."""
+    query = (
+        select(RouteAccess.route_id)
+        .join(RouteModel, RouteModel.id == RouteAccess.route_id)
+        .order_by(RouteAccess.hits.desc())
+        .limit(limit)
+    )
+    return list((await db.execute(query)).scalars())
@@ -0,0 +1,131 @@
+from typing import TYPE_CHECKING, Any, Collection, Dict, List, Literal, Optional, Tuple
+import asyncio
+import logging
+import random
+from app.services.resilience import CircuitBreaker, UpstreamUnavailableError
+
+if TYPE_CHECKING:
+    from app.services.osrm import OSRMClient
+
+logger = logging.getLogger(__name__)
+
+BalancingStrategy = Literal["least_outstanding", "ewma"]
+
+
+def parse_endpoint(entry: str) -> Tuple[Optional[str], str]:
+    """Split an ``OSRM_SERVER_URLS`` entry of the form ``[profile=]url`` into ``(profile, url)``."""
+    head, sep, tail = entry.partition("=")
+    if sep and "://" not in head:
+        return head.strip() or None, tail.strip()
+    return None, entry.strip()
+
+
+class LoadBalancer:
+    """Spreads OSRM calls over several servers and probes them in the background.
+
+    ``least_outstanding`` picks the server with the fewest calls in flight;
+    ``ewma`` picks the lowest smoothed latency scaled by calls in flight. Servers
+    that fail ``unhealthy_threshold`` health checks in a row, or whose circuit is
+    open, leave rotation until they recover. If no server is left in rotation the
+    call goes to one anyway and its circuit breaker decides.
+    """
+
+    def __init__(
+        self,
+        endpoints: List["OSRMClient"],
+        default_profile: str,
+        strategy: BalancingStrategy = "least_outstanding",
+        health_check_interval: float = 10.0,
+        health_check_timeout: float = 2.0,
+        unhealthy_threshold: int = 2,
+    ):
+        if not endpoints:
+            raise ValueError("At least one OSRM endpoint is required")
+        self.endpoints = endpoints
+        self.default_profile = default_profile
+        self.strategy = strategy
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.unhealthy_threshold = unhealthy_threshold
+        self.health_checks = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def is_closed(self) -> bool:
+        return any(endpoint.is_closed for endpoint in self.endpoints)
+
+    def for_profile(self, profile: str) -> List["OSRMClient"]:
+        """Servers for ``profile``; servers without a profile serve every profile."""
+        return [endpoint for endpoint in self.endpoints if endpoint.profile in (None, profile)]
+
+    def _cost(self, endpoint: "OSRMClient") -> float:
+        if self.strategy == "ewma":
+            return (endpoint.latency.ewma or 0.0) * (endpoint.in_flight + 1)
+        return endpoint.in_flight
+
+    def pick(self, profile: str, exclude: Collection["OSRMClient"] = ()) -> "OSRMClient":
+        """Choose a server for one call, skipping those in ``exclude`` while others remain."""
+        candidates = self.for_profile(profile)
+        if not candidates:
+            raise UpstreamUnavailableError(f"No OSRM server is configured for profile '{profile}'")
+        untried = [endpoint for endpoint in candidates if endpoint not in exclude] or candidates
+        in_rotation = [
+            endpoint for endpoint in untried
+            if endpoint.healthy and endpoint.breaker.state != CircuitBreaker.OPEN
+        ]
+        choices = in_rotation or untried
+        # Shuffle so ties (e.g. several idle servers) don't all land on the first one
+        random.shuffle(choices)
+        return min(choices, key=self._cost)
+
+    async def check_health(self) -> None:
+        """Probe every server once and move servers in or out of rotation."""
+        self.health_checks += 1
+        results = await asyncio.gather(*(
+            endpoint.probe(endpoint.profile or self.default_profile, self.health_check_timeout)
+            for endpoint in self.endpoints
+        ))
+        for endpoint, healthy in zip(self.endpoints, results):
+            if healthy:
+                if not endpoint.healthy:
+                    logger.info("OSRM server %s passed its health check; back in rotation", endpoint.base_url)
+                endpoint.healthy = True
+                endpoint.health_failures = 0
+            else:
+                endpoint.health_failures += 1
+                if endpoint.healthy and endpoint.health_failures >= self.unhealthy_threshold:
+                    logger.warning(
+                        "OSRM server %s failed %d health checks; out of rotation", endpoint.base_url, endpoint.health_failures
+                    )
+                    endpoint.healthy = False
+
+    async def _run_health_checks(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error("OSRM health check failed: %s", e)
+
+    def start(self) -> None:
+        """Start background health checks; they only matter with more than one server."""
+        if self._task is None and self.health_check_interval > 0 and len(self.endpoints) > 1:
+            self._task = asyncio.ensure_future(self._run_health_checks())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "health_checks": self.health_checks,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
@@ -0,0 +1,298 @@
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LRUTier:
+    """In-process LRU cache with a TTL and a bound on the total payload size in bytes.
+
+    Expired entries are kept for another ``stale_ttl`` seconds (space permitting)
+    so they can still be served with ``stale=True`` while the upstream is down.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, stale_ttl: float = 0.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str, stale: bool = False) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            if now >= expires_at + self.stale_ttl:
+                self._remove(key)
+                self.expirations += 1
+                return None
+            if not stale:
+                return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def set(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            # Never let a single oversized entry flush the whole tier
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, payload)
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+class SQLiteTier:
+    """Persistent cache tier stored in a SQLite file so entries survive restarts.
+
+    Worker processes pointed at the same file share their entries. Each entry
+    also counts how often it was looked up, so the most used ones can be warmed
+    up before serving.
+    """
+
+    def __init__(self, path: str, ttl: float, stale_ttl: float = 0.0):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS route_cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(route_cache)")}
+        if "hits" not in columns:
+            # Cache files written before lookups were counted
+            self._conn.execute("ALTER TABLE route_cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+        self.expirations = 0
+        self.purge_expired()
+
+    def get(self, key: str, stale: bool = False) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM route_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[1] <= now:
+                if now >= row[1] + self.stale_ttl:
+                    self._conn.execute("DELETE FROM route_cache WHERE key = ?", (key,))
+                    self.expirations += 1
+                    return None
+                if not stale:
+                    return None
+            return row[0]
+
+    def set(self, key: str, payload: bytes) -> None:
+        with self._lock:
+            # Upsert rather than replace so a refreshed entry keeps its hit count
+            self._conn.execute(
+                "INSERT INTO route_cache (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, payload, time.time() + self.ttl),
+            )
+
+    def add_hits(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE route_cache SET hits = hits + ? WHERE key = ?", [(n, key) for key, n in counts.items()]
+            )
+
+    def hottest(self, limit: int) -> List[Tuple[str, bytes, float]]:
+        """``(key, value, expires_at)`` of the most looked-up entries still within the stale window."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, value, expires_at FROM route_cache WHERE expires_at > ? ORDER BY hits DESC LIMIT ?",
+                (time.time() - self.stale_ttl, limit),
+            ).fetchall()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM route_cache WHERE expires_at <= ?", (time.time() - self.stale_ttl,)
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RouteCache:
+    """Two-tier cache of calculated routes keyed on profile and rounded waypoint coordinates."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        precision: int,
+        persistent_path: Optional[str] = None,
+        persistent_ttl: Optional[float] = None,
+        stale_ttl: float = 0.0,
+    ):
+        self.precision = precision
+        self.memory = LRUTier(max_bytes=max_bytes, ttl=ttl, stale_ttl=stale_ttl)
+        self.persistent = (
+            SQLiteTier(persistent_path, ttl=persistent_ttl or ttl, stale_ttl=stale_ttl) if persistent_path else None
+        )
+        self.hits = 0
+        self.persistent_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.warmed = 0
+        # Lookups per key since the last flush_hits(), counted only when there is a persistent tier
+        self._lookups: Counter = Counter()
+
+    def make_key(self, profile: str, points: Iterable[Tuple[float, float]]) -> str:
+        """Build a cache key from a routing profile and (latitude, longitude) pairs."""
+        p = self.precision
+        coords = ";".join(f"{lat:.{p}f},{lon:.{p}f}" for lat, lon in points)
+        return f"{profile}:{coords}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.persistent is not None:
+            self._lookups[key] += 1
+        payload = self.memory.get(key)
+        if payload is not None:
+            self.hits += 1
+            return json.loads(payload)
+
+        if self.persistent is not None:
+            try:
+                payload = await asyncio.to_thread(self.persistent.get, key)
+            except sqlite3.Error as e:
+                logger.warning("Persistent route cache read failed: %s", e)
+                payload = None
+            if payload is not None:
+                self.persistent_hits += 1
+                # Promote so the next lookup is served from memory
+                self.memory.set(key, payload)
+                return json.loads(payload)
+
+        self.misses += 1
+        return None
+
+    async def get_stale(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up an entry even if it has expired, within the stale window."""
+        payload = self.memory.get(key, stale=True)
+        if payload is None and self.persistent is not None:
+            try:
+                payload = await asyncio.to_thread(self.persistent.get, key, True)
+            except sqlite3.Error as e:
+                logger.warning("Persistent route cache read failed: %s", e)
+        if payload is None:
+            return None
+        self.stale_hits += 1
+        return json.loads(payload)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        self.memory.set(key, payload)
+        self.sets += 1
+        if self.persistent is not None:
+            try:
+                await asyncio.to_thread(self.persistent.set, key, payload)
+            except sqlite3.Error as e:
+                logger.warning("Persistent route cache write failed: %s", e)
+
+    async def flush_hits(self) -> None:
+        """Add the lookups counted since the last flush to the persistent tier."""
+        if self.persistent is None or not self._lookups:
+            return
+        counts, self._lookups = self._lookups, Counter()
+        try:
+            await asyncio.to_thread(self.persistent.add_hits, counts)
+        except sqlite3.Error as e:
+            logger.warning("Persistent route cache hit count update failed: %s", e)
+
+    async def warm(self, limit: int) -> int:
+        """Copy the ``limit`` most looked-up fresh persistent entries into memory; returns how many."""
+        if self.persistent is None or limit <= 0:
+            return 0
+        try:
+            rows = await asyncio.to_thread(self.persistent.hottest, limit)
+        except sqlite3.Error as e:
+            logger.warning("Persistent route cache warm-up failed: %s", e)
+            return 0
+        now = time.time()
+        warmed = 0
+        for key, payload, expires_at in rows:
+            if expires_at > now:
+                self.memory.set(key, payload)
+                warmed += 1
+        self.warmed += warmed
+        return warmed
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+            "sets": self.sets,
+            "warmed": self.warmed,
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations
+            + (self.persistent.expirations if self.persistent else 0),
+            "entries": len(self.memory),
+            "size_bytes": self.memory.size_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "persistent": self.persistent is not None,
+        }
+
+    def close(self) -> None:
+        if self.persistent is not None:
+            self.persistent.close()
+
+
+@lru_cache()
+def get_route_cache() -> RouteCache:
+    """Get the process-wide route cache configured from settings."""
+    return RouteCache(
+        max_bytes=settings.ROUTE_CACHE_MAX_BYTES,
+        ttl=settings.ROUTE_CACHE_TTL,
+        precision=settings.ROUTE_CACHE_PRECISION,
+        persistent_path=settings.ROUTE_CACHE_PERSISTENT_PATH,
+        persistent_ttl=settings.ROUTE_CACHE_PERSISTENT_TTL,
+        stale_ttl=settings.ROUTE_CACHE_STALE_TTL,
+    )
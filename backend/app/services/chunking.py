@@ -0,0 +1,71 @@
+"""Content-defined chunking of route geometry for deduplicated storage.
+
+Chunk boundaries are chosen by the points themselves rather than by position:
+a chunk ends after any point whose fingerprint is divisible by the target chunk
+size. Two routes sharing a stretch of road, such as the same depot leg, split it
+into the same chunks even when it sits at a different offset in each route, so
+each chunk is stored once and referenced by the hash of its coordinates.
+"""
+from typing import List, Tuple
+import hashlib
+import numpy as np
+from app.services import polyline
+
+# Chunks are stored as a precision-6 polyline when that is lossless (OSRM output),
+# otherwise as raw little-endian float64 (latitude, longitude) pairs
+POLYLINE6, FLOAT64 = "polyline6", "f8"
+
+_MIX_LAT = np.uint64(0x9E3779B97F4A7C15)
+_MIX_LON = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def _fingerprints(latlon: np.ndarray) -> np.ndarray:
+    """A well-mixed 64-bit value per point, from its coordinates at 1e-7 degrees."""
+    quantized = np.round(latlon * 1e7).astype(np.int64).astype(np.uint64)
+    mixed = (quantized[:, 0] * _MIX_LAT) ^ (quantized[:, 1] * _MIX_LON)
+    mixed ^= mixed >> np.uint64(31)
+    mixed *= _MIX_LAT
+    return mixed ^ (mixed >> np.uint64(29))
+
+
+def split_points(latlon: np.ndarray, average: int = 128, minimum: int = 32, maximum: int = 512) -> List[int]:
+    """End offsets of the chunks ``latlon`` splits into, each ``minimum`` to ``maximum`` points.
+
+    The last offset is ``len(latlon)``; an empty geometry has no chunks.
+    """
+    count = len(latlon)
+    candidates = np.flatnonzero(_fingerprints(latlon) % np.uint64(average) == 0) + 1
+    ends: List[int] = []
+    start = 0
+    for end in candidates.tolist():
+        while end - start > maximum:
+            start += maximum
+            ends.append(start)
+        if end - start >= minimum:
+            ends.append(end)
+            start = end
+    while count - start > maximum:
+        start += maximum
+        ends.append(start)
+    if start < count:
+        ends.append(count)
+    return ends
+
+
+def chunk_hash(latlon: np.ndarray) -> str:
+    """Content address of a chunk: a 128-bit hash of its float64 coordinates."""
+    return hashlib.blake2b(np.ascontiguousarray(latlon, dtype="<f8").tobytes(), digest_size=16).hexdigest()
+
+
+def encode_chunk(latlon: np.ndarray) -> Tuple[str, bytes]:
+    """``(encoding, data)`` for storing a chunk; polylines are used only when lossless."""
+    encoded = polyline.encode(latlon, 6)
+    if np.array_equal(polyline.decode_array(encoded, 6), latlon):
+        return POLYLINE6, encoded.encode("ascii")
+    return FLOAT64, np.ascontiguousarray(latlon, dtype="<f8").tobytes()
+
+
+def decode_chunk(encoding: str, data: bytes) -> np.ndarray:
+    if encoding == POLYLINE6:
+        return polyline.decode_array(data.decode("ascii"), 6)
+    return np.frombuffer(data, dtype="<f8").reshape(-1, 2)
@@ -0,0 +1,368 @@
+"""Compact road graph for in-process routing.
+
+The graph is stored as compressed sparse row (CSR) arrays: the outgoing edges of
+node ``u`` are ``indices[indptr[u]:indptr[u + 1]]``, with their travel times and
+lengths at the same positions. A reverse CSR serves backward searches. Every
+array is saved as its own ``.npy`` file so a built graph can be memory-mapped
+instead of parsed at startup.
+
+Build a graph from an OSM XML extract with::
+
+    python -m app.services.graph build extract.osm graph_dir/
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+import numpy as np
+from app.services.spatial import EARTH_RADIUS_M, haversine_m
+
+ARRAYS = (
+    "lat", "lon",
+    "indptr", "indices", "duration", "length",
+    "rindptr", "rindices", "rduration", "rlength",
+    "cell_keys", "cell_nodes",
+)
+
+# Grid cell size for nearest-node lookups, in degrees (about 1.1 km of latitude)
+CELL_SIZE = 0.01
+_CELL_COLUMNS = int(math.ceil(360 / CELL_SIZE))
+
+# Car speeds by OSM highway type in km/h, used when a way has no usable maxspeed
+CAR_SPEEDS = {
+    "motorway": 100, "motorway_link": 60,
+    "trunk": 80, "trunk_link": 50,
+    "primary": 60, "primary_link": 45,
+    "secondary": 50, "secondary_link": 40,
+    "tertiary": 40, "tertiary_link": 35,
+    "unclassified": 30, "residential": 25, "road": 30,
+    "living_street": 10, "service": 15,
+}
+
+_MAXSPEED = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?\s*$")
+
+
+def _cell_key(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    row = np.floor((np.asarray(lat) + 90.0) / CELL_SIZE).astype(np.int64)
+    col = np.floor((np.asarray(lon) + 180.0) / CELL_SIZE).astype(np.int64)
+    return row * _CELL_COLUMNS + col
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray, *weights: np.ndarray):
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return (indptr, dst[order].astype(np.int32), *(w[order].astype(np.float32) for w in weights))
+
+
+class RoadGraph:
+    """Directed road graph in CSR form with a grid index for snapping points to nodes."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(
+        cls,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        duration: np.ndarray,
+        length: np.ndarray,
+        meta: Optional[Dict] = None,
+    ) -> "RoadGraph":
+        """Build the CSR arrays from parallel edge lists (travel time in seconds, length in meters)."""
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        n = len(lat)
+        indptr, indices, fwd_duration, fwd_length = _csr(n, src, dst, duration, length)
+        rindptr, rindices, rev_duration, rev_length = _csr(n, dst, src, duration, length)
+        keys = _cell_key(lat, lon)
+        cell_nodes = np.argsort(keys, kind="stable").astype(np.int32)
+        graph = cls({
+            "lat": lat, "lon": lon,
+            "indptr": indptr, "indices": indices, "duration": fwd_duration, "length": fwd_length,
+            "rindptr": rindptr, "rindices": rindices, "rduration": rev_duration, "rlength": rev_length,
+            "cell_keys": keys[cell_nodes], "cell_nodes": cell_nodes,
+        }, dict(meta or {}))
+        graph.max_speed  # computed once here so it is saved with the graph
+        return graph
+
+    @classmethod
+    def from_osm(cls, path: str, speeds: Dict[str, float] = CAR_SPEEDS) -> "RoadGraph":
+        """Build a car graph from an OSM XML extract.
+
+        Every node of a routable way becomes a graph node. ``oneway`` (including
+        ``-1``), roundabouts and motorways are respected; ``maxspeed`` overrides the
+        default speed for the highway type.
+        """
+        coordinates: Dict[str, Tuple[float, float]] = {}
+        ways: List[Tuple[List[str], float, int]] = []
+        for _, element in ET.iterparse(path, events=("end",)):
+            if element.tag == "node":
+                coordinates[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                highway = tags.get("highway")
+                if highway in speeds and tags.get("access") not in ("no", "private") and tags.get("area") != "yes":
+                    refs = [nd.get("ref") for nd in element.iter("nd")]
+                    ways.append((refs, _way_speed(tags, speeds[highway]), _way_direction(tags)))
+            if element.tag in ("node", "way", "relation"):
+                element.clear()
+
+        node_index: Dict[str, int] = {}
+        src: List[int] = []
+        dst: List[int] = []
+        speed: List[float] = []
+        for refs, kmh, direction in ways:
+            refs = [ref for ref in refs if ref in coordinates]
+            ids = [node_index.setdefault(ref, len(node_index)) for ref in refs]
+            for a, b in zip(ids, ids[1:]):
+                if direction >= 0:
+                    src.append(a), dst.append(b), speed.append(kmh)
+                if direction <= 0:
+                    src.append(b), dst.append(a), speed.append(kmh)
+
+        latlon = np.array([coordinates[ref] for ref in node_index], dtype=float).reshape(-1, 2)
+        src_array, dst_array = np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)
+        length = haversine_m(latlon[src_array, 0], latlon[src_array, 1], latlon[dst_array, 0], latlon[dst_array, 1])
+        duration = length / (np.array(speed, dtype=float) / 3.6)
+        meta = {"source": os.path.basename(path), "profile": "driving"}
+        return cls.from_edges(latlon[:, 0], latlon[:, 1], src_array, dst_array, duration, length, meta)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({**self.meta, "nodes": self.node_count, "edges": self.edge_count}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "RoadGraph":
+        """Load a saved graph; with ``mmap`` the arrays are paged in on demand."""
+        mode = "r" if mmap else None
+        # Plain ndarray views keep the mapping but skip np.memmap's per-slice overhead
+        arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)) for name in ARRAYS}
+        meta_path = os.path.join(directory, "meta.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        return cls(arrays, meta)
+
+    @classmethod
+    def open(cls, path: str) -> "RoadGraph":
+        """Load a saved graph directory, or build one in memory from an ``.osm`` file."""
+        if os.path.isdir(path):
+            return cls.load(path)
+        return cls.from_osm(path)
+
+    def nearest_node(self, latitude: float, longitude: float, max_distance: float) -> Tuple[int, float]:
+        """Closest node to a point and its distance in meters, searching outwards cell by cell."""
+        row = int(math.floor((latitude + 90.0) / CELL_SIZE))
+        col = int(math.floor((longitude + 180.0) / CELL_SIZE))
+        cell_m = CELL_SIZE * math.pi / 180 * EARTH_RADIUS_M * max(math.cos(math.radians(latitude)), 0.01)
+        max_ring = int(math.ceil(max_distance / cell_m)) + 1
+
+        best, best_distance = -1, math.inf
+        for ring in range(max_ring + 1):
+            keys = [
+                (row + dr) * _CELL_COLUMNS + (col + dc) % _CELL_COLUMNS
+                for dr in range(-ring, ring + 1)
+                for dc in range(-ring, ring + 1)
+                if max(abs(dr), abs(dc)) == ring
+            ]
+            starts = np.searchsorted(self.cell_keys, keys, side="left")
+            ends = np.searchsorted(self.cell_keys, keys, side="right")
+            candidates = [self.cell_nodes[s:e] for s, e in zip(starts, ends) if e > s]
+            if candidates:
+                nodes = np.concatenate(candidates)
+                distances = haversine_m(latitude, longitude, self.lat[nodes], self.lon[nodes])
+                i = int(np.argmin(distances))
+                if distances[i] < best_distance:
+                    best, best_distance = int(nodes[i]), float(distances[i])
+            # Nodes in further rings are at least ``ring * cell_m`` away
+            if best >= 0 and best_distance <= ring * cell_m:
+                break
+        if best < 0 or best_distance > max_distance:
+            raise ValueError(f"No road within {max_distance:.0f} m of ({latitude}, {longitude})")
+        return best, best_distance
+
+    @property
+    def max_speed(self) -> float:
+        """Highest edge speed in m/s, which bounds the A* heuristic."""
+        if "max_speed" not in self.meta:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speeds = np.asarray(self.length, dtype=float) / np.asarray(self.duration, dtype=float)
+            finite = speeds[np.isfinite(speeds)]
+            self.meta["max_speed"] = float(finite.max()) if len(finite) else 1.0
+        return self.meta["max_speed"]
+
+    def _potential(self, source: int, target: int):
+        """Forward A* potential; the backward search uses its negation.
+
+        Half the difference of the travel-time lower bounds to the target and from
+        the source keeps both searches consistent, so the usual bidirectional
+        stopping rule stays exact.
+        """
+        # Slightly overstate the top speed so float32 rounding can't make the bound inadmissible
+        scale = 2 * EARTH_RADIUS_M / (self.max_speed * 1.001)
+        lat, lon = self.lat, self.lon
+        s_lat, s_lon = math.radians(float(lat[source])), math.radians(float(lon[source]))
+        t_lat, t_lon = math.radians(float(lat[target])), math.radians(float(lon[target]))
+        cos_s, cos_t = math.cos(s_lat), math.cos(t_lat)
+        cache: Dict[int, float] = {}
+
+        def potential(v: int) -> float:
+            value = cache.get(v)
+            if value is None:
+                v_lat, v_lon = math.radians(float(lat[v])), math.radians(float(lon[v]))
+                cos_v = math.cos(v_lat)
+                to_target = math.sin((t_lat - v_lat) / 2) ** 2 + cos_v * cos_t * math.sin((t_lon - v_lon) / 2) ** 2
+                from_source = math.sin((v_lat - s_lat) / 2) ** 2 + cos_s * cos_v * math.sin((v_lon - s_lon) / 2) ** 2
+                value = cache[v] = scale * (
+                    math.asin(math.sqrt(min(to_target, 1.0))) - math.asin(math.sqrt(min(from_source, 1.0)))
+                ) / 2
+            return value
+
+        return potential
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[List[int], float, float]]:
+        """Fastest path as ``(nodes, duration, length)`` by bidirectional A*, or ``None``.
+
+        Searches from both ends at once, always expanding the side with the smaller
+        frontier key, and stops once the two keys together can't beat the best
+        meeting point found. Keys are travel time plus a potential that steers
+        each search towards the other end.
+        """
+        if source == target:
+            return [source], 0.0, 0.0
+
+        sides = (
+            (self.indptr, self.indices, self.duration, self.length, 1.0),
+            (self.rindptr, self.rindices, self.rduration, self.rlength, -1.0),
+        )
+        potential = self._potential(source, target)
+        dist = ({source: 0.0}, {target: 0.0})
+        length = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        settled = (set(), set())
+        best, meet = math.inf, -1
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            _, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            indptr, indices, duration, edge_length, sign = sides[side]
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            own, other = dist[side], dist[1 - side]
+            d = own[u]
+            for v, w, l in zip(indices[start:end].tolist(), duration[start:end].tolist(), edge_length[start:end].tolist()):
+                nd = d + w
+                if nd < own.get(v, math.inf):
+                    own[v] = nd
+                    length[side][v] = length[side][u] + l
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd + sign * potential(v), v))
+                    if v in other and nd + other[v] < best:
+                        best, meet = nd + other[v], v
+
+        if meet < 0:
+            return None
+        path = []
+        node = meet
+        while node != -1:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meet]
+        while node != -1:
+            path.append(node)
+            node = parent[1][node]
+        return path, best, length[0][meet] + length[1][meet]
+
+    def one_to_many(self, source: int, targets: Iterable[int]) -> Tuple[Dict[int, float], Dict[int, float]]:
+        """Durations and lengths from ``source`` to each reachable target, by one Dijkstra search."""
+        remaining = set(targets)
+        dist = {source: 0.0}
+        length = {source: 0.0}
+        durations: Dict[int, float] = {}
+        lengths: Dict[int, float] = {}
+        heap = [(0.0, source)]
+        settled = set()
+        while heap and remaining:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u in remaining:
+                remaining.discard(u)
+                durations[u], lengths[u] = d, length[u]
+            start, end = int(self.indptr[u]), int(self.indptr[u + 1])
+            for v, w, l in zip(self.indices[start:end].tolist(), self.duration[start:end].tolist(), self.length[start:end].tolist()):
+                nd = d + w
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    length[v] = length[u] + l
+                    heapq.heappush(heap, (nd, v))
+        return durations, lengths
+
+
+def _way_speed(tags: Dict[str, str], default: float) -> float:
+    match = _MAXSPEED.match(tags.get("maxspeed", ""))
+    if not match:
+        return default
+    value = float(match.group(1)) * (1.609344 if match.group(2) else 1.0)
+    return value if value > 0 else default
+
+
+def _way_direction(tags: Dict[str, str]) -> int:
+    """1 for forward-only, -1 for backward-only, 0 for both directions."""
+    oneway = tags.get("oneway", "")
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway == "no":
+        return 0
+    if tags.get("junction") in ("roundabout", "circular") or tags.get("highway") in ("motorway", "motorway_link"):
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a routing graph from an OSM XML extract")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Parse an .osm file and save the graph arrays")
+    build.add_argument("osm", help="OSM XML extract")
+    build.add_argument("output", help="Directory to write the .npy arrays to")
+    args = parser.parse_args()
+
+    graph = RoadGraph.from_osm(args.osm)
+    graph.save(args.output)
+    print(f"Saved {graph.node_count} nodes and {graph.edge_count} edges to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from typing import Any, Dict, List, Sequence
+import asyncio
+import logging
+import os
+import time
+from app.core.config import get_settings
+from app.core.metrics import record_stage
+from app.models.geometry import Geometry
+from app.services.graph import RoadGraph
+from app.services.routing import Point, RoutingBackend
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LocalGraphBackend(RoutingBackend):
+    """In-process routing over a local road graph, with no network hop.
+
+    Points are snapped to the nearest graph node within ``LOCAL_GRAPH_SNAP_DISTANCE``
+    meters and each leg is solved with bidirectional A* on travel time.
+    Searches run in a worker thread so they don't hold up the event loop.
+    """
+
+    name = "local"
+
+    def __init__(self, graph: RoadGraph, snap_distance: float = 1000.0):
+        self.graph = graph
+        self.snap_distance = snap_distance
+        self._queries = 0
+
+    @classmethod
+    def open(cls, path: str) -> "LocalGraphBackend":
+        started = time.perf_counter()
+        graph = RoadGraph.open(path)
+        logger.info(
+            "Loaded road graph %s with %d nodes and %d edges in %.1f ms",
+            path, graph.node_count, graph.edge_count, (time.perf_counter() - started) * 1000,
+        )
+        return cls(graph, settings.LOCAL_GRAPH_SNAP_DISTANCE)
+
+    @property
+    def cache_namespace(self) -> str:
+        source = self.graph.meta.get("source") or os.path.basename(settings.LOCAL_GRAPH_PATH or "")
+        return f"local:{source}"
+
+    def _snap(self, points: Sequence[Point]) -> List[int]:
+        return [self.graph.nearest_node(lat, lon, self.snap_distance)[0] for lat, lon in points]
+
+    def route_sync(self, points: Sequence[Point]) -> Dict[str, Any]:
+        self._queries += 1
+        with record_stage("local_route", "snap"):
+            nodes = self._snap(points)
+        path: List[int] = []
+        duration = distance = 0.0
+        with record_stage("local_route", "search"):
+            for leg, (source, target) in enumerate(zip(nodes, nodes[1:])):
+                result = self.graph.shortest_path(source, target)
+                if result is None:
+                    raise ValueError(f"No route found between waypoints {leg} and {leg + 1}")
+                leg_path, leg_duration, leg_distance = result
+                path.extend(leg_path[1:] if path else leg_path)
+                duration += leg_duration
+                distance += leg_distance
+        with record_stage("local_route", "geometry_convert"):
+            geometry = Geometry(list(zip(self.graph.lat[path].tolist(), self.graph.lon[path].tolist())))
+        return {
+            "route": geometry,
+            "distance": distance,
+            "duration": duration,
+        }
+
+    async def route(self, points: Sequence[Point]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.route_sync, points)
+
+    def table_sync(self, sources: Sequence[Point], destinations: Sequence[Point]) -> Dict[str, List[List[Any]]]:
+        source_nodes = self._snap(sources)
+        destination_nodes = self._snap(destinations)
+        durations, distances = [], []
+        for source in source_nodes:
+            # One Dijkstra search per source covers every destination
+            row_durations, row_distances = self.graph.one_to_many(source, destination_nodes)
+            durations.append([row_durations.get(node) for node in destination_nodes])
+            distances.append([row_distances.get(node) for node in destination_nodes])
+        return {"durations": durations, "distances": distances}
+
+    async def table(self, sources: Sequence[Point], destinations: Sequence[Point]) -> Dict[str, List[List[Any]]]:
+        return await asyncio.to_thread(self.table_sync, sources, destinations)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "nodes": self.graph.node_count,
+            "edges": self.graph.edge_count,
+            "queries": self._queries,
+        }
@@ -0,0 +1,57 @@
+from typing import List, Dict, Any, Optional
+import httpx
+import logging
+from app.core.config import get_settings
+from app.models.route import Coordinates
+from app.services.resilience import UpstreamUnavailableError
+from app.services.routing import get_routing_backend
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def get_matrix(
+    origins: List[Coordinates],
+    destinations: Optional[List[Coordinates]] = None
+) -> Dict[str, Any]:
+    """Get distances and durations between every origin and destination from the routing backend.
+
+    Results are flattened row-major: the value for origin ``i`` and
+    destination ``j`` is at ``i * cols + j``. Unreachable pairs are ``None``.
+    """
+    if destinations is None:
+        destinations = origins
+    rows, cols = len(origins), len(destinations)
+
+    try:
+        if rows == 0 or cols == 0:
+            raise ValueError("At least one origin and one destination are required")
+        if rows * cols > settings.MATRIX_MAX_ELEMENTS:
+            raise ValueError(f"Matrix of {rows}x{cols} exceeds the maximum of {settings.MATRIX_MAX_ELEMENTS} elements")
+
+        for c in [*origins, *destinations]:
+            if not (-90 <= c.latitude <= 90 and -180 <= c.longitude <= 180):
+                raise ValueError(f"Invalid coordinates: ({c.latitude}, {c.longitude})")
+
+        table = await get_routing_backend().table(
+            [(c.latitude, c.longitude) for c in origins],
+            [(c.latitude, c.longitude) for c in destinations]
+        )
+        return {
+            "rows": rows,
+            "cols": cols,
+            "durations": [value for row in table["durations"] for value in row],
+            "distances": [value for row in table["distances"] for value in row],
+        }
+
+    except ValueError as e:
+        logger.error("Matrix error: %s", e)
+        raise
+    except httpx.HTTPStatusError as e:
+        error_msg = f"HTTP error {e.response.status_code}: {e.response.text}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    except httpx.RequestError as e:
+        error_msg = f"Request error: {str(e)}"
+        logger.error(error_msg)
+        raise UpstreamUnavailableError(error_msg)
@@ -1,12 +1,487 @@
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Optional, Sequence
+import asyncio
 import httpx
 import logging
+import time
 from app.core.config import get_settings
+from app.core.log import sampled
+from app.core.metrics import record_stage
 from app.models.route import Coordinates, Route, RouteError, Waypoint
+from app.models.geometry import Geometry
+from app.services.balancer import LoadBalancer, parse_endpoint
+from app.services.resilience import (
+    CircuitBreaker, LatencyTracker, RetryBudget, UpstreamUnavailableError, backoff_delay
+)
+from app.services.routing import Point, RoutingBackend, get_routing_backend
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to DEBUG level
+
+
+class OSRMClient:
+    """Application-scoped OSRM HTTP client backed by a shared connection pool."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        profile: Optional[str] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.healthy = True
+        self.health_failures = 0
+        self.max_connections = max_connections
+        self.http2 = http2 and self._h2_available()
+        if http2 and not self.http2:
+            logger.warning("OSRM_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+        self._pool_waits = 0
+
+    @staticmethod
+    def _h2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """Issue a GET against the OSRM server through the shared pool."""
+        if self._in_flight >= self.max_connections:
+            # Every pooled connection is busy, so this request queues inside the pool
+            self._pool_waits += 1
+        self._in_flight += 1
+        self._requests_total += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            return await self._client.get(path, params=params)
+        finally:
+            self._in_flight -= 1
+
+    async def probe(self, profile: str, timeout: float) -> bool:
+        """Health check: whether the server answers a minimal ``/nearest`` query without a 5xx."""
+        try:
+            response = await self._client.get(f"/nearest/v1/{profile}/0,0", timeout=timeout)
+        except httpx.HTTPError:
+            return False
+        return response.status_code < 500
+
+    def stats(self) -> Dict[str, Any]:
+        """Return connection-pool usage counters."""
+        pool = getattr(self._client._transport, "_pool", None)
+        connections = pool.connections if pool is not None else []
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "base_url": self.base_url,
+            "profile": self.profile,
+            "healthy": self.healthy,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "requests_total": self._requests_total,
+            "pool_waits": self._pool_waits,
+            "latency_p95": self.latency.quantile(0.95),
+            "latency_ewma": self.latency.ewma,
+            "breaker": self.breaker.stats(),
+        }
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_pool: Optional[LoadBalancer] = None
+_hedge_client: Optional[OSRMClient] = None
+_hedges = {"sent": 0, "won": 0}
+
+
+def create_osrm_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    base_url: Optional[str] = None,
+    profile: Optional[str] = None
+) -> OSRMClient:
+    """Build an OSRM client from the application settings.
+
+    ``transport`` replaces the network transport, e.g. with a fake OSRM server in benchmarks.
+    """
+    return OSRMClient(
+        base_url=base_url or settings.OSRM_SERVER_URL,
+        timeout=settings.OSRM_TIMEOUT,
+        max_connections=settings.OSRM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OSRM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OSRM_KEEPALIVE_EXPIRY,
+        http2=settings.OSRM_HTTP2,
+        transport=transport,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.OSRM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.OSRM_BREAKER_RESET_TIMEOUT,
+        ),
+        profile=profile,
+    )
+
+
+def create_osrm_pool(transport: Optional[httpx.AsyncBaseTransport] = None) -> LoadBalancer:
+    """Build the balancer over ``OSRM_SERVER_URLS``, or just ``OSRM_SERVER_URL`` when that is empty."""
+    entries = settings.OSRM_SERVER_URLS or [settings.OSRM_SERVER_URL]
+    return LoadBalancer(
+        [create_osrm_client(transport, url, profile) for profile, url in map(parse_endpoint, entries)],
+        default_profile=settings.OSRM_PROFILE,
+        strategy=settings.OSRM_BALANCER,
+        health_check_interval=settings.OSRM_HEALTH_CHECK_INTERVAL,
+        health_check_timeout=settings.OSRM_HEALTH_CHECK_TIMEOUT,
+        unhealthy_threshold=settings.OSRM_UNHEALTHY_THRESHOLD,
+    )
+
+
+async def init_osrm_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> LoadBalancer:
+    """Create the shared OSRM clients and start health checks. Called from the application lifespan."""
+    global _pool, _hedge_client
+    if transport is not None:
+        await close_osrm_client()
+    if _pool is None or _pool.is_closed:
+        _pool = create_osrm_pool(transport)
+    _pool.start()
+    if settings.OSRM_HEDGE_URL and (_hedge_client is None or _hedge_client.is_closed):
+        _hedge_client = create_osrm_client(transport, settings.OSRM_HEDGE_URL)
+    return _pool
+
+
+async def close_osrm_client() -> None:
+    """Stop health checks and close the shared OSRM clients and their pooled connections."""
+    global _pool, _hedge_client
+    if _pool is not None:
+        await _pool.close()
+    if _hedge_client is not None:
+        await _hedge_client.close()
+    _pool = _hedge_client = None
+
+
+def get_osrm_pool() -> LoadBalancer:
+    """Get the shared OSRM balancer, creating it lazily (without health checks) outside the app lifespan."""
+    global _pool
+    if _pool is None or _pool.is_closed:
+        _pool = create_osrm_pool()
+    return _pool
+
+
+def get_hedge_client() -> Optional[OSRMClient]:
+    """Get the client for ``OSRM_HEDGE_URL``, or ``None`` when hedging is off."""
+    global _hedge_client
+    if settings.OSRM_HEDGE_URL and (_hedge_client is None or _hedge_client.is_closed):
+        _hedge_client = create_osrm_client(base_url=settings.OSRM_HEDGE_URL)
+    return _hedge_client
+
+
+@lru_cache()
+def get_retry_budget() -> RetryBudget:
+    """Get the process-wide budget shared by OSRM retries and hedges."""
+    return RetryBudget(
+        ratio=settings.OSRM_RETRY_BUDGET_RATIO,
+        min_per_second=settings.OSRM_RETRY_BUDGET_MIN_PER_SECOND,
+    )
+
+
+def _is_retryable(response: httpx.Response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+async def _attempt(client: OSRMClient, path: str, params: Optional[Dict[str, Any]]) -> httpx.Response:
+    """One call to one OSRM server, recorded on its circuit breaker.
+
+    Connection errors, timeouts, undecodable responses and 5xx/429 responses
+    raise and count as failures; any other response (including OSRM's 400
+    "NoRoute") is returned. A call that ends any other way, such as being
+    cancelled, gives back the half-open trial slot it may hold. Every call's
+    time, however it ended, goes into the server's latency.
+    """
+    if not client.breaker.allow():
+        raise UpstreamUnavailableError(
+            f"OSRM server {client.base_url} is unavailable (circuit open)",
+            retry_after=client.breaker.retry_after,
+        )
+    started = time.monotonic()
+    try:
+        try:
+            response = await client.get(path, params=params)
+        except httpx.RequestError:
+            client.breaker.record_failure()
+            raise
+        except BaseException:
+            client.breaker.release()
+            raise
+        if _is_retryable(response):
+            client.breaker.record_failure()
+            response.raise_for_status()
+        client.breaker.record_success()
+        return response
+    finally:
+        # Failed and cancelled calls count too: a server that times out must not look fast
+        client.latency.observe(time.monotonic() - started)
+
+
+def _hedge_delay(client: OSRMClient) -> float:
+    if len(client.latency) < 20:
+        return settings.OSRM_HEDGE_DELAY
+    return client.latency.quantile(settings.OSRM_HEDGE_QUANTILE)
+
+
+async def _hedged_get(primary: OSRMClient, path: str, params: Optional[Dict[str, Any]]) -> httpx.Response:
+    """Call ``primary``; if it is slower than its recent p95 (or fails), race the hedge server."""
+    hedge = get_hedge_client()
+    if hedge is None:
+        return await _attempt(primary, path, params)
+
+    tasks = [asyncio.ensure_future(_attempt(primary, path, params))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=_hedge_delay(primary))
+        if (not done or tasks[0].exception() is not None) and get_retry_budget().withdraw():
+            _hedges["sent"] += 1
+            tasks.append(asyncio.ensure_future(_attempt(hedge, path, params)))
+
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        _hedges["won"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def osrm_get(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    profile: Optional[str] = None
+) -> httpx.Response:
+    """GET from OSRM with load balancing, circuit breaking, budgeted jittered retries and optional hedging.
+
+    Each attempt goes to a server for ``profile`` (default ``OSRM_PROFILE``) that
+    has not failed this call yet, if there is one. Raises ``UpstreamUnavailableError``
+    once OSRM is unreachable, overloaded or failing fast; client errors such as
+    400 responses are returned as-is.
+    """
+    pool = get_osrm_pool()
+    profile = profile or settings.OSRM_PROFILE
+    budget = get_retry_budget()
+    budget.deposit()
+    tried: set = set()
+    attempt = 0
+    while True:
+        endpoint = pool.pick(profile, exclude=tried)
+        tried.add(endpoint)
+        try:
+            return await _hedged_get(endpoint, path, params)
+        except UpstreamUnavailableError:
+            # This server's circuit is open; move on while other servers remain untried
+            if len(tried) >= len(pool.for_profile(profile)):
+                raise
+        except (httpx.RequestError, httpx.HTTPStatusError) as e:
+            if attempt >= settings.OSRM_RETRY_ATTEMPTS or not budget.withdraw():
+                detail = (
+                    f"HTTP {e.response.status_code}" if isinstance(e, httpx.HTTPStatusError)
+                    else f"{type(e).__name__}: {str(e) or 'no details'}"
+                )
+                raise UpstreamUnavailableError(f"OSRM request failed after {attempt + 1} attempts ({detail})") from e
+            attempt += 1
+            delay = backoff_delay(attempt, settings.OSRM_RETRY_BACKOFF, settings.OSRM_RETRY_BACKOFF_MAX)
+            logger.warning("OSRM call to %s failed (%s), retry %d in %.3fs", endpoint.base_url, type(e).__name__, attempt, delay)
+            await asyncio.sleep(delay)
+
+
+def resilience_stats() -> Dict[str, Any]:
+    """Report retry-budget, hedging and per-server circuit-breaker state."""
+    hedge = get_hedge_client()
+    return {
+        "retry_budget": get_retry_budget().stats(),
+        "hedges": dict(_hedges),
+        "breakers": {
+            client.base_url: client.breaker.stats()
+            for client in [*get_osrm_pool().endpoints, hedge] if client is not None
+        },
+    }
+
+
+async def _fetch_route(coordinates: str) -> Dict[str, Any]:
+    """Request a route for a pre-formatted OSRM coordinate string (lon,lat;lon,lat...)."""
+    path = f"/route/v1/{settings.OSRM_PROFILE}/{coordinates}"
+    params = {
+        "overview": "full",
+        "geometries": "geojson",
+        "steps": "false",
+        "alternatives": "false"
+    }
+
+    with record_stage("osrm_route", "osrm_request"):
+        response = await osrm_get(path, params=params)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("OSRM %s -> %d", response.request.url, response.status_code, extra=sampled())
+
+    response.raise_for_status()
+    with record_stage("osrm_route", "json_parse"):
+        data = response.json()
+
+    if data.get("code") != "Ok":
+        error_msg = f"OSRM error: {data.get('code', 'Unknown error')} - {data.get('message', 'No message')}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    if not data.get("routes") or len(data["routes"]) == 0:
+        error_msg = "No route found"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    route = data["routes"][0]
+    if not route.get("geometry") or not route["geometry"].get("coordinates"):
+        error_msg = "Invalid route geometry"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    # Convert OSRM coordinates (lon,lat) to our format (lat,lon) in one array
+    with record_stage("osrm_route", "geometry_convert"):
+        geometry = Geometry.from_osrm(route["geometry"]["coordinates"])
+
+    if len(geometry) == 0:
+        error_msg = "No coordinates in route"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    result = {
+        "route": geometry,
+        "distance": route.get("distance", 0),  # in meters
+        "duration": route.get("duration", 0),  # in seconds
+    }
+    logger.debug("Route calculated with %d points", len(geometry), extra=sampled())
+    return result
+
+
+def plan_tiles(n_sources: int, n_destinations: int, max_coordinates: int) -> List[Tuple[range, range]]:
+    """Split an N x M matrix into tiles whose source + destination count fits OSRM's table limit."""
+    if max_coordinates < 2:
+        raise ValueError("OSRM table limit must allow at least two coordinates")
+
+    rows_per_tile = min(n_sources, max_coordinates // 2)
+    cols_per_tile = min(n_destinations, max_coordinates - rows_per_tile)
+    # Give any budget left over by a short destination list back to the sources
+    rows_per_tile = min(n_sources, max_coordinates - cols_per_tile)
+
+    return [
+        (range(r, min(r + rows_per_tile, n_sources)), range(c, min(c + cols_per_tile, n_destinations)))
+        for r in range(0, n_sources, rows_per_tile)
+        for c in range(0, n_destinations, cols_per_tile)
+    ]
+
+
+async def _fetch_tile(
+    sources: Sequence[Point],
+    destinations: Sequence[Point],
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """Query OSRM /table for one tile. Sources come first in the coordinate list."""
+    # OSRM expects coordinates as lon,lat
+    coordinates = ";".join(f"{lon},{lat}" for lat, lon in [*sources, *destinations])
+    path = f"/table/v1/{settings.OSRM_PROFILE}/{coordinates}"
+    params = {
+        "sources": ";".join(str(i) for i in range(len(sources))),
+        "destinations": ";".join(str(len(sources) + i) for i in range(len(destinations))),
+        "annotations": "duration,distance",
+    }
+
+    async with semaphore:
+        with record_stage("matrix", "osrm_request"):
+            response = await osrm_get(path, params=params)
+    response.raise_for_status()
+    with record_stage("matrix", "json_parse"):
+        data = response.json()
+
+    if data.get("code") != "Ok":
+        raise ValueError(f"OSRM error: {data.get('code', 'Unknown error')} - {data.get('message', 'No message')}")
+    if "durations" not in data:
+        raise ValueError("OSRM table response is missing durations")
+    return data
+
+
+class OSRMBackend(RoutingBackend):
+    """Routes from the OSRM HTTP API through the shared client."""
+
+    name = "osrm"
+
+    @property
+    def cache_namespace(self) -> str:
+        return settings.OSRM_PROFILE
+
+    async def route(self, points: Sequence[Point]) -> Dict[str, Any]:
+        # OSRM expects coordinates as lon,lat
+        return await _fetch_route(";".join(f"{lon},{lat}" for lat, lon in points))
+
+    async def table(self, sources: Sequence[Point], destinations: Sequence[Point]) -> Dict[str, List[List[Any]]]:
+        """Matrices from OSRM /table, split into tiles that respect ``OSRM_TABLE_MAX_COORDINATES``.
+
+        Tiles are fetched ``OSRM_TABLE_CONCURRENCY`` at a time. OSRM leaves
+        unreachable pairs as ``null``.
+        """
+        rows, cols = len(sources), len(destinations)
+        tiles = plan_tiles(rows, cols, settings.OSRM_TABLE_MAX_COORDINATES)
+        logger.debug("Calculating %dx%d matrix in %d tiles", rows, cols, len(tiles))
+
+        semaphore = asyncio.Semaphore(settings.OSRM_TABLE_CONCURRENCY)
+        results = await asyncio.gather(*(
+            _fetch_tile([sources[i] for i in tile_rows], [destinations[j] for j in tile_cols], semaphore)
+            for tile_rows, tile_cols in tiles
+        ))
+
+        durations: List[List[Any]] = [[None] * cols for _ in range(rows)]
+        distances: List[List[Any]] = [[None] * cols for _ in range(rows)]
+        for (tile_rows, tile_cols), data in zip(tiles, results):
+            tile_distances = data.get("distances")
+            for k, i in enumerate(tile_rows):
+                durations[i][tile_cols.start:tile_cols.stop] = data["durations"][k]
+                if tile_distances is not None:
+                    distances[i][tile_cols.start:tile_cols.stop] = tile_distances[k]
+        return {"durations": durations, "distances": distances}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "profile": settings.OSRM_PROFILE}
+
 
 async def get_route(origin: str, destination: str) -> Dict[str, Any]:
     """Get a route from OSRM service."""
@@ -16,73 +491,17 @@ async def get_route(origin: str, destination: str) -> Dict[str, Any]:
         dest_lat, dest_lon = map(float, destination.split(','))
 
         # Log coordinates for debugging
-        logger.debug(f"Calculating route from ({origin_lat}, {origin_lon}) to ({dest_lat}, {dest_lon})")
+        logger.debug("Calculating route from (%s, %s) to (%s, %s)", origin_lat, origin_lon, dest_lat, dest_lon)
 
         # Validate coordinates
         if not (-90 <= origin_lat <= 90 and -180 <= origin_lon <= 180 and
                 -90 <= dest_lat <= 90 and -180 <= dest_lon <= 180):
             raise ValueError("Invalid coordinates")
 
-        # Build OSRM request URL - Note: OSRM expects coordinates as lon,lat
-        coordinates = f"{origin_lon},{origin_lat};{dest_lon},{dest_lat}"
-        url = f"{settings.OSRM_SERVER_URL}/route/v1/driving/{coordinates}"
-        params = {
-            "overview": "full",
-            "geometries": "geojson",
-            "steps": "false",
-            "alternatives": "false"
-        }
-
-        full_url = f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-        logger.debug(f"Full OSRM request URL: {full_url}")
-
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            logger.debug("Sending request to OSRM server...")
-            response = await client.get(url, params=params)
-            logger.debug(f"OSRM response status: {response.status_code}")
-            
-            response.raise_for_status()
-            data = response.json()
-
-            logger.debug(f"OSRM response code: {data.get('code')}")
-
-            if data.get("code") != "Ok":
-                error_msg = f"OSRM error: {data.get('code', 'Unknown error')} - {data.get('message', 'No message')}"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            if not data.get("routes") or len(data["routes"]) == 0:
-                error_msg = "No route found"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            route = data["routes"][0]
-            if not route.get("geometry") or not route["geometry"].get("coordinates"):
-                error_msg = "Invalid route geometry"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            # Convert OSRM coordinates (lon,lat) to our format (lat,lon)
-            coordinates = [
-                Coordinates(latitude=coord[1], longitude=coord[0])
-                for coord in route["geometry"]["coordinates"]
-            ]
-
-            if not coordinates:
-                error_msg = "No coordinates in route"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            result = {
-                "route": coordinates,
-                "distance": route.get("distance", 0),  # in meters
-                "duration": route.get("duration", 0),  # in seconds
-            }
-            logger.debug(f"Route calculated successfully with {len(coordinates)} points")
-            return result
+        return await get_routing_backend().route([(origin_lat, origin_lon), (dest_lat, dest_lon)])
 
     except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
+        logger.warning("Validation error: %s", e)
         raise
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error {e.response.status_code}: {e.response.text if hasattr(e.response, 'text') else str(e)}"
@@ -91,86 +510,30 @@ async def get_route(origin: str, destination: str) -> Dict[str, Any]:
     except httpx.RequestError as e:
         error_msg = f"Request error: {str(e)}"
         logger.error(error_msg)
-        raise ValueError(error_msg)
+        raise UpstreamUnavailableError(error_msg)
     except Exception as e:
         error_msg = f"Failed to calculate route: {str(e)}"
         logger.error(error_msg)
         raise ValueError(error_msg)
 
 async def get_route_with_waypoints(waypoints: List[Waypoint]) -> Dict[str, Any]:
-    """Get a route from OSRM service with multiple waypoints."""
+    """Get a route with multiple waypoints from the configured routing backend."""
     try:
         # Validate coordinates
-        for wp in waypoints:
-            lat = wp.coordinates.latitude
-            lon = wp.coordinates.longitude
-            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
-                raise ValueError(f"Invalid coordinates for waypoint: ({lat}, {lon})")
-
-        # Build OSRM request URL - Note: OSRM expects coordinates as lon,lat
-        coordinates = ";".join(
-            f"{wp.coordinates.longitude},{wp.coordinates.latitude}"
-            for wp in waypoints
-        )
-        
-        url = f"{settings.OSRM_SERVER_URL}/route/v1/driving/{coordinates}"
-        params = {
-            "overview": "full",
-            "geometries": "geojson",
-            "steps": "false",
-            "alternatives": "false"
-        }
-
-        full_url = f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-        logger.debug(f"Full OSRM request URL: {full_url}")
+        with record_stage("get_route_with_waypoints", "validate"):
+            for wp in waypoints:
+                lat = wp.coordinates.latitude
+                lon = wp.coordinates.longitude
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                    raise ValueError(f"Invalid coordinates for waypoint: ({lat}, {lon})")
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            logger.debug("Sending request to OSRM server...")
-            response = await client.get(url, params=params)
-            logger.debug(f"OSRM response status: {response.status_code}")
-            
-            response.raise_for_status()
-            data = response.json()
-
-            logger.debug(f"OSRM response code: {data.get('code')}")
-
-            if data.get("code") != "Ok":
-                error_msg = f"OSRM error: {data.get('code', 'Unknown error')} - {data.get('message', 'No message')}"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            if not data.get("routes") or len(data["routes"]) == 0:
-                error_msg = "No route found"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            route = data["routes"][0]
-            if not route.get("geometry") or not route["geometry"].get("coordinates"):
-                error_msg = "Invalid route geometry"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            # Convert OSRM coordinates (lon,lat) to our format (lat,lon)
-            coordinates = [
-                Coordinates(latitude=coord[1], longitude=coord[0])
-                for coord in route["geometry"]["coordinates"]
-            ]
-
-            if not coordinates:
-                error_msg = "No coordinates in route"
-                logger.error(error_msg)
-                raise ValueError(error_msg)
-
-            result = {
-                "route": coordinates,
-                "distance": route.get("distance", 0),  # in meters
-                "duration": route.get("duration", 0),  # in seconds
-            }
-            logger.debug(f"Route calculated successfully with {len(coordinates)} points")
-            return result
+        with record_stage("get_route_with_waypoints", "backend_route"):
+            return await get_routing_backend().route(
+                [(wp.coordinates.latitude, wp.coordinates.longitude) for wp in waypoints]
+            )
 
     except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
+        logger.warning("Validation error: %s", e)
         raise
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error {e.response.status_code}: {e.response.text if hasattr(e.response, 'text') else str(e)}"
@@ -179,8 +542,8 @@ async def get_route_with_waypoints(waypoints: List[Waypoint]) -> Dict[str, Any]:
     except httpx.RequestError as e:
         error_msg = f"Request error: {str(e)}"
         logger.error(error_msg)
-        raise ValueError(error_msg)
+        raise UpstreamUnavailableError(error_msg)
     except Exception as e:
         error_msg = f"Failed to calculate route: {str(e)}"
         logger.error(error_msg)
-        raise ValueError(error_msg) 
\ No newline at end of file
+        raise ValueError(error_msg)
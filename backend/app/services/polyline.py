@@ -0,0 +1,61 @@
+from typing import Iterable, List, Sequence, Tuple
+import numpy as np
+
+
+def _quantize(points: np.ndarray, precision: int) -> np.ndarray:
+    # Round half away from zero, as in the reference polyline algorithm
+    scaled = points * (10 ** precision)
+    return (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+
+
+def encode(points: Iterable[Sequence[float]], precision: int = 5) -> str:
+    """Encode (latitude, longitude) pairs with the Google encoded polyline algorithm.
+
+    Use ``precision=6`` for OSRM geometries, which carry six decimal places.
+    """
+    array = np.asarray(list(points) if not isinstance(points, np.ndarray) else points, dtype=float)
+    if array.size == 0:
+        return ""
+
+    values = np.diff(_quantize(array.reshape(-1, 2), precision), axis=0, prepend=[[0, 0]]).ravel()
+    chunks = []
+    for value in values.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_array(encoded: str, precision: int = 5) -> np.ndarray:
+    """Decode an encoded polyline into an (N, 2) array of (latitude, longitude)."""
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        if byte < 0 or byte > 0x3F:
+            raise ValueError(f"Invalid character in encoded polyline: {char!r}")
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    if shift or len(values) % 2:
+        raise ValueError("Truncated encoded polyline")
+
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / (10 ** precision)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Decode an encoded polyline into a list of (latitude, longitude) tuples."""
+    return [tuple(point) for point in decode_array(encoded, precision).tolist()]
+
+
+def is_lossless(points: Iterable[Sequence[float]], precision: int) -> bool:
+    """Whether ``points`` survive an encode/decode round trip at ``precision`` unchanged."""
+    array = np.asarray(list(points) if not isinstance(points, np.ndarray) else points, dtype=float)
+    if array.size == 0:
+        return True
+    return bool(np.array_equal(decode_array(encode(array, precision), precision), array.reshape(-1, 2)))
@@ -0,0 +1,50 @@
+"""Zoom-level geometry pyramids for saved routes.
+
+Each level is the route simplified so that it deviates from the full geometry by
+at most ``pixels`` screen pixels at that web-map zoom, stored as a precision-6
+polyline. A map showing a whole country needs a few dozen points of a route, not
+the thousands OSRM returns.
+"""
+from typing import Dict, Iterable, Optional
+import math
+import numpy as np
+from app.services import polyline
+from app.services.simplify import simplify_mask
+
+# Precision of stored levels; 1e-6 degrees is far below a pixel at any zoom
+LEVEL_POLYLINE_PRECISION = 6
+
+# Web Mercator ground resolution at zoom 0 on the equator, in meters per 256 px tile pixel
+_METERS_PER_PIXEL_Z0 = 2 * math.pi * 6378137.0 / 256
+
+
+def zoom_tolerance(zoom: int, latitude: float, pixels: float = 1.0) -> float:
+    """Meters covered by ``pixels`` screen pixels at ``zoom`` and ``latitude``."""
+    return _METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2 ** zoom * pixels
+
+
+def build_levels(latlon: np.ndarray, zooms: Iterable[int], pixels: float = 1.0) -> Dict[str, str]:
+    """Encoded polylines per zoom level, keyed by the zoom as a string (JSON object keys).
+
+    Levels are simplified from the next finer one, coarsest last. A level that
+    would keep every point of the finer one is left out, since that one serves
+    its zoom just as well.
+    """
+    levels: Dict[str, str] = {}
+    if len(latlon) <= 2:
+        return levels
+    latitude = float(np.mean(latlon[[0, -1], 0]))
+    current = latlon
+    for zoom in sorted(set(zooms), reverse=True):
+        keep = simplify_mask(current, zoom_tolerance(zoom, latitude, pixels))
+        if keep.all():
+            continue
+        current = current[keep]
+        levels[str(zoom)] = polyline.encode(current, LEVEL_POLYLINE_PRECISION)
+    return levels
+
+
+def pick_level(levels: Dict[str, str], zoom: int) -> Optional[str]:
+    """Zoom of the coarsest stored level detailed enough for ``zoom``, or None for the full geometry."""
+    detailed_enough = [int(level) for level in levels if int(level) >= zoom]
+    return str(min(detailed_enough)) if detailed_enough else None
@@ -0,0 +1,159 @@
+from collections import deque
+from typing import Any, Dict, Optional
+import random
+import time
+
+
+class UpstreamUnavailableError(ValueError):
+    """The routing upstream failed or is shedding load, as opposed to a bad request.
+
+    Subclasses ``ValueError`` so existing handlers keep working; endpoints map it
+    to ``503 Service Unavailable`` with ``retry_after`` as the ``Retry-After`` hint.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream.
+
+    Closed: calls pass. After ``failure_threshold`` failures in a row it opens and
+    calls fail fast for ``reset_timeout`` seconds. It then half-opens and lets a
+    single trial call through; success closes it, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a trial call through."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a trial slot taken by a call that was cancelled before it finished."""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """Caps retries at a fraction of recent requests so retries can't amplify an outage.
+
+    Every request deposits ``ratio`` tokens and every retry (or hedge) spends one.
+    ``min_per_second`` tokens are added over time so low-traffic periods can still
+    retry. The balance never exceeds ``max_tokens``.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self.deposits = 0
+        self.withdrawals = 0
+        self.rejected = 0
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + amount + (now - self._updated) * self.min_per_second, self.max_tokens)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self.deposits += 1
+        self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.withdrawals += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "requests": self.deposits,
+            "retries": self.withdrawals,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies in seconds, plus their EWMA."""
+
+    def __init__(self, window: int = 500, alpha: float = 0.2):
+        self._samples: "deque[float]" = deque(maxlen=window)
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else self.ewma + self.alpha * (seconds - self.ewma)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+    return random.uniform(0.0, min(cap, base * 2 ** (attempt - 1)))
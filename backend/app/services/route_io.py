@@ -0,0 +1,257 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import numpy as np
+import asyncio
+import json
+import logging
+import uuid
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer_group
+from app.core.config import get_settings
+from app.core.responses import dumps
+from app.db.chunks import load_route_geometry
+from app.db.database import SessionLocal
+from app.db.models import RouteModel, store_route_chunks
+from app.models.geometry import Geometry
+from app.models.route import (
+    GeometryFormat, Route, RouteImport, RouteImportError, RouteImportResponse, apply_geometry_format
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (attribute, column) pairs, so rows built through the ORM can be inserted with Core
+_COLUMNS = [(attr.key, attr.columns[0].name) for attr in RouteModel.__mapper__.column_attrs]
+
+# Column values of one imported route, and the geometry chunks it references
+ParsedRecord = Tuple[Dict[str, Any], Dict[str, np.ndarray]]
+
+# Export output is sent in chunks of about this many characters rather than per row
+_EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, holding at most one partial line in memory."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'record'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+
+def _record_from_feature(feature: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a GeoJSON Feature, as written by the GeoJSON export, into an import record."""
+    record = dict(feature.get("properties") or {})
+    geometry = feature.get("geometry")
+    if geometry is None:
+        record["route"] = []
+    elif geometry.get("type") == "LineString":
+        record["route"] = Geometry.from_osrm(geometry.get("coordinates", []))
+    else:
+        raise ValueError("Feature geometry must be a LineString")
+    return record
+
+
+def parse_record(line: bytes) -> ParsedRecord:
+    """Validate one NDJSON line and return the column values to insert for it.
+
+    With chunked storage, also returns the geometry chunks the row references.
+
+    A line is a saved route (``RouteCreate`` fields, plus optional ``id`` and
+    ``created_at``) or a GeoJSON Feature with a LineString geometry.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object")
+    if data.get("type") == "Feature":
+        data = _record_from_feature(data)
+    record = RouteImport.model_validate(data)
+
+    created_at = record.created_at or datetime.utcnow()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    # Build the row through the model so geometry storage and validation match create_route_db
+    model = RouteModel(
+        id=str(record.id or uuid.uuid4()),
+        title=record.title,
+        description=record.description,
+        origin=record.origin.model_dump(),
+        destination=record.destination.model_dump(),
+        waypoints=[wp.model_dump() for wp in record.waypoints],
+        route=record.route,
+        distance=record.distance,
+        duration=record.duration,
+        created_at=created_at,
+    )
+    return {column: getattr(model, key) for key, column in _COLUMNS}, model.__dict__.get("_pending_chunks") or {}
+
+
+def parse_records(lines: List[Tuple[int, bytes]]) -> Tuple[List[Tuple[int, ParsedRecord]], List[RouteImportError]]:
+    """Parse numbered NDJSON lines; returns the valid records and the errors of the others."""
+    records, errors = [], []
+    for line_number, line in lines:
+        try:
+            records.append((line_number, parse_record(line)))
+        except (ValueError, TypeError, KeyError) as e:
+            errors.append(RouteImportError(line=line_number, error=_describe(e)))
+    return records, errors
+
+
+async def _insert_rows(db: AsyncSession, rows: List[Tuple[int, ParsedRecord]]) -> List[RouteImportError]:
+    """Insert a batch in one transaction; on a conflict, retry row by row to find the bad records."""
+    table = RouteModel.__table__
+
+    async def insert_records(records: List[ParsedRecord]) -> None:
+        chunks = {digest: chunk for _, record_chunks in records for digest, chunk in record_chunks.items()}
+        if chunks:
+            # Chunks go in first so the insert triggers can count the routes' references
+            await db.run_sync(lambda session: store_route_chunks(session.connection(), chunks))
+        await db.execute(insert(table), [row for row, _ in records])
+        await db.commit()
+
+    try:
+        await insert_records([record for _, record in rows])
+        return []
+    except IntegrityError:
+        await db.rollback()
+
+    errors = []
+    for line_number, record in rows:
+        try:
+            await insert_records([record])
+        except IntegrityError as e:
+            await db.rollback()
+            errors.append(RouteImportError(line=line_number, error=f"Conflicts with a saved route: {e.orig}"))
+    return errors
+
+
+async def import_routes(db: AsyncSession, chunks: AsyncIterator[bytes]) -> RouteImportResponse:
+    """Bulk-insert saved routes from an NDJSON byte stream.
+
+    Lines are read ``ROUTE_IMPORT_BATCH_SIZE`` at a time and parsed in a worker
+    thread, since building a route's stored geometry (zoom levels, chunks) is
+    CPU-bound. Each batch's valid records are inserted in one transaction and one
+    executemany. Invalid or conflicting records are skipped and reported by line
+    number; they don't stop the import.
+    """
+    imported = 0
+    errors: List[RouteImportError] = []
+    batch: List[Tuple[int, bytes]] = []
+
+    async def flush() -> None:
+        nonlocal imported
+        records, invalid = await asyncio.to_thread(parse_records, batch)
+        errors.extend(invalid)
+        if records:
+            failed = await _insert_rows(db, records)
+            imported += len(records) - len(failed)
+            errors.extend(failed)
+        batch.clear()
+
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        batch.append((line_number, line))
+        if len(batch) >= settings.ROUTE_IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda error: error.line)
+    logger.info("Imported %d routes, %d failed", imported, len(errors))
+    return RouteImportResponse(imported=imported, failed=len(errors), errors=errors)
+
+
+async def _stream_routes() -> AsyncIterator[RouteModel]:
+    """Every saved route, oldest first, read through a server-side cursor.
+
+    Uses its own session so the stream outlives the request handler.
+    """
+    query = (
+        select(RouteModel)
+        .options(undefer_group("geometry"))
+        .order_by(RouteModel.created_at, RouteModel.id)
+        .execution_options(yield_per=settings.ROUTE_EXPORT_BATCH_SIZE)
+    )
+    async with SessionLocal() as session:
+        result = await session.stream_scalars(query)
+        try:
+            async for batch in result.partitions():
+                await load_route_geometry(session, batch)
+                for route in batch:
+                    yield route
+        finally:
+            await result.close()
+
+
+async def _chunked(parts: AsyncIterator[str]) -> AsyncIterator[str]:
+    buffer: List[str] = []
+    size = 0
+    async for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= _EXPORT_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def route_feature(route: RouteModel) -> Dict[str, Any]:
+    """A saved route as a GeoJSON Feature, for ``dumps``; routes with fewer than two points have no geometry."""
+    geometry = route.route
+    return {
+        "type": "Feature",
+        "id": route.id,
+        "geometry": (
+            {"type": "LineString", "coordinates": np.ascontiguousarray(geometry.latlon[:, ::-1])}
+            if len(geometry) >= 2 else None
+        ),
+        "properties": {
+            "id": route.id,
+            "title": route.title,
+            "description": route.description,
+            "origin": route.origin,
+            "destination": route.destination,
+            "waypoints": route.waypoints,
+            "distance": route.distance,
+            "duration": route.duration,
+            "created_at": route.created_at.isoformat() if route.created_at else None,
+        },
+    }
+
+
+def export_ndjson(geometry_format: GeometryFormat = "coordinates") -> AsyncIterator[str]:
+    """Stream every saved route as one JSON object per line."""
+    async def lines() -> AsyncIterator[str]:
+        async for route in _stream_routes():
+            yield dumps(apply_geometry_format(Route.model_validate(route), geometry_format)).decode() + "\n"
+    return _chunked(lines())
+
+
+def export_geojson() -> AsyncIterator[str]:
+    """Stream every saved route as a GeoJSON FeatureCollection."""
+    async def parts() -> AsyncIterator[str]:
+        yield '{"type":"FeatureCollection","features":['
+        separator = ""
+        async for route in _stream_routes():
+            yield separator + dumps(route_feature(route)).decode()
+            separator = ","
+        yield "]}\n"
+    return _chunked(parts())
@@ -1,13 +1,27 @@
-from typing import List, Dict, Any, Union, Optional
+from typing import List, Dict, Any, Union, Optional, AsyncIterator, Tuple
+import asyncio
 import httpx
 import logging
-from app.models.route import Coordinates, AbstractedRoute, RouteError, Waypoint, RouteRequest
+import numpy as np
+from app.models.route import (
+    Coordinates, AbstractedRoute, RouteError, Waypoint, RouteRequest, BatchRouteItem, RouteLeg,
+    RouteEditRequest, RouteEditResponse, WaypointEdit
+)
+from app.models.geometry import Geometry
 from app.core.config import get_settings
+from app.core.log import sampled
+from app.core.metrics import record_stage
 from app.services.osrm import get_route_with_waypoints
+from app.services.routing import get_routing_backend
+from app.services.cache import get_route_cache
+from app.services.singleflight import get_route_flights
+from app.services.simplify import simplify_mask
+from app.services.matrix import get_matrix
+from app.services.tsp import optimize_order
+from app.services.resilience import UpstreamUnavailableError
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 class RouteService:
     @staticmethod
@@ -29,32 +43,271 @@ class RouteService:
             return False
 
     @staticmethod
-    async def calculate_route(request: RouteRequest) -> AbstractedRoute:
-        """Calculate route with waypoints"""
+    def simplify_route(route: Geometry, request: RouteRequest) -> Geometry:
+        """Reduce the route geometry to the tolerance or point budget of the request"""
+        tolerance = request.simplify_tolerance or settings.ROUTE_SIMPLIFY_TOLERANCE
+        if tolerance is None and (request.max_points is None or len(route) <= request.max_points):
+            return route
+
+        keep = simplify_mask(route.latlon, tolerance, request.max_points, request.simplify_method)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Simplified route from %d to %d points", len(route), int(keep.sum()), extra=sampled())
+        return route[keep]
+
+    @staticmethod
+    async def optimize_waypoint_order(request: RouteRequest) -> List[int]:
+        """Order in which to visit the request's waypoints, from an OSRM duration matrix"""
+        waypoints = request.waypoints
+        if len(waypoints) > settings.ROUTE_OPTIMIZE_MAX_WAYPOINTS:
+            raise ValueError(
+                f"optimize_order supports at most {settings.ROUTE_OPTIMIZE_MAX_WAYPOINTS} waypoints, got {len(waypoints)}"
+            )
+        matrix = await get_matrix([wp.coordinates for wp in waypoints])
+        durations = np.array(matrix["durations"], dtype=float).reshape(matrix["rows"], matrix["cols"])
+
+        # The solver is CPU-bound for up to its time budget; keep it off the event loop
+        order = await asyncio.to_thread(
+            optimize_order, durations, request.fixed_start, request.fixed_end, settings.ROUTE_OPTIMIZE_TIME_BUDGET
+        )
+        logger.debug("Optimized order of %d waypoints: %s", len(waypoints), order)
+        return order
+
+    @staticmethod
+    async def _fetch_route(waypoints: List[Waypoint], cache_key: str) -> Dict[str, Any]:
+        """Fetch a route from OSRM and store it in the route cache"""
+        route_data = await get_route_with_waypoints(waypoints)
+        if settings.ROUTE_CACHE_ENABLED:
+            with record_stage("calculate_route", "cache_store"):
+                await get_route_cache().set(cache_key, {
+                    "route": route_data["route"].latlon.tolist(),
+                    "distance": route_data["distance"],
+                    "duration": route_data["duration"],
+                })
+        return route_data
+
+    @staticmethod
+    async def _get_route(waypoints: List[Waypoint]) -> Dict[str, Any]:
+        """Route through ``waypoints`` from the route cache, or from the backend on a miss.
+
+        While the backend is unavailable an expired cached copy is returned with
+        ``"stale": True`` if there is one.
+        """
+        cache = get_route_cache()
+        cache_key = cache.make_key(
+            get_routing_backend().cache_namespace,
+            ((wp.coordinates.latitude, wp.coordinates.longitude) for wp in waypoints)
+        )
+        if settings.ROUTE_CACHE_ENABLED:
+            with record_stage("calculate_route", "cache_lookup"):
+                cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Route served from cache", extra=sampled())
+                return {**cached, "route": Geometry(cached["route"])}
+
+        try:
+            # Get route from OSRM service; identical in-flight requests share one call
+            with record_stage("calculate_route", "route_fetch"):
+                if settings.ROUTE_COALESCING_ENABLED:
+                    return await get_route_flights().do(
+                        cache_key, lambda: RouteService._fetch_route(waypoints, cache_key)
+                    )
+                return await RouteService._fetch_route(waypoints, cache_key)
+        except UpstreamUnavailableError as e:
+            # Serve an expired copy rather than nothing while the upstream is down
+            cached = await cache.get_stale(cache_key) if settings.ROUTE_CACHE_ENABLED else None
+            if cached is None:
+                raise
+            logger.warning("Serving stale cached route: %s", e)
+            return {**cached, "route": Geometry(cached["route"]), "stale": True}
+
+    @staticmethod
+    async def calculate_legs(waypoints: List[Waypoint]) -> List[Dict[str, Any]]:
+        """Route each leg between consecutive waypoints on its own.
+
+        A leg is cached like a two-waypoint route, so a route that differs from an
+        earlier one by a single waypoint only fetches the legs touching it.
+        """
+        semaphore = asyncio.Semaphore(settings.ROUTE_LEG_CONCURRENCY)
+
+        async def get_leg(start: Waypoint, end: Waypoint) -> Dict[str, Any]:
+            async with semaphore:
+                return await RouteService._get_route([start, end])
+
+        tasks = [asyncio.ensure_future(get_leg(start, end)) for start, end in zip(waypoints, waypoints[1:])]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def stitch_legs(legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Join leg geometries end to end and add up their distances and durations"""
+        parts = []
+        last_point = None
+        for leg in legs:
+            latlon = leg["route"].latlon
+            # Consecutive legs share the waypoint between them; keep it once
+            if last_point is not None and len(latlon) and np.array_equal(latlon[0], last_point):
+                latlon = latlon[1:]
+            if len(latlon):
+                parts.append(latlon)
+                last_point = latlon[-1]
+        return {
+            "route": Geometry(np.concatenate(parts) if parts else np.empty((0, 2))),
+            "distance": sum(leg["distance"] for leg in legs),
+            "duration": sum(leg["duration"] for leg in legs),
+            "stale": True if any(leg.get("stale") for leg in legs) else None,
+        }
+
+    @staticmethod
+    def apply_waypoint_edit(waypoints: List[Waypoint], edit: WaypointEdit) -> Tuple[List[Waypoint], List[int]]:
+        """Waypoints after ``edit``, and the indices of the legs of the edited route that changed"""
+        count = len(waypoints)
+        index = edit.index
+        if edit.op == "remove":
+            if index >= count:
+                raise ValueError(f"Cannot remove waypoint {index} of {count}")
+            if count <= 2:
+                raise ValueError("A route needs at least two waypoints (origin and destination)")
+            # The legs on either side merge into one, unless an end waypoint was removed
+            return waypoints[:index] + waypoints[index + 1:], [index - 1] if 0 < index < count - 1 else []
+
+        if edit.waypoint is None:
+            raise ValueError(f"A {edit.op} edit needs a waypoint")
+        if edit.op == "add":
+            if index > count:
+                raise ValueError(f"Cannot add a waypoint at {index} to {count} waypoints")
+            edited = waypoints[:index] + [edit.waypoint] + waypoints[index:]
+        else:
+            if index >= count:
+                raise ValueError(f"Cannot move waypoint {index} of {count}")
+            edited = waypoints[:index] + [edit.waypoint] + waypoints[index + 1:]
+        # The legs into and out of the new or moved waypoint
+        return edited, [leg for leg in (index - 1, index) if 0 <= leg < len(edited) - 1]
+
+    @staticmethod
+    async def calculate_route(request: RouteRequest, per_leg: Optional[bool] = None) -> AbstractedRoute:
+        """Calculate route with waypoints
+
+        Routes with more than two waypoints are calculated one cached leg at a
+        time when ``per_leg`` is set (default ``ROUTE_LEGS_ENABLED``).
+        """
         try:
             if len(request.waypoints) < 2:
                 raise ValueError("At least two waypoints (origin and destination) are required")
 
-            logger.debug(f"Calculating route with {len(request.waypoints)} waypoints")
+            logger.debug("Calculating route with %d waypoints", len(request.waypoints), extra=sampled())
             
             # Validate waypoint coordinates
-            invalid_waypoints = [wp for wp in request.waypoints if not RouteService.validate_waypoint(wp)]
+            with record_stage("calculate_route", "validate"):
+                invalid_waypoints = [wp for wp in request.waypoints if not RouteService.validate_waypoint(wp)]
             if invalid_waypoints:
                 raise ValueError(f"Invalid coordinates in waypoints: {[f'({wp.coordinates.latitude}, {wp.coordinates.longitude})' for wp in invalid_waypoints]}")
 
-            # Get route from OSRM service
-            route_data = await get_route_with_waypoints(request.waypoints)
-            
+            waypoints = request.waypoints
+            waypoint_order = None
+            if request.optimize_order:
+                with record_stage("calculate_route", "optimize_order"):
+                    waypoint_order = await RouteService.optimize_waypoint_order(request)
+                waypoints = [request.waypoints[i] for i in waypoint_order]
+
+            legs = None
+            if per_leg is None:
+                per_leg = settings.ROUTE_LEGS_ENABLED
+            if per_leg and len(waypoints) > 2:
+                legs = await RouteService.calculate_legs(waypoints)
+                route_data = RouteService.stitch_legs(legs)
+            else:
+                route_data = await RouteService._get_route(waypoints)
+
             # Create and return AbstractedRoute
+            with record_stage("calculate_route", "simplify"):
+                route = RouteService.simplify_route(route_data["route"], request)
             return AbstractedRoute(
-                route=route_data["route"],
+                route=route,
                 distance=route_data["distance"],
-                duration=route_data["duration"]
+                duration=route_data["duration"],
+                legs=[RouteLeg(distance=leg["distance"], duration=leg["duration"]) for leg in legs] if legs else None,
+                waypoint_order=waypoint_order,
+                stale=route_data.get("stale")
             )
 
+        except UpstreamUnavailableError as e:
+            logger.error("Route service error: %s", e)
+            raise
         except ValueError as e:
-            logger.error(f"Route service error: {str(e)}")
+            logger.warning("Route service error: %s", e)
             raise ValueError(str(e))
         except Exception as e:
-            logger.error(f"Unexpected error in route service: {str(e)}")
-            raise ValueError(f"Route processing failed: {str(e)}") 
\ No newline at end of file
+            logger.exception("Unexpected error in route service")
+            raise ValueError(f"Route processing failed: {str(e)}") 
+
+    @staticmethod
+    async def edit_route(request: RouteEditRequest) -> RouteEditResponse:
+        """Apply one waypoint edit and recalculate only the legs it changed"""
+        if request.optimize_order:
+            raise ValueError("optimize_order cannot be combined with a waypoint edit")
+        waypoints, changed_legs = RouteService.apply_waypoint_edit(request.waypoints, request.edit)
+        route = await RouteService.calculate_route(request.model_copy(update={"waypoints": waypoints}), per_leg=True)
+        return RouteEditResponse(**dict(route), waypoints=waypoints, changed_legs=changed_legs)
+
+    @staticmethod
+    async def _calculate_batch_item(
+        index: int,
+        request: RouteRequest,
+        semaphore: asyncio.Semaphore
+    ) -> BatchRouteItem:
+        """Calculate one route of a batch, turning failures into a per-item error"""
+        async with semaphore:
+            try:
+                route = await asyncio.wait_for(
+                    RouteService.calculate_route(request),
+                    timeout=settings.BATCH_ITEM_TIMEOUT
+                )
+                return BatchRouteItem(index=index, route=route)
+            except asyncio.TimeoutError:
+                return BatchRouteItem(
+                    index=index,
+                    error=RouteError(
+                        error="timeout",
+                        details=f"Route calculation exceeded {settings.BATCH_ITEM_TIMEOUT} seconds"
+                    )
+                )
+            except UpstreamUnavailableError as e:
+                return BatchRouteItem(index=index, error=RouteError(error="upstream_unavailable", details=str(e)))
+            except ValueError as e:
+                return BatchRouteItem(index=index, error=RouteError(error="route_failed", details=str(e)))
+
+    @staticmethod
+    def _start_batch(requests: List[RouteRequest]) -> List["asyncio.Task[BatchRouteItem]"]:
+        if len(requests) > settings.BATCH_MAX_SIZE:
+            raise ValueError(f"Batch size {len(requests)} exceeds the maximum of {settings.BATCH_MAX_SIZE}")
+
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+        return [
+            asyncio.ensure_future(RouteService._calculate_batch_item(i, request, semaphore))
+            for i, request in enumerate(requests)
+        ]
+
+    @staticmethod
+    async def calculate_routes_batch(requests: List[RouteRequest]) -> List[BatchRouteItem]:
+        """Calculate many routes with bounded concurrency, returning results in input order"""
+        tasks = RouteService._start_batch(requests)
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def iter_routes_batch(requests: List[RouteRequest]) -> AsyncIterator[BatchRouteItem]:
+        """Calculate many routes with bounded concurrency, yielding each result as it completes"""
+        tasks = RouteService._start_batch(requests)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding work if the consumer goes away early
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,55 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+import logging
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (latitude, longitude)
+Point = Tuple[float, float]
+
+
+class RoutingBackend(ABC):
+    """Source of routes for ``get_route_with_waypoints`` and the matrix service.
+
+    ``route`` returns ``{"route": Geometry, "distance": meters, "duration": seconds}``
+    and raises ``ValueError`` when no route can be found.
+    """
+
+    name: str
+
+    @property
+    @abstractmethod
+    def cache_namespace(self) -> str:
+        """Prefix for route cache keys, so results from different backends never mix."""
+
+    @abstractmethod
+    async def route(self, points: Sequence[Point]) -> Dict[str, Any]:
+        """Route through ``points`` in order."""
+
+    @abstractmethod
+    async def table(self, sources: Sequence[Point], destinations: Sequence[Point]) -> Dict[str, List[List[Any]]]:
+        """Duration and distance matrices as ``{"durations": [[...]], "distances": [[...]]}``.
+
+        Row ``i`` holds source ``i``; unreachable pairs are ``None``.
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+@lru_cache()
+def get_routing_backend() -> RoutingBackend:
+    """The routing backend selected by ``ROUTING_BACKEND``."""
+    if settings.ROUTING_BACKEND == "local":
+        from app.services.local_routing import LocalGraphBackend
+        if not settings.LOCAL_GRAPH_PATH:
+            raise ValueError("LOCAL_GRAPH_PATH must be set to use the local routing backend")
+        backend = LocalGraphBackend.open(settings.LOCAL_GRAPH_PATH)
+    else:
+        from app.services.osrm import OSRMBackend
+        backend = OSRMBackend()
+    logger.info("Using the %s routing backend", backend.name)
+    return backend
@@ -0,0 +1,188 @@
+from typing import Optional
+import heapq
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+DOUGLAS_PEUCKER = "douglas-peucker"
+VISVALINGAM = "visvalingam"
+METHODS = (DOUGLAS_PEUCKER, VISVALINGAM)
+
+
+def project_to_meters(latlon: np.ndarray) -> np.ndarray:
+    """Project (lat, lon) degrees to a local equirectangular plane in meters.
+
+    Accurate to well under a percent over the extent of a single route, which is all
+    a simplification tolerance needs.
+    """
+    lat = np.radians(latlon[:, 0])
+    lon = np.radians(latlon[:, 1])
+    cos_lat0 = np.cos(lat.mean())
+    # Unwrap so routes crossing the antimeridian stay contiguous
+    lon = np.unwrap(lon)
+    return np.column_stack((lon * cos_lat0 * EARTH_RADIUS_M, lat * EARTH_RADIUS_M))
+
+
+def douglas_peucker_importance(xy: np.ndarray, tolerance: float = -1.0) -> np.ndarray:
+    """Split distance at which Douglas-Peucker keeps each point, in meters.
+
+    A point's value is clamped to that of the split that exposed it, so keeping the
+    points with importance above ``t`` is exactly Douglas-Peucker at tolerance ``t``
+    and keeping the ``k`` most important points is a valid Douglas-Peucker result.
+    Segments stop being split once their farthest point is within ``tolerance``;
+    the default splits the line all the way down. Endpoints get infinite importance.
+
+    Runs level by level instead of recursing: every open segment of one level is
+    measured and split in a single set of array operations, so the number of
+    NumPy calls grows with the depth of the split tree rather than with the
+    number of points.
+    """
+    n = len(xy)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf
+
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    parent = np.array([np.inf])
+    while len(starts):
+        lengths = ends - starts - 1
+        has_interior = lengths > 0
+        starts, ends, parent, lengths = starts[has_interior], ends[has_interior], parent[has_interior], lengths[has_interior]
+        if not len(starts):
+            break
+
+        # Flatten the interior points of every segment into one array
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        points = starts[segment] + 1 + (np.arange(len(segment)) - offsets[segment])
+
+        a = xy[starts][segment]
+        ab = xy[ends][segment] - a
+        ap = xy[points] - a
+        length_sq = np.einsum("ij,ij->i", ab, ab)
+        t = np.einsum("ij,ij->i", ap, ab) / np.where(length_sq > 0, length_sq, 1.0)
+        d = ap - np.clip(t, 0.0, 1.0)[:, None] * ab
+        distances = np.hypot(d[:, 0], d[:, 1])
+
+        # Farthest point of each segment (first one on ties)
+        segment_max = np.maximum.reduceat(distances, offsets)
+        candidates = np.flatnonzero(distances == segment_max[segment])
+        _, first = np.unique(segment[candidates], return_index=True)
+        farthest = points[candidates[first]]
+
+        split = segment_max > tolerance
+        farthest = farthest[split]
+        value = np.minimum(segment_max[split], parent[split])
+        importance[farthest] = value
+        starts, ends, parent = (
+            np.concatenate((starts[split], farthest)),
+            np.concatenate((farthest, ends[split])),
+            np.concatenate((value, value)),
+        )
+    return importance
+
+
+def douglas_peucker_mask(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """Boolean mask of the points Douglas-Peucker keeps at ``tolerance`` meters."""
+    return douglas_peucker_importance(xy, tolerance) > tolerance
+
+
+def visvalingam_areas(xy: np.ndarray) -> np.ndarray:
+    """Effective area of every point under Visvalingam-Whyatt elimination.
+
+    Endpoints get infinite area. Areas are made monotone, so keeping the ``k``
+    largest always yields the same result as eliminating down to ``k`` points.
+    """
+    n = len(xy)
+    if n < 3:
+        return np.full(n, np.inf)
+
+    # Initial triangle areas for every interior point in one vectorized step
+    a, b, c = xy[:-2], xy[1:-1], xy[2:]
+    initial = 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+
+    # The elimination itself is inherently sequential; plain lists keep it fast
+    x, y = xy[:, 0].tolist(), xy[:, 1].tolist()
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    current = [np.inf] + initial.tolist() + [np.inf]
+    result = [np.inf] * n
+    heap = [(area, i) for i, area in enumerate(current[1:-1], start=1)]
+    heapq.heapify(heap)
+
+    max_area = 0.0
+    while heap:
+        area, i = heapq.heappop(heap)
+        if area != current[i] or result[i] != np.inf:
+            continue  # stale heap entry
+        # Never let a point be eliminated "before" one that was already removed
+        max_area = max(max_area, area)
+        result[i] = max_area
+
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                pj, qj = prev[j], nxt[j]
+                new_area = 0.5 * abs((x[j] - x[pj]) * (y[qj] - y[pj]) - (x[qj] - x[pj]) * (y[j] - y[pj]))
+                current[j] = new_area
+                heapq.heappush(heap, (new_area, j))
+
+    return np.array(result)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Mask of the ``k`` highest scores, breaking ties by position."""
+    keep = np.zeros(len(scores), dtype=bool)
+    keep[np.argsort(-scores, kind="stable")[:k]] = True
+    return keep
+
+
+def simplify_mask(
+    latlon: np.ndarray,
+    tolerance: Optional[float] = None,
+    max_points: Optional[int] = None,
+    method: str = DOUGLAS_PEUCKER,
+) -> np.ndarray:
+    """Boolean mask of the points to keep when simplifying a (lat, lon) polyline.
+
+    ``tolerance`` is in meters. For Douglas-Peucker it is the maximum deviation from the
+    original line; for Visvalingam points with an effective area below ``tolerance**2``
+    square meters are dropped. ``max_points`` caps the result size. Endpoints are always kept.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simplification method: {method}")
+    if max_points is not None and max_points < 2:
+        raise ValueError("max_points must be at least 2")
+
+    n = len(latlon)
+    if n <= 2 or (tolerance is None and (max_points is None or n <= max_points)):
+        return np.ones(n, dtype=bool)
+
+    xy = project_to_meters(latlon)
+    if method == DOUGLAS_PEUCKER:
+        if max_points is None:
+            return douglas_peucker_mask(xy, tolerance)
+        scores = douglas_peucker_importance(xy)
+        keep = scores > tolerance if tolerance is not None else np.ones(n, dtype=bool)
+    else:
+        scores = visvalingam_areas(xy)
+        keep = scores >= tolerance ** 2 if tolerance is not None else np.ones(n, dtype=bool)
+
+    if max_points is not None and keep.sum() > max_points:
+        # Scores are hierarchical, so the top-k subset is itself a valid simplification
+        keep = _top_k(scores, max_points)
+    return keep
+
+
+def simplify(
+    latlon: np.ndarray,
+    tolerance: Optional[float] = None,
+    max_points: Optional[int] = None,
+    method: str = DOUGLAS_PEUCKER,
+) -> np.ndarray:
+    """Simplify an (N, 2) array of (lat, lon) points. See :func:`simplify_mask`."""
+    latlon = np.asarray(latlon, dtype=float)
+    return latlon[simplify_mask(latlon, tolerance, max_points, method)]
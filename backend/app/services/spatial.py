@@ -0,0 +1,89 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# (south, west, north, east) in degrees
+Box = Tuple[float, float, float, float]
+
+
+def bounds(latlon: np.ndarray) -> Optional[Box]:
+    """Bounding box of an (N, 2) lat/lon array, or ``None`` if it is empty."""
+    if len(latlon) == 0:
+        return None
+    south, west = latlon.min(axis=0).tolist()
+    north, east = latlon.max(axis=0).tolist()
+    return south, west, north, east
+
+
+def split_antimeridian(south: float, west: float, north: float, east: float) -> List[Box]:
+    """A viewport as one or two boxes; ``west > east`` means it crosses the antimeridian."""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in meters; accepts scalars or arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def circle_bounds(latitude: float, longitude: float, radius_m: float) -> List[Box]:
+    """Boxes that together contain every point within ``radius_m`` of a point."""
+    dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    if south == -90.0 or north == 90.0:
+        # The circle covers a pole, so it spans every longitude
+        return [(south, -180.0, north, 180.0)]
+    # Widest longitude span is at the latitude farthest from the equator
+    dlon = np.degrees(radius_m / (EARTH_RADIUS_M * np.cos(np.radians(max(abs(south), abs(north))))))
+    if dlon >= 180.0:
+        return [(south, -180.0, north, 180.0)]
+    west = (longitude - dlon + 180.0) % 360.0 - 180.0
+    east = (longitude + dlon + 180.0) % 360.0 - 180.0
+    return split_antimeridian(south, west, north, east)
+
+
+def polyline_intersects_box(latlon: np.ndarray, south: float, west: float, north: float, east: float) -> bool:
+    """Whether a (lat, lon) polyline has a point or a segment inside the box.
+
+    Segments are clipped against the box all at once (Liang-Barsky), so a route
+    that crosses a viewport without a vertex inside it still matches. Segments that
+    wrap across the antimeridian are only matched by their endpoints.
+    """
+    if len(latlon) == 0:
+        return False
+    lat, lon = latlon[:, 0], latlon[:, 1]
+    if np.any((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)):
+        return True
+    if len(latlon) < 2:
+        return False
+
+    y0, x0 = lat[:-1], lon[:-1]
+    dy, dx = np.diff(lat), np.diff(lon)
+    planar = np.abs(dx) <= 180.0
+    y0, x0, dy, dx = y0[planar], x0[planar], dy[planar], dx[planar]
+    t0 = np.zeros(len(dx))
+    t1 = np.ones(len(dx))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x0 - west), (dx, east - x0), (-dy, y0 - south), (dy, north - y0)):
+            parallel = p == 0
+            t = q / p
+            entering = ~parallel & (p < 0)
+            leaving = ~parallel & (p > 0)
+            t0 = np.where(entering, np.maximum(t0, t), t0)
+            t1 = np.where(leaving, np.minimum(t1, t), t1)
+            # A segment parallel to an edge and outside it can never enter the box
+            t1 = np.where(parallel & (q < 0), -1.0, t1)
+    return bool(np.any(t0 <= t1))
+
+
+def within_radius(latlon: np.ndarray, latitude: float, longitude: float, radius_m: float) -> np.ndarray:
+    """Indices of the points within ``radius_m`` of a point, nearest first."""
+    if len(latlon) == 0:
+        return np.zeros(0, dtype=int)
+    distances = haversine_m(latitude, longitude, latlon[:, 0], latlon[:, 1])
+    order = np.argsort(distances, kind="stable")
+    return order[distances[order] <= radius_m]
@@ -0,0 +1,149 @@
+from typing import List, Optional
+import time
+import numpy as np
+
+# Or-opt moves relocate segments of up to this many consecutive stops
+OR_OPT_MAX_SEGMENT = 3
+
+
+def _path_cost(cost: np.ndarray, path: np.ndarray) -> float:
+    return float(cost[path[:-1], path[1:]].sum())
+
+
+def _nearest_neighbour(cost: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Greedy path from ``start`` through every other node to ``end``."""
+    unvisited = np.ones(len(cost), dtype=bool)
+    unvisited[[start, end]] = False
+    path = [start]
+    while unvisited.any():
+        candidates = np.flatnonzero(unvisited)
+        nearest = candidates[np.argmin(cost[path[-1], candidates])]
+        path.append(nearest)
+        unvisited[nearest] = False
+    path.append(end)
+    return np.array(path)
+
+
+def _best_two_opt(cost: np.ndarray, path: np.ndarray):
+    """Best segment reversal as ``(gain, i, j)``: reverse ``path[i + 1:j + 1]``.
+
+    Costs may be asymmetric, so the reversed segment is priced in the direction it
+    would be driven, using prefix sums of forward and backward edge costs.
+    """
+    m = len(path)
+    forward = cost[path[:-1], path[1:]]
+    backward = cost[path[1:], path[:-1]]
+    f = np.concatenate(([0.0], np.cumsum(forward)))
+    b = np.concatenate(([0.0], np.cumsum(backward)))
+
+    i = np.arange(m - 1)[:, None]
+    j = np.arange(m - 1)[None, :]
+    valid = (j >= i + 2) & (j <= m - 2)
+    jn = np.minimum(j + 1, m - 1)
+    delta = (
+        cost[path[i], path[j]] + cost[path[i + 1], path[jn]]
+        - forward[i] - forward[j]
+        + (b[j] - b[i + 1]) - (f[j] - f[i + 1])
+    )
+    delta = np.where(valid, delta, np.inf)
+    flat = int(np.argmin(delta))
+    return -float(delta.flat[flat]), flat // (m - 1), flat % (m - 1)
+
+
+def _best_or_opt(cost: np.ndarray, path: np.ndarray):
+    """Best relocation of a short segment as ``(gain, i, length, k)``.
+
+    Moves ``path[i:i + length]`` to sit between ``path[k]`` and ``path[k + 1]``.
+    """
+    m = len(path)
+    best = (0.0, 0, 0, 0)
+    k = np.arange(m - 1)[None, :]
+    edge = cost[path[:-1], path[1:]]
+    for length in range(1, min(OR_OPT_MAX_SEGMENT, m - 2) + 1):
+        i = np.arange(1, m - length)[:, None]
+        first, last = path[i], path[i + length - 1]
+        before, after = path[i - 1], path[i + length]
+        removed = cost[before, after] - cost[before, first] - cost[last, after]
+        inserted = cost[path[k], first] + cost[last, path[k + 1]] - edge[k]
+        valid = (k < i - 1) | (k > i + length - 1)
+        delta = np.where(valid, removed + inserted, np.inf)
+        flat = int(np.argmin(delta))
+        gain = -float(delta.flat[flat])
+        if gain > best[0]:
+            best = (gain, int(i[flat // (m - 1), 0]), length, flat % (m - 1))
+    return best
+
+
+def _relocate(path: np.ndarray, i: int, length: int, k: int) -> np.ndarray:
+    segment = path[i:i + length]
+    rest = np.concatenate((path[:i], path[i + length:]))
+    # k indexes the original path; positions after the segment shift left by its length
+    at = k + 1 if k < i else k + 1 - length
+    return np.concatenate((rest[:at], segment, rest[at:]))
+
+
+def solve_path(cost: np.ndarray, start: int, end: int, time_budget: float) -> np.ndarray:
+    """Order of all nodes from ``start`` to ``end`` with low total cost.
+
+    Builds a nearest-neighbour path, then applies the best 2-opt or Or-opt move
+    until none improves it or ``time_budget`` seconds have passed.
+    """
+    deadline = time.perf_counter() + time_budget
+    path = _nearest_neighbour(cost, start, end)
+    if len(path) < 4:
+        return path
+
+    epsilon = 1e-9 * max(_path_cost(cost, path), 1.0)
+    while time.perf_counter() < deadline:
+        gain, i, j = _best_two_opt(cost, path)
+        if gain > epsilon:
+            path = np.concatenate((path[:i + 1], path[i + 1:j + 1][::-1], path[j + 1:]))
+            continue
+        gain, i, length, k = _best_or_opt(cost, path)
+        if gain > epsilon:
+            path = _relocate(path, i, length, k)
+            continue
+        break
+    return path
+
+
+def optimize_order(
+    durations: np.ndarray,
+    fixed_start: bool = True,
+    fixed_end: bool = True,
+    time_budget: float = 0.2,
+    unreachable_cost: Optional[float] = None,
+) -> List[int]:
+    """Visiting order of the stops in an N x N duration matrix.
+
+    With ``fixed_start``/``fixed_end`` the first/last stop keep their place;
+    otherwise the path may start/end at any stop. Unreachable pairs (NaN or inf)
+    are priced at ``unreachable_cost``, by default far above any real path.
+    """
+    n = len(durations)
+    if n <= 1:
+        return list(range(n))
+
+    cost = np.asarray(durations, dtype=float)
+    finite = np.isfinite(cost)
+    if unreachable_cost is None:
+        unreachable_cost = (float(cost[finite].max()) if finite.any() else 1.0) * n * 10
+    cost = np.where(finite, cost, unreachable_cost)
+
+    # Free endpoints become fixed ones by adding a dummy stop that costs nothing
+    # to leave (start) or to reach (end)
+    size = n + (not fixed_start) + (not fixed_end)
+    augmented = np.full((size, size), unreachable_cost)
+    augmented[:n, :n] = cost
+    start, end = 0, n - 1
+    if not fixed_start:
+        start = n
+        augmented[start, :n] = 0.0
+    if not fixed_end:
+        end = size - 1
+        augmented[:n, end] = 0.0
+    if not fixed_start and not fixed_end:
+        augmented[start, end] = unreachable_cost
+
+    path = solve_path(augmented, start, end, time_budget)
+    return [int(node) for node in path if node < n]
@@ -0,0 +1,88 @@
+"""Startup warm-up of the route cache and the most read saved routes.
+
+``refresh_hot_routes`` runs once in ``app.serve`` before the workers start. It
+recalculates the most used cached routes that have expired in the shared cache
+file. ``warm_up_worker`` runs in each worker's startup, before it accepts
+requests. It copies the most used cached routes into the worker's memory tier
+and reads the most read saved routes, which fills the chunk cache (``chunked``
+storage) and the database page cache.
+"""
+from typing import List, Tuple
+import asyncio
+import logging
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import undefer_group
+from app.db.chunks import load_route_geometry
+from app.db.database import SessionLocal
+from app.db.models import RouteModel
+from app.models.route import Coordinates, RouteRequest, Waypoint
+from app.services.access import hottest_route_ids
+from app.services.cache import get_route_cache
+from app.services.route_service import RouteService
+from app.services.routing import get_routing_backend
+
+logger = logging.getLogger(__name__)
+
+# Saved routes loaded per query
+_LOAD_BATCH = 200
+
+
+def parse_cache_key(key: str) -> Tuple[str, List[Tuple[float, float]]]:
+    """Namespace and (latitude, longitude) points of a key built by ``RouteCache.make_key``."""
+    namespace, _, coords = key.rpartition(":")
+    points = []
+    for pair in coords.split(";"):
+        lat, lon = pair.split(",")
+        points.append((float(lat), float(lon)))
+    return namespace, points
+
+
+async def refresh_hot_routes(limit: int) -> int:
+    """Recalculate the ``limit`` most used cached routes where they have expired; returns how many were refreshed."""
+    cache = get_route_cache()
+    if cache.persistent is None or limit <= 0:
+        return 0
+    namespace = get_routing_backend().cache_namespace
+    now = time.time()
+    requests = []
+    for key, _, expires_at in await asyncio.to_thread(cache.persistent.hottest, limit):
+        key_namespace, points = parse_cache_key(key)
+        # Fresh entries are served as they are; other backends' entries can't be recalculated here
+        if expires_at > now or key_namespace != namespace:
+            continue
+        requests.append(RouteRequest(waypoints=[
+            Waypoint(coordinates=Coordinates(latitude=lat, longitude=lon)) for lat, lon in points
+        ]))
+    if not requests:
+        return 0
+    results = await RouteService.calculate_routes_batch(requests)
+    failed = [item.error.details for item in results if item.error is not None]
+    if failed:
+        logger.warning("Could not refresh %d of %d cached routes, e.g.: %s", len(failed), len(results), failed[0])
+    return len(results) - len(failed)
+
+
+async def warm_up_worker(routes: int, pairs: int) -> None:
+    """Load the most used cached routes and saved routes into this process."""
+    started = time.perf_counter()
+    warmed = await get_route_cache().warm(pairs)
+    loaded = 0
+    if routes > 0:
+        async with SessionLocal() as db:
+            ids = await hottest_route_ids(db, routes)
+            for i in range(0, len(ids), _LOAD_BATCH):
+                query = (
+                    select(RouteModel)
+                    .where(RouteModel.id.in_(ids[i:i + _LOAD_BATCH]))
+                    .options(undefer_group("geometry"))
+                )
+                batch = (await db.execute(query)).scalars().all()
+                await load_route_geometry(db, batch)
+                loaded += len(batch)
+                # Geometry is only needed in the caches; don't keep it in the session
+                db.expunge_all()
+    logger.info(
+        "Warm-up loaded %d cached routes and %d saved routes in %.2f s",
+        warmed, loaded, time.perf_counter() - started,
+    )
@@ -0,0 +1,121 @@
+"""Saved-route storage benchmark: JSON vs polyline vs deduplicated chunks.
+
+Saves ``--routes`` routes that share geometry the way delivery routes do: each
+starts with one of ``--depots`` long depot legs and ends with its own last leg.
+The same routes are written to a fresh SQLite file per storage format, and for
+each format it reports the file size after VACUUM, save throughput and the
+latency of reading a route back by id.
+
+    python -m benchmarks.bench_chunked_storage
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+
+def make_routes(args: argparse.Namespace) -> List[np.ndarray]:
+    from benchmarks.common import synthetic_route
+
+    depots = [synthetic_route(args.depot_points, seed=seed) for seed in range(args.depots)]
+    rng = random.Random(0)
+    routes = []
+    for i in range(args.routes):
+        depot = depots[i % args.depots]
+        # The last leg branches off somewhere along the depot leg
+        branch = rng.randrange(len(depot) // 2, len(depot))
+        last_leg = synthetic_route(args.last_mile_points, seed=1000 + i) - synthetic_route(1, seed=1000 + i)[0]
+        routes.append(np.vstack([depot[:branch], np.round(depot[branch - 1] + last_leg, 6)]))
+    return routes
+
+
+async def run_format(storage_format: str, routes: List[np.ndarray], directory: str, reads: int) -> Dict[str, Any]:
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import undefer_group
+    from app.core.config import get_settings
+    from app.db.chunks import chunk_cache, load_route_geometry
+    from app.db.models import RouteModel
+    from app.db.schema import init_db
+    from app.models.geometry import Geometry
+    from benchmarks.common import summarize
+
+    get_settings().ROUTE_STORAGE_FORMAT = storage_format
+    path = os.path.join(directory, f"{storage_format}.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    await init_db(engine)
+
+    ids = []
+    started = time.perf_counter()
+    async with sessions() as session:
+        for i, latlon in enumerate(routes):
+            geometry = Geometry(latlon)
+            origin, destination = geometry[:1].to_dicts()[0], geometry[-1:].to_dicts()[0]
+            route = RouteModel(
+                title=f"route {i}", description="", origin=origin, destination=destination, waypoints=[],
+                route=geometry, distance=1000.0, duration=100.0,
+            )
+            session.add(route)
+            await session.commit()
+            ids.append(route.id)
+    write_seconds = time.perf_counter() - started
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM"))
+
+    # Cold reads: nothing cached in process, as after a restart
+    chunk_cache.clear()
+    rng = random.Random(1)
+    latencies = []
+    async with sessions() as session:
+        for _ in range(reads):
+            started = time.perf_counter()
+            route = await session.get(RouteModel, rng.choice(ids), options=[undefer_group("geometry")])
+            await load_route_geometry(session, [route])
+            route.route.to_dicts()
+            latencies.append(time.perf_counter() - started)
+            session.expunge_all()
+    await engine.dispose()
+    return {
+        "file_bytes": os.path.getsize(path),
+        "save_rps": round(len(routes) / write_seconds, 1),
+        **{f"read_{key}": value for key, value in summarize(latencies).items()},
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    from benchmarks.common import emit
+
+    routes = make_routes(args)
+    points = sum(len(route) for route in routes)
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = None
+        for storage_format in ("json", "polyline6", "chunked"):
+            result = await run_format(storage_format, routes, directory, args.reads)
+            baseline = baseline or result["file_bytes"]
+            emit("chunked_storage", {"format": storage_format, "routes": len(routes)},
+                 points=points, size_vs_json=round(result["file_bytes"] / baseline, 3), **result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--depots", type=int, default=5)
+    parser.add_argument("--depot-points", type=int, default=3000, help="Points in each shared depot leg")
+    parser.add_argument("--last-mile-points", type=int, default=300, help="Points in each route's own last leg")
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Mixed calculate + CRUD concurrency benchmark.
+
+Runs route calculations (against an in-process fake OSRM with fixed latency)
+concurrently with saved-route reads and writes, and reports per-class latency.
+The same workload is run against a copy of the previous blocking CRUD handlers
+(synchronous ``Session`` inside ``async def``) and against the async API, to
+show that database work no longer stalls OSRM calls on the event loop.
+
+    python -m benchmarks.bench_db_concurrency
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def build_legacy_router(database_path: str):
+    """The pre-async CRUD handlers: blocking queries inside ``async def``."""
+    from fastapi import APIRouter, Depends
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from app.db.models import RouteModel
+    from app.models.route import Route, RouteCreate
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    router = APIRouter()
+
+    @router.get("/routes/")
+    async def list_routes(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+        return [Route.model_validate(r) for r in db.query(RouteModel).offset(skip).limit(limit).all()]
+
+    @router.post("/routes/")
+    async def create_route(route: RouteCreate, db: Session = Depends(get_db)):
+        db_route = RouteModel(
+            title=route.title, description=route.description,
+            origin=route.origin.model_dump(), destination=route.destination.model_dump(),
+            waypoints=[wp.model_dump() for wp in route.waypoints], route=route.route,
+            distance=route.distance, duration=route.duration,
+        )
+        db.add(db_route)
+        db.commit()
+        db.refresh(db_route)
+        return Route.model_validate(db_route)
+
+    return router
+
+
+def random_point(rng: random.Random) -> Dict[str, float]:
+    return {"latitude": 37.70 + rng.random() * 0.1, "longitude": -122.50 + rng.random() * 0.1}
+
+
+def saved_route(rng: random.Random, points: int) -> dict:
+    origin, destination = random_point(rng), random_point(rng)
+    return {
+        "title": "bench", "description": "benchmark route",
+        "origin": origin, "destination": destination,
+        "waypoints": [{"coordinates": origin}, {"coordinates": destination}],
+        "route": [random_point(rng) for _ in range(points)],
+        "distance": 1000.0, "duration": 100.0,
+    }
+
+
+async def run(args: argparse.Namespace, database_path: str) -> None:
+    import httpx
+    from app.core.config import get_settings
+    from app.db.database import engine
+    from app.db.schema import init_db
+    from app.main import app
+    from app.services.osrm import init_osrm_client
+    from benchmarks.common import emit, summarize
+    from benchmarks.fake_osrm import FakeOSRM
+
+    settings = get_settings()
+    await init_db(engine)
+    await init_osrm_client(FakeOSRM(points_per_leg=args.route_points, latency=args.osrm_latency).transport())
+    app.include_router(build_legacy_router(database_path), prefix="/legacy")
+
+    rng = random.Random(0)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for _ in range(args.seed_routes):
+            (await client.post(f"{settings.API_V1_STR}/routes/", json=saved_route(rng, args.route_points))).raise_for_status()
+
+        for mode, prefix in (("blocking", "/legacy"), ("async", settings.API_V1_STR)):
+            latencies: Dict[str, List[float]] = {"calculate": [], "list": [], "create": []}
+            done = asyncio.Event()
+
+            async def timed(kind: str, request) -> None:
+                start = time.perf_counter()
+                response = await request
+                response.raise_for_status()
+                latencies[kind].append(time.perf_counter() - start)
+
+            async def calculate_worker() -> None:
+                for _ in range(args.calculations):
+                    body = {"waypoints": [{"coordinates": random_point(rng)}, {"coordinates": random_point(rng)}]}
+                    await timed("calculate", client.post(f"{settings.API_V1_STR}/route/calculate/", json=body))
+
+            async def crud_worker() -> None:
+                while not done.is_set():
+                    await timed("list", client.get(f"{prefix}/routes/", params={"limit": args.list_limit}))
+                    await timed("create", client.post(f"{prefix}/routes/", json=saved_route(rng, args.route_points)))
+
+            started = time.perf_counter()
+            crud = [asyncio.ensure_future(crud_worker()) for _ in range(args.crud_workers)]
+            await asyncio.gather(*(calculate_worker() for _ in range(args.calc_workers)))
+            done.set()
+            await asyncio.gather(*crud)
+            elapsed = time.perf_counter() - started
+
+            for kind, samples in latencies.items():
+                emit(
+                    "db_concurrency",
+                    {"mode": mode, "request": kind},
+                    throughput_rps=round(len(samples) / elapsed, 2),
+                    **summarize(samples),
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calc-workers", type=int, default=20)
+    parser.add_argument("--calculations", type=int, default=20, help="Calculations per worker")
+    parser.add_argument("--crud-workers", type=int, default=4)
+    parser.add_argument("--osrm-latency", type=float, default=0.02, help="Fake OSRM latency in seconds")
+    parser.add_argument("--route-points", type=int, default=2000)
+    parser.add_argument("--seed-routes", type=int, default=100)
+    parser.add_argument("--list-limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        # Settings are read at import time, so configure the app before importing it
+        os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+        os.environ["ROUTE_CACHE_ENABLED"] = "false"
+        os.environ["ROUTE_COALESCING_ENABLED"] = "false"
+        asyncio.run(run(args, database_path))
+
+
+if __name__ == "__main__":
+    main()
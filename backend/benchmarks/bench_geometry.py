@@ -0,0 +1,70 @@
+"""Route geometry representation micro-benchmark.
+
+Compares the previous per-point ``Coordinates`` models with the array-backed
+``Geometry`` for the three places geometry passes through on every request:
+parsing the OSRM response, validating a stored route, and serializing the
+response body.
+
+    python -m benchmarks.bench_geometry
+"""
+import argparse
+import json
+from typing import List
+
+from pydantic import BaseModel
+
+from app.models.geometry import Geometry
+from app.models.route import AbstractedRoute, Coordinates
+from benchmarks.common import emit, measure, synthetic_route
+
+
+class LegacyAbstractedRoute(BaseModel):
+    """AbstractedRoute as it was with one Coordinates model per point."""
+    route: List[Coordinates]
+    distance: float
+    duration: float
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        latlon = synthetic_route(n).tolist()
+        osrm_coordinates = [[lon, lat] for lat, lon in latlon]
+        stored = [{"latitude": lat, "longitude": lon} for lat, lon in latlon]
+        legacy_route = [Coordinates(latitude=lat, longitude=lon) for lat, lon in latlon]
+        geometry = Geometry(latlon)
+
+        cases = {
+            "parse_osrm": {
+                "models": lambda: [Coordinates(latitude=c[1], longitude=c[0]) for c in osrm_coordinates],
+                "array": lambda: Geometry.from_osrm(osrm_coordinates),
+            },
+            "validate_stored": {
+                "models": lambda: [Coordinates.from_dict(c) for c in stored],
+                "array": lambda: Geometry.from_dicts(stored),
+            },
+            "serialize_response": {
+                "models": lambda: LegacyAbstractedRoute(route=legacy_route, distance=0, duration=0).model_dump_json(),
+                "array": lambda: AbstractedRoute(route=geometry, distance=0, duration=0).model_dump_json(),
+            },
+            "end_to_end": {
+                "models": lambda: LegacyAbstractedRoute(
+                    route=[Coordinates(latitude=c[1], longitude=c[0]) for c in osrm_coordinates],
+                    distance=0, duration=0
+                ).model_dump_json(),
+                "array": lambda: AbstractedRoute(
+                    route=Geometry.from_osrm(osrm_coordinates), distance=0, duration=0
+                ).model_dump_json(),
+            },
+        }
+        for stage, variants in cases.items():
+            for variant, fn in variants.items():
+                emit("geometry", {"points": n, "stage": stage, "variant": variant}, **measure(fn, repeat=args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Saved-route listing benchmark on a large synthetic table.
+
+Fills a SQLite database with ``--rows`` saved routes (1M by default) and times
+page fetches at increasing depths with the previous unordered ``OFFSET`` query,
+an ordered ``OFFSET`` query and keyset (cursor) pagination, plus the indexed
+filters of ``GET /routes/``. The query plan of every case is included in its
+result line.
+
+    python -m benchmarks.bench_list_routes --rows 1000000
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.db.models import RouteModel
+from app.db.queries import build_route_query, encode_cursor
+from benchmarks.common import emit, measure
+
+
+def populate(path: str, rows: int, seed: int = 0) -> None:
+    """Create the schema and insert ``rows`` synthetic routes in one transaction."""
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    rng = random.Random(seed)
+    point = json.dumps({"latitude": 37.7, "longitude": -122.4})
+    start = datetime(2023, 1, 1)
+    words = ["Commute", "Hike", "Ride", "Run", "Trip", "Walk"]
+
+    def generate():
+        for i in range(rows):
+            yield (
+                f"{i:08x}-{rng.getrandbits(64):016x}",
+                f"{rng.choice(words)} {i}",
+                "synthetic route",
+                point, point, "[]", "[]",
+                rng.uniform(100, 100_000),
+                rng.uniform(60, 36_000),
+                (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            )
+
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO routes (id, title, description, origin, destination, waypoints, route, "
+            "distance, duration, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            generate(),
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def query_plan(session: Session, query) -> str:
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return "; ".join(row[-1] for row in session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def run(path: str, args: argparse.Namespace) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as session:
+        def case(name: str, query, **extra) -> None:
+            fetch = lambda: session.execute(query).scalars().all()
+            emit("list_routes", {"rows": args.rows, "case": name, **extra},
+                 plan=query_plan(session, query), **measure(fetch, repeat=args.repeat))
+            session.expunge_all()
+
+        # Every case fetches limit + 1 rows, as the API does
+        depths = [0] + [int(args.rows * f) for f in (0.1, 0.5, 0.9)]
+        for depth in depths:
+            case("offset_unordered", select(RouteModel).offset(depth).limit(args.limit + 1), depth=depth)
+            case("offset_ordered", build_route_query(args.limit).offset(depth), depth=depth)
+
+            # The cursor a client would hold after paging down to this depth
+            cursor = None
+            if depth:
+                last = session.execute(build_route_query(0).offset(depth - 1)).scalars().first()
+                cursor = encode_cursor("created_at", last.created_at, last.id)
+            case("keyset", build_route_query(args.limit, cursor=cursor), depth=depth)
+
+        case("title_prefix", build_route_query(args.limit, sort="title", order="asc", title_prefix="Hike 5"))
+        case("distance_range", build_route_query(args.limit, sort="distance", min_distance=5000, max_distance=5100))
+        case("duration_range", build_route_query(args.limit, sort="duration", min_duration=600, max_duration=900))
+        case("created_window", build_route_query(
+            args.limit, created_after=datetime(2023, 3, 1), created_before=datetime(2023, 3, 2)
+        ))
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database", help="Reuse (or create) this database file instead of a temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or os.path.join(tmp, "bench.db")
+        if not os.path.exists(path):
+            started = time.perf_counter()
+            populate(path, args.rows)
+            emit("list_routes", {"rows": args.rows, "case": "populate"}, seconds=round(time.perf_counter() - started, 2))
+        run(path, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""HTTP load benchmark for the main API operations.
+
+Runs closed-loop load (``--requests`` requests, ``--concurrency`` in flight) for
+each scenario and reports throughput, errors and p50/p95/p99 latency:
+
+- ``calculate``: ``POST /route/calculate/`` between random points
+- ``save``: ``POST /routes/`` with ``--route-points`` points of geometry
+- ``list``: ``GET /routes/`` pages of ``--list-limit`` routes
+- ``get``: ``GET /routes/{id}`` of routes created by ``save``
+
+By default the app runs in-process on a temporary database, with the in-process
+fake OSRM answering route calls. ``--osrm-url`` sends OSRM calls over HTTP to a
+fake server started with ``python -m benchmarks.fake_osrm`` instead, and
+``--url`` loads an already running deployment (whose OSRM settings then apply).
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --url http://localhost:8000 --scenarios list get
+"""
+from typing import Any, Awaitable, Callable, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+SCENARIOS = ("calculate", "save", "list", "get")
+
+
+def random_point(rng: random.Random) -> Dict[str, float]:
+    return {"latitude": 37.70 + rng.random() * 0.1, "longitude": -122.50 + rng.random() * 0.1}
+
+
+def saved_route(rng: random.Random, geometry: List[Dict[str, float]]) -> Dict[str, Any]:
+    origin, destination = random_point(rng), random_point(rng)
+    return {
+        "title": f"bench {rng.randrange(10**6)}", "description": "benchmark route",
+        "origin": origin, "destination": destination,
+        "waypoints": [{"coordinates": origin}, {"coordinates": destination}],
+        "route": geometry, "distance": 1000.0, "duration": 100.0,
+    }
+
+
+async def run_closed_loop(send: Callable[[int], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``requests`` calls of ``send(i)`` with ``concurrency`` in flight."""
+    from benchmarks.common import summarize
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        **summarize(latencies),
+    }
+
+
+async def run_scenarios(client: Any, prefix: str, args: argparse.Namespace) -> None:
+    from benchmarks.common import emit, synthetic_route
+
+    rng = random.Random(args.seed)
+    geometry = [{"latitude": lat, "longitude": lon} for lat, lon in synthetic_route(args.route_points).tolist()]
+    created: List[str] = []
+
+    async def calculate(i: int):
+        body = {"waypoints": [{"coordinates": random_point(rng)}, {"coordinates": random_point(rng)}]}
+        return await client.post(f"{prefix}/route/calculate/", json=body)
+
+    async def save(i: int):
+        response = await client.post(f"{prefix}/routes/", json=saved_route(rng, geometry))
+        if response.status_code == 200:
+            created.append(response.json()["id"])
+        return response
+
+    async def list_page(i: int):
+        return await client.get(f"{prefix}/routes/", params={"limit": args.list_limit})
+
+    async def get(i: int):
+        return await client.get(f"{prefix}/routes/{created[i % len(created)]}")
+
+    senders = {"calculate": calculate, "save": save, "list": list_page, "get": get}
+    for scenario in args.scenarios:
+        if scenario in ("list", "get") and not created:
+            # Reads need saved routes; create some without measuring them
+            await run_closed_loop(save, args.concurrency * 4, args.concurrency)
+        await run_closed_loop(senders[scenario], args.warmup, args.concurrency)
+        result = await run_closed_loop(senders[scenario], args.requests, args.concurrency)
+        emit("load", {"scenario": scenario, "route_points": args.route_points, "concurrency": args.concurrency},
+             **result)
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            await run_scenarios(client, args.prefix, args)
+        return
+
+    from app.core.config import get_settings
+    from app.main import app
+    from app.services.osrm import init_osrm_client
+    from benchmarks.fake_osrm import FakeOSRM
+
+    async with app.router.lifespan_context(app):
+        if not args.osrm_url:
+            fake = FakeOSRM(points_per_leg=args.osrm_points_per_leg, latency=args.osrm_latency)
+            await init_osrm_client(fake.transport())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await run_scenarios(client, get_settings().API_V1_STR, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route-points", type=int, default=2000, help="Geometry points of saved routes")
+    parser.add_argument("--list-limit", type=int, default=50)
+    parser.add_argument("--osrm-points-per-leg", type=int, default=500, help="Fake OSRM geometry size")
+    parser.add_argument("--osrm-latency", type=float, default=0.01, help="Fake OSRM latency in seconds")
+    parser.add_argument("--osrm-url", help="Fake OSRM server to call over HTTP instead of in-process")
+    parser.add_argument("--url", help="Load a running API at this base URL instead of an in-process app")
+    parser.add_argument("--prefix", default="/api/v1", help="API prefix when using --url")
+    parser.add_argument("--cache", action="store_true", help="Keep route caching and coalescing enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so configure the app before importing it
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+        if not args.cache:
+            os.environ["ROUTE_CACHE_ENABLED"] = "false"
+            os.environ["ROUTE_COALESCING_ENABLED"] = "false"
+        if args.osrm_url:
+            os.environ["OSRM_SERVER_URL"] = args.osrm_url
+            os.environ["OSRM_SERVER_URLS"] = "[]"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Local routing engine benchmark.
+
+Builds a synthetic street grid of ``--grid`` x ``--grid`` intersections (with a
+faster arterial every tenth street), saves it as ``.npy`` arrays and measures
+graph load time (memory-mapped vs. fully read), nearest-node snapping and
+route latency for short, medium and long trips. The bundled OSM fixture is
+also parsed to report build time.
+
+    python -m benchmarks.bench_local_routing --grid 300
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.graph import RoadGraph
+from app.services.local_routing import LocalGraphBackend
+from app.services.spatial import haversine_m
+from benchmarks.common import emit, measure
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "fixture.osm")
+
+
+def grid_graph(size: int, spacing: float = 0.001, lat0: float = 37.70, lon0: float = -122.50) -> RoadGraph:
+    """A two-way street grid; every tenth row and column is an arterial at twice the speed."""
+    rows, cols = np.divmod(np.arange(size * size), size)
+    lat = lat0 + rows * spacing
+    lon = lon0 + cols * spacing
+
+    node = np.arange(size * size).reshape(size, size)
+    horizontal = np.column_stack((node[:, :-1].ravel(), node[:, 1:].ravel()))
+    vertical = np.column_stack((node[:-1, :].ravel(), node[1:, :].ravel()))
+    edges = np.concatenate((horizontal, vertical, horizontal[:, ::-1], vertical[:, ::-1]))
+    src, dst = edges[:, 0], edges[:, 1]
+
+    length = haversine_m(lat[src], lon[src], lat[dst], lon[dst])
+    arterial = (rows[src] == rows[dst]) & (rows[src] % 10 == 0) | (cols[src] == cols[dst]) & (cols[src] % 10 == 0)
+    speed = np.where(arterial, 50.0, 25.0) / 3.6
+    return RoadGraph.from_edges(lat, lon, src, dst, length / speed, length, {"source": f"grid{size}"})
+
+
+def run(args: argparse.Namespace, directory: str) -> None:
+    started = time.perf_counter()
+    fixture = RoadGraph.from_osm(FIXTURE)
+    emit("local_routing", {"case": "build_fixture"}, nodes=fixture.node_count, edges=fixture.edge_count,
+         ms=round((time.perf_counter() - started) * 1000, 3))
+
+    started = time.perf_counter()
+    grid_graph(args.grid).save(directory)
+    emit("local_routing", {"case": "build_grid", "grid": args.grid}, seconds=round(time.perf_counter() - started, 3))
+
+    for mmap in (True, False):
+        case = {"case": "load", "grid": args.grid, "mmap": mmap}
+        emit("local_routing", case, **measure(lambda: RoadGraph.load(directory, mmap=mmap), repeat=args.repeat))
+
+    graph = RoadGraph.load(directory)
+    backend = LocalGraphBackend(graph)
+    rng = np.random.default_rng(0)
+    extent = args.grid * 0.001
+
+    points = [(37.70 + rng.random() * extent, -122.50 + rng.random() * extent) for _ in range(args.repeat)]
+    snap = iter(points * 2)
+    emit("local_routing", {"case": "snap", "grid": args.grid},
+         **measure(lambda: graph.nearest_node(*next(snap), max_distance=1000), repeat=args.repeat, warmup=0))
+
+    for label, fraction in (("short", 0.05), ("medium", 0.25), ("long", 0.9)):
+        trips = []
+        for _ in range(args.repeat):
+            a = (37.70 + rng.random() * extent * (1 - fraction), -122.50 + rng.random() * extent * (1 - fraction))
+            trips.append((a, (a[0] + extent * fraction, a[1] + extent * fraction)))
+        trip = iter(trips)
+        emit("local_routing", {"case": "route", "grid": args.grid, "trip": label},
+             **measure(lambda: backend.route_sync(next(trip)), repeat=args.repeat, warmup=0))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, default=300, help="Intersections per side of the synthetic grid")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args, tmp)
+
+
+if __name__ == "__main__":
+    main()
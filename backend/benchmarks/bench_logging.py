@@ -0,0 +1,83 @@
+"""Logging overhead benchmark.
+
+Measures the per-call cost of the logging patterns the request path used before
+and after moving to lazy, queued logging, for a route of ``--points`` points:
+
+- ``print``: printing the geometry to stdout, as the save/list handlers did
+- ``eager_debug``: an f-string debug call, built even when DEBUG is disabled
+- ``lazy_debug``: a %-style debug call with DEBUG disabled
+- ``blocking_info`` / ``queued_info``: an INFO record to a sink that takes
+  ``--sink-latency`` seconds per write, written inline or by a listener thread
+
+stdout is redirected to /dev/null while measuring so the terminal doesn't skew results.
+
+    python -m benchmarks.bench_logging
+"""
+import argparse
+import contextlib
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+
+class SlowSink(logging.Handler):
+    """Handler standing in for a slow terminal or log shipper."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+        time.sleep(self.latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sink-latency", type=float, default=0.0005, help="Seconds the slow sink spends per record")
+    args = parser.parse_args()
+
+    from app.core.log import DroppingQueueHandler
+    from benchmarks.common import emit, measure, synthetic_route
+
+    route = synthetic_route(args.points).tolist()
+    logger = logging.getLogger("bench.logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    cases = {
+        "print": lambda: print("Route data:", route),
+        "eager_debug": lambda: logger.debug(f"Route data: {route}"),
+        "lazy_debug": lambda: logger.debug("Route data: %s", route),
+    }
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = {name: measure(fn, repeat=args.repeat) for name, fn in cases.items()}
+    for name, result in results.items():
+        emit("logging", {"case": name, "points": args.points}, **result)
+
+    sink = SlowSink(args.sink_latency)
+    logger.addHandler(sink)
+    emit("logging", {"case": "blocking_info", "sink_latency": args.sink_latency},
+         **measure(lambda: logger.info("Route calculated with %d points", len(route)), repeat=args.repeat))
+    logger.removeHandler(sink)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(10000)
+    handler = DroppingQueueHandler(log_queue)
+    listener = logging.handlers.QueueListener(log_queue, sink)
+    logger.addHandler(handler)
+    listener.start()
+    emit("logging", {"case": "queued_info", "sink_latency": args.sink_latency},
+         **measure(lambda: logger.info("Route calculated with %d points", len(route)), repeat=args.repeat),
+         dropped=handler.dropped)
+    listener.stop()
+    logger.removeHandler(handler)
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
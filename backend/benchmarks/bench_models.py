@@ -0,0 +1,92 @@
+"""Model validation and geometry conversion micro-benchmarks.
+
+Times the conversions every request pays for, per route size:
+
+- ``geometry``: ``Geometry`` from OSRM coordinates, from and to point dicts, and
+  to and from polylines
+- ``api_model``: the Pydantic models and validators in ``app/models/route.py`` —
+  parsing a save request (coordinates or polyline), a route request, and
+  building ``Route`` / ``RouteSummary`` from a stored row
+- ``db_model``: building a ``RouteModel`` in ``app/db/models.py``, which runs the
+  origin/destination and waypoint validators and the geometry setter, for each
+  storage format, and reading the geometry back
+
+    python -m benchmarks.bench_models
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict
+import argparse
+import json
+import os
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 2000, 20000])
+    parser.add_argument("--waypoints", type=int, default=10, help="Waypoints per saved route")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    from app.core.config import get_settings
+    from app.db.models import RouteModel
+    from app.models.geometry import Geometry
+    from app.models.route import Route, RouteCreate, RouteRequest, RouteSummary
+    from benchmarks.common import emit, measure, synthetic_route
+
+    settings = get_settings()
+
+    def report(group: str, size: int, cases: Dict[str, Callable[[], Any]], **labels: Any) -> None:
+        for name, fn in cases.items():
+            emit("models", {"group": group, "case": name, "points": size, **labels}, **measure(fn, repeat=args.repeat))
+
+    for size in args.sizes:
+        latlon = synthetic_route(size)
+        geometry = Geometry(latlon)
+        osrm = latlon[:, ::-1].tolist()
+        dicts = geometry.to_dicts()
+        encoded = geometry.to_polyline(6)
+        report("geometry", size, {
+            "from_osrm": lambda: Geometry.from_osrm(osrm),
+            "from_dicts": lambda: Geometry.from_dicts(dicts),
+            "to_dicts": geometry.to_dicts,
+            "to_polyline6": lambda: geometry.to_polyline(6),
+            "from_polyline6": lambda: Geometry.from_polyline(encoded, 6),
+        })
+
+        stops = dicts[::max(size // args.waypoints, 1)]
+        waypoints = [{"coordinates": point, "name": f"stop {i}"} for i, point in enumerate(stops)]
+        body = {
+            "title": "bench", "description": "benchmark route",
+            "origin": dicts[0], "destination": dicts[-1], "waypoints": waypoints,
+            "distance": 1000.0, "duration": 100.0,
+        }
+        with_route = json.dumps({**body, "route": dicts})
+        with_polyline = json.dumps({**body, "polyline": encoded, "polyline_precision": 6})
+        report("api_model", size, {
+            "route_create_json": lambda: RouteCreate.model_validate_json(with_route),
+            "route_create_polyline": lambda: RouteCreate.model_validate_json(with_polyline),
+            "route_request": lambda: RouteRequest.model_validate({"waypoints": waypoints}),
+        })
+
+        def build_row() -> RouteModel:
+            return RouteModel(
+                id="00000000-0000-0000-0000-000000000000", title="bench", description="benchmark route",
+                origin=dicts[0], destination=dicts[-1], waypoints=waypoints, route=geometry,
+                distance=1000.0, duration=100.0, created_at=datetime(2024, 1, 1),
+            )
+
+        for storage_format in ("json", "polyline6"):
+            settings.ROUTE_STORAGE_FORMAT = storage_format
+            row = build_row()
+            report("db_model", size, {
+                "build": build_row,
+                "read_geometry": lambda: row.route,
+                "to_route": lambda: Route.model_validate(row),
+            }, storage=storage_format)
+        report("api_model", size, {"to_summary": lambda: RouteSummary.model_validate(row)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""OSRM load-balancing benchmark.
+
+Sends route calculations through ``RouteService.calculate_route`` to several
+in-process fake OSRM servers, each serving a limited number of requests at once
+(``--capacity``, like OSRM worker threads), and reports:
+
+- ``scale``: throughput with 1, 2 and 4 servers
+- ``mixed``: one server much slower than the others, per balancing strategy,
+  with the share of calls each server received
+- ``failover``: one server down; calls it received before and after health
+  checks took it out of rotation
+
+    python -m benchmarks.bench_osrm_balancing
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+
+
+def hosts(n: int) -> List[str]:
+    return [f"osrm-{i}" for i in range(n)]
+
+
+async def configure(servers: Dict[str, Any], strategy: str):
+    """Point the app at fresh fake servers with the given balancing strategy."""
+    from app.core.config import get_settings
+    from app.services.osrm import init_osrm_client, get_retry_budget
+    from benchmarks.fake_osrm import multi_host_transport
+
+    settings = get_settings()
+    settings.OSRM_SERVER_URLS = [f"http://{host}" for host in servers]
+    settings.OSRM_BALANCER = strategy
+    get_retry_budget.cache_clear()
+    return await init_osrm_client(multi_host_transport(servers))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from benchmarks.bench_resilience import random_request, run_load
+    from benchmarks.common import emit
+    from benchmarks.fake_osrm import FakeOSRM
+
+    rng = random.Random(0)
+    requests = [random_request(rng) for _ in range(args.requests)]
+
+    def server(latency: float = args.latency, **kwargs: Any) -> FakeOSRM:
+        return FakeOSRM(points_per_leg=50, latency=latency, capacity=args.capacity, **kwargs)
+
+    for count in (1, 2, 4):
+        await configure({host: server() for host in hosts(count)}, "least_outstanding")
+        result = await run_load(requests, args.concurrency)
+        emit("osrm_balancing", {"scenario": "scale", "servers": count},
+             throughput_rps=round(len(requests) / result["seconds"], 1), **result)
+
+    for strategy in ("least_outstanding", "ewma"):
+        servers = {host: server() for host in hosts(3)}
+        servers["osrm-0"].latency = args.latency * 5
+        await configure(servers, strategy)
+        result = await run_load(requests, args.concurrency)
+        share = {host: round(fake.requests / len(requests), 3) for host, fake in servers.items()}
+        emit("osrm_balancing", {"scenario": "mixed", "strategy": strategy}, **result, share=share)
+
+    servers = {host: server() for host in hosts(3)}
+    servers["osrm-0"].down = True
+    pool = await configure(servers, "least_outstanding")
+    result = await run_load(requests[:len(requests) // 2], args.concurrency)
+    before = servers["osrm-0"].requests
+    for _ in range(pool.unhealthy_threshold):
+        await pool.check_health()
+    after = servers["osrm-0"].requests
+    second = await run_load(requests[len(requests) // 2:], args.concurrency)
+    emit("osrm_balancing", {"scenario": "failover"}, before_checks=result, after_checks=second,
+         dead_server_calls_before=before, dead_server_calls_after=servers["osrm-0"].requests - after)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--capacity", type=int, default=8, help="Concurrent requests each fake server handles")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake OSRM latency in seconds")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ["ROUTE_CACHE_ENABLED"] = "false"
+    os.environ["ROUTE_COALESCING_ENABLED"] = "false"
+    os.environ["OSRM_HEALTH_CHECK_INTERVAL"] = "0"
+    os.environ["OSRM_RETRY_BACKOFF"] = "0.01"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""OSRM resilience benchmark.
+
+Drives ``RouteService.calculate_route`` against in-process fake OSRM servers
+with injected faults and reports latency and outcomes per scenario:
+
+- ``tail``: a slow tail on the primary server, with and without hedging to a
+  healthy second server
+- ``flaky``: a fraction of 503 responses, with and without retries
+- ``outage``: the primary refuses connections; shows the circuit breaker
+  failing fast and expired cache entries being served as stale
+
+    python -m benchmarks.bench_resilience
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import time
+
+PRIMARY, HEDGE = "http://osrm-a", "http://osrm-b"
+
+
+def random_request(rng: random.Random) -> Dict[str, Any]:
+    def point() -> Dict[str, float]:
+        return {"coordinates": {"latitude": 37.70 + rng.random() * 0.1, "longitude": -122.50 + rng.random() * 0.1}}
+
+    return {"waypoints": [point(), point()]}
+
+
+async def run_load(requests: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from app.models.route import RouteRequest
+    from app.services.resilience import UpstreamUnavailableError
+    from app.services.route_service import RouteService
+    from benchmarks.common import summarize
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    outcomes = {"ok": 0, "stale": 0, "unavailable": 0}
+
+    async def one(body: Dict[str, Any]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                route = await RouteService.calculate_route(RouteRequest(**body))
+                outcomes["stale" if route.stale else "ok"] += 1
+            except UpstreamUnavailableError:
+                outcomes["unavailable"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(body) for body in requests))
+    return {**outcomes, "seconds": round(time.perf_counter() - started, 3), **summarize(latencies)}
+
+
+async def configure(servers: Dict[str, Any], **overrides: Any) -> None:
+    """Point the app at fresh fake servers and reset breakers, budget and cache."""
+    from app.core.config import get_settings
+    from app.services.cache import get_route_cache
+    from app.services.osrm import init_osrm_client, get_retry_budget
+    from benchmarks.fake_osrm import multi_host_transport
+
+    settings = get_settings()
+    values = {
+        "OSRM_SERVER_URL": PRIMARY, "OSRM_SERVER_URLS": [], "OSRM_HEDGE_URL": None, "OSRM_RETRY_ATTEMPTS": 2,
+        "OSRM_BREAKER_FAILURE_THRESHOLD": 5, "ROUTE_CACHE_ENABLED": False, **overrides,
+    }
+    for name, value in values.items():
+        setattr(settings, name, value)
+    get_retry_budget.cache_clear()
+    get_route_cache().clear()
+    await init_osrm_client(multi_host_transport({host.split("//")[1]: server for host, server in servers.items()}))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.services.cache import get_route_cache
+    from app.services.osrm import resilience_stats
+    from benchmarks.common import emit
+    from benchmarks.fake_osrm import FakeOSRM
+
+    rng = random.Random(0)
+    requests = [random_request(rng) for _ in range(args.requests)]
+
+    for hedging in (False, True):
+        primary = FakeOSRM(latency=args.latency, tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+        await configure({PRIMARY: primary, HEDGE: FakeOSRM(latency=args.latency, seed=1)},
+                        OSRM_HEDGE_URL=HEDGE if hedging else None)
+        result = await run_load(requests, args.concurrency)
+        emit("resilience", {"scenario": "tail", "hedging": hedging}, **result,
+             hedges=resilience_stats()["hedges"]["sent"])
+
+    for retries in (0, 2):
+        await configure({PRIMARY: FakeOSRM(latency=args.latency, error_rate=args.error_rate)},
+                        OSRM_RETRY_ATTEMPTS=retries, OSRM_BREAKER_FAILURE_THRESHOLD=1000)
+        result = await run_load(requests, args.concurrency)
+        emit("resilience", {"scenario": "flaky", "retries": retries}, **result,
+             budget=resilience_stats()["retry_budget"])
+
+    # Fill the cache with already-expired entries while healthy, then take the server down
+    primary = FakeOSRM(latency=args.latency)
+    await configure({PRIMARY: primary}, ROUTE_CACHE_ENABLED=True)
+    get_route_cache().memory.ttl = 0.0
+    await run_load(requests[:len(requests) // 2], args.concurrency)
+    primary.down = True
+    before = primary.requests
+    result = await run_load(requests, args.concurrency)
+    emit("resilience", {"scenario": "outage"}, **result, upstream_calls=primary.requests - before,
+         breaker=resilience_stats()["breakers"][PRIMARY]["state"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="Normal fake OSRM latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="Fraction of slow calls in the tail scenario")
+    parser.add_argument("--tail-latency", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Fraction of 503s in the flaky scenario")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ["ROUTE_COALESCING_ENABLED"] = "false"
+    os.environ["OSRM_RETRY_BACKOFF"] = "0.01"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
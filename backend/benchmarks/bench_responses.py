@@ -0,0 +1,58 @@
+"""Response serialization benchmark: FastAPI's encoder vs ``FastJSONResponse``.
+
+Renders an ``AbstractedRoute`` of each ``--sizes`` point count the way FastAPI
+does for a ``response_model`` (``jsonable_encoder`` + ``JSONResponse``) and
+through ``app.core.responses.FastJSONResponse``, and reports latency, throughput
+and body size. Also reports what gzip (and brotli, when installed) adds and how
+many bytes it saves.
+
+    python -m benchmarks.bench_responses
+"""
+import argparse
+import os
+
+
+def run(args: argparse.Namespace) -> None:
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+    from app.core.compression import _Compressor, brotli
+    from app.core.config import get_settings
+    from app.core.responses import FastJSONResponse
+    from app.models.route import AbstractedRoute
+    from benchmarks.common import emit, measure, synthetic_route
+
+    settings = get_settings()
+    for size in args.sizes:
+        route = AbstractedRoute(route=synthetic_route(size, seed=size), distance=1000.0, duration=100.0)
+        renderers = {
+            "fastapi": lambda: JSONResponse(jsonable_encoder(route)).body,
+            "fast_json": lambda: FastJSONResponse(route).body,
+        }
+        assert renderers["fastapi"]() == renderers["fast_json"]()
+        for name, render in renderers.items():
+            timing = measure(render, repeat=args.repeat)
+            emit("responses", {"case": "render", "renderer": name, "points": size},
+                 bytes=len(render()), responses_per_s=round(1000 / timing["mean_ms"], 1), **timing)
+
+        body = renderers["fast_json"]()
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+        for encoding in encodings:
+            compress = lambda: _Compressor(encoding, settings.RESPONSE_GZIP_LEVEL,
+                                           settings.RESPONSE_BROTLI_QUALITY).compress(body, final=True)
+            emit("responses", {"case": "compress", "encoding": encoding, "points": size},
+                 bytes=len(body), compressed_bytes=len(compress()),
+                 ratio=round(len(body) / len(compress()), 2), **measure(compress, repeat=args.repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
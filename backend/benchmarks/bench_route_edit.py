@@ -0,0 +1,105 @@
+"""Waypoint edit benchmark: full recalculation vs per-leg incremental edits.
+
+Builds a ``--stops`` route, then applies ``--edits`` random single-waypoint
+edits (move, add or remove) the way a route editor does. Each edit is either
+recalculated as a whole new route or sent through ``RouteService.edit_route``,
+which only fetches the legs next to the edited waypoint. Reports the OSRM
+requests and route legs fetched per edit and the edit latency.
+
+    python -m benchmarks.bench_route_edit
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+
+def random_waypoint(rng: random.Random) -> Dict[str, Any]:
+    return {"coordinates": {"latitude": 37.70 + rng.random() * 0.1, "longitude": -122.50 + rng.random() * 0.1}}
+
+
+def random_edit(rng: random.Random, count: int) -> Dict[str, Any]:
+    op = rng.choice(["move", "move", "add", "remove"] if count > 3 else ["move", "add"])
+    if op == "add":
+        return {"op": op, "index": rng.randrange(count + 1), "waypoint": random_waypoint(rng)}
+    if op == "move":
+        return {"op": op, "index": rng.randrange(count), "waypoint": random_waypoint(rng)}
+    return {"op": op, "index": rng.randrange(count)}
+
+
+async def run_mode(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from app.models.route import RouteEditRequest, RouteRequest, Waypoint, WaypointEdit
+    from app.services.cache import get_route_cache
+    from app.services.osrm import init_osrm_client
+    from app.services.route_service import RouteService
+    from benchmarks.common import summarize
+    from benchmarks.fake_osrm import FakeOSRM
+
+    fake = FakeOSRM(points_per_leg=args.points_per_leg, latency=args.latency)
+    legs = 0
+
+    async def count_legs(request: httpx.Request) -> httpx.Response:
+        nonlocal legs
+        legs += request.url.path.count(";")
+        return await fake(request)
+
+    await init_osrm_client(httpx.MockTransport(count_legs))
+    get_route_cache().clear()
+
+    rng = random.Random(0)
+    waypoints = [Waypoint(**random_waypoint(rng)) for _ in range(args.stops)]
+    await RouteService.calculate_route(RouteRequest(waypoints=waypoints), per_leg=mode == "incremental")
+
+    requests_before, legs_before = fake.requests, legs
+    latencies: List[float] = []
+    for _ in range(args.edits):
+        edit = WaypointEdit(**random_edit(rng, len(waypoints)))
+        started = time.perf_counter()
+        if mode == "incremental":
+            waypoints = (await RouteService.edit_route(RouteEditRequest(waypoints=waypoints, edit=edit))).waypoints
+        else:
+            # The client applies the edit and resends the whole route
+            waypoints, _ = RouteService.apply_waypoint_edit(waypoints, edit)
+            await RouteService.calculate_route(RouteRequest(waypoints=waypoints), per_leg=False)
+        latencies.append(time.perf_counter() - started)
+
+    requests = fake.requests - requests_before
+    return {
+        "osrm_requests_per_edit": round(requests / args.edits, 2),
+        "legs_fetched_per_edit": round((legs - legs_before) / args.edits, 2),
+        **summarize(latencies),
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.core.config import get_settings
+    from app.services.osrm import close_osrm_client
+    from benchmarks.common import emit
+
+    settings = get_settings()
+    settings.OSRM_SERVER_URL, settings.OSRM_SERVER_URLS = "http://fake-osrm", []
+    settings.ROUTE_CACHE_ENABLED = True
+    for mode in ("full", "incremental"):
+        result = await run_mode(mode, args)
+        emit("route_edit", {"mode": mode, "stops": args.stops}, points_per_leg=args.points_per_leg, **result)
+    await close_osrm_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=30)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--points-per-leg", type=int, default=300, help="Geometry points per route leg")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds the fake OSRM server takes per request")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
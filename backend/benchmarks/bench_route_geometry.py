@@ -0,0 +1,89 @@
+"""Zoom-level geometry benchmark for ``GET /routes/{id}/geometry``.
+
+Saves ``--routes`` routes of ``--points`` points through the API, then fetches
+their geometry at several zoom levels and reports points, response size and
+latency per zoom, plus conditional requests answered with 304. Also reports
+what building the levels adds to a save.
+
+    python -m benchmarks.bench_route_geometry
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+    from app.core.config import get_settings
+    from app.main import app
+    from app.services import polyline
+    from app.services.pyramid import build_levels
+    from benchmarks.common import emit, measure, summarize, synthetic_route
+
+    settings = get_settings()
+    geometries = [synthetic_route(args.points, seed=seed) for seed in range(args.routes)]
+    emit("route_geometry", {"case": "build_levels", "points": args.points},
+         levels=len(settings.ROUTE_LOD_ZOOMS),
+         **measure(lambda: build_levels(geometries[0], settings.ROUTE_LOD_ZOOMS, settings.ROUTE_LOD_PIXEL_TOLERANCE)))
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            ids: List[str] = []
+            for i, latlon in enumerate(geometries):
+                response = await client.post("/api/v1/routes/", json={
+                    "title": f"route {i}", "description": "",
+                    "origin": {"latitude": latlon[0, 0], "longitude": latlon[0, 1]},
+                    "destination": {"latitude": latlon[-1, 0], "longitude": latlon[-1, 1]},
+                    "polyline": polyline.encode(latlon, 6), "polyline_precision": 6,
+                    "distance": 1000.0, "duration": 100.0,
+                })
+                response.raise_for_status()
+                ids.append(response.json()["id"])
+
+            rng = random.Random(0)
+            for zoom in [None, *args.zooms]:
+                params: Dict[str, Any] = {"geometry_format": args.geometry_format}
+                if zoom is not None:
+                    params["zoom"] = zoom
+                latencies, sizes, points = [], [], []
+                revalidations = []
+                for _ in range(args.requests):
+                    url = f"/api/v1/routes/{rng.choice(ids)}/geometry"
+                    started = time.perf_counter()
+                    response = await client.get(url, params=params)
+                    latencies.append(time.perf_counter() - started)
+                    sizes.append(len(response.content))
+                    points.append(response.json()["points"])
+
+                    started = time.perf_counter()
+                    revalidated = await client.get(url, params=params, headers={"If-None-Match": response.headers["ETag"]})
+                    revalidations.append(time.perf_counter() - started)
+                    assert revalidated.status_code == 304
+                emit("route_geometry", {"case": "fetch", "zoom": "full" if zoom is None else zoom,
+                                        "format": args.geometry_format, "points": args.points},
+                     mean_points=round(sum(points) / len(points), 1), mean_bytes=round(sum(sizes) / len(sizes)),
+                     **summarize(latencies),
+                     **{f"not_modified_{key}": value for key, value in summarize(revalidations).items()})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--points", type=int, default=5000, help="Points per saved route")
+    parser.add_argument("--zooms", type=int, nargs="+", default=[5, 8, 11, 14])
+    parser.add_argument("--requests", type=int, default=200, help="Fetches per zoom level")
+    parser.add_argument("--geometry-format", choices=["coordinates", "polyline6"], default="coordinates")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
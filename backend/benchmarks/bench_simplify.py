@@ -0,0 +1,54 @@
+"""Route abstraction benchmark.
+
+Measures how much the geometry simplification stage shrinks a route (point
+count and serialized AbstractedRoute size) and what it costs end to end,
+compared with returning the full OSRM geometry.
+
+    python -m benchmarks.bench_simplify
+"""
+import argparse
+
+from app.models.geometry import Geometry
+from app.models.route import AbstractedRoute, Coordinates, RouteRequest, Waypoint
+from app.services.route_service import RouteService
+from benchmarks.common import emit, measure, synthetic_route
+
+CASES = [
+    {"simplify_tolerance": None, "max_points": None},
+    {"simplify_tolerance": 1.0, "max_points": None},
+    {"simplify_tolerance": 5.0, "max_points": None},
+    {"simplify_tolerance": 20.0, "max_points": None},
+    {"simplify_tolerance": None, "max_points": 500},
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--methods", nargs="+", default=["douglas-peucker", "visvalingam"])
+    args = parser.parse_args()
+
+    endpoints = [Waypoint(coordinates=Coordinates(latitude=0, longitude=0))] * 2
+    for n in args.sizes:
+        route = Geometry(synthetic_route(n))
+        for method in args.methods:
+            for case in CASES:
+                request = RouteRequest(waypoints=endpoints, simplify_method=method, **case)
+
+                def respond() -> bytes:
+                    simplified = RouteService.simplify_route(route, request)
+                    return AbstractedRoute(route=simplified, distance=0, duration=0).model_dump_json().encode()
+
+                payload = respond()
+                emit(
+                    "simplify",
+                    {"input_points": n, "method": method, **case},
+                    output_points=len(RouteService.simplify_route(route, request)),
+                    payload_bytes=len(payload),
+                    **measure(respond, repeat=args.repeat),
+                )
+
+
+if __name__ == "__main__":
+    main()
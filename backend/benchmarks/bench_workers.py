@@ -0,0 +1,101 @@
+"""Multi-worker route cache benchmark: per-worker vs shared cache, cold vs warmed start.
+
+Simulates ``--workers`` worker processes, each with its own ``RouteCache``,
+serving route lookups spread round-robin over them. Lookups are skewed towards
+popular routes. A miss costs ``--latency`` seconds of fake OSRM time.
+Reports upstream calls and lookup latency in two setups. In the first, each
+worker has only its memory tier. In the second, the workers share a SQLite tier
+in one file, the way ``app.serve`` runs them.
+
+A freshly restarted worker is then measured twice, once starting cold and once
+after ``RouteCache.warm`` has loaded the ``--warm-up`` most used routes.
+
+    python -m benchmarks.bench_workers
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def lookup_stream(args: argparse.Namespace) -> List[int]:
+    """Route indexes requested, Zipf-like: route ``i`` is requested in proportion to 1 / (i + 1)."""
+    rng = random.Random(0)
+    weights = [1 / (i + 1) for i in range(args.pairs)]
+    return rng.choices(range(args.pairs), weights=weights, k=args.requests)
+
+
+async def serve(caches: List[Any], stream: List[int], payloads: List[Dict[str, Any]], latency: float) -> Dict[str, Any]:
+    from benchmarks.common import summarize
+
+    upstream = 0
+    latencies = []
+    for n, index in enumerate(stream):
+        cache = caches[n % len(caches)]
+        key = f"osrm:driving:pair{index}"
+        started = time.perf_counter()
+        if await cache.get(key) is None:
+            upstream += 1
+            await asyncio.sleep(latency)
+            await cache.set(key, payloads[index])
+        latencies.append(time.perf_counter() - started)
+    return {"upstream_calls": upstream, **summarize(latencies)}
+
+
+async def run(args: argparse.Namespace, tmp: str) -> None:
+    from app.services.cache import RouteCache
+    from benchmarks.common import emit, synthetic_route
+
+    payloads = [
+        {"route": synthetic_route(args.points, seed=i).tolist(), "distance": 1000.0, "duration": 100.0}
+        for i in range(args.pairs)
+    ]
+    stream = lookup_stream(args)
+    path = os.path.join(tmp, "route_cache.db")
+
+    def make_cache(shared: bool) -> RouteCache:
+        return RouteCache(max_bytes=256 * 1024 * 1024, ttl=3600, precision=5, persistent_path=path if shared else None)
+
+    for shared in (False, True):
+        caches = [make_cache(shared) for _ in range(args.workers)]
+        result = await serve(caches, stream, payloads, args.latency)
+        for cache in caches:
+            await cache.flush_hits()
+            cache.close()
+        emit("workers", {"case": "serve", "cache": "shared" if shared else "per_worker", "workers": args.workers},
+             requests=args.requests, **result)
+
+    # A worker restarted with the shared file populated by the run above
+    first = stream[:args.first_requests]
+    for warm_up in (0, args.warm_up):
+        cache = make_cache(shared=True)
+        started = time.perf_counter()
+        warmed = await cache.warm(warm_up)
+        warm_up_ms = (time.perf_counter() - started) * 1000
+        result = await serve([cache], first, payloads, args.latency)
+        emit("workers", {"case": "restart", "warm_up": warm_up},
+             warmed=warmed, warm_up_ms=round(warm_up_ms, 2), memory_hits=cache.hits, **result)
+        cache.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pairs", type=int, default=500, help="Distinct routes requested")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=500, help="Geometry points per cached route")
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds a fake OSRM call takes")
+    parser.add_argument("--warm-up", type=int, default=100, help="Cached routes loaded by the warmed restart")
+    parser.add_argument("--first-requests", type=int, default=500, help="Requests measured after a restart")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
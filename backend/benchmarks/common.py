@@ -0,0 +1,66 @@
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark prints one JSON object per measured case so results can be
+collected and compared across commits.
+"""
+from typing import Any, Callable, Dict, List
+import json
+import math
+import statistics
+import sys
+import time
+
+import numpy as np
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``samples`` (``q`` in 0-100)."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "runs": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Time ``fn`` ``repeat`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def case_id(benchmark: str, case: Dict[str, Any]) -> str:
+    """Stable identifier of a measured case, used to match results across runs."""
+    return "/".join([benchmark, *(f"{key}={value}" for key, value in case.items())])
+
+
+def emit(benchmark: str, case: Dict[str, Any], **metrics: Any) -> None:
+    """Print one machine-readable result line."""
+    line = {"benchmark": benchmark, "id": case_id(benchmark, case), **case, **metrics}
+    print(json.dumps(line), file=sys.stdout, flush=True)
+
+
+def synthetic_route(n_points: int, seed: int = 0) -> np.ndarray:
+    """A road-like (lat, lon) polyline: long smooth curves with small jitter, OSRM precision."""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, n_points)
+    heading = np.cumsum(rng.normal(0.0, 0.05, n_points))
+    step = 0.5 / max(n_points, 1)
+    lat = 37.7 + np.cumsum(np.cos(heading)) * step
+    lon = -122.4 + np.cumsum(np.sin(heading)) * step + 0.02 * np.sin(8 * np.pi * t)
+    return np.round(np.column_stack((lat, lon)), 6)
@@ -0,0 +1,61 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+Matches results by their ``id`` and prints the change in throughput and latency
+percentiles. Changes worse than ``--threshold`` are marked as regressions;
+with ``--fail-on-regression`` the exit status is 1 if there are any.
+
+Timing noise between runs on a shared machine is often 5-10%, so compare runs
+from the same machine and treat small changes with suspicion.
+
+    python -m benchmarks.compare benchmarks/results/abc1234.jsonl benchmarks/results/def5678.jsonl
+"""
+from typing import Dict, List
+import argparse
+import json
+import sys
+
+# Metric name -> whether a higher value is better
+METRICS = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return {record["id"]: record for record in map(json.loads, f) if "id" in record}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    regressions: List[str] = []
+    for case in sorted(base.keys() & new.keys()):
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            before, after = base[case].get(metric), new[case].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = " REGRESSION" if worse > args.threshold else ""
+            if flag:
+                regressions.append(f"{case} {metric}")
+            changes.append(f"{metric} {before:g} -> {after:g} ({change:+.1%}){flag}")
+        if changes:
+            print(f"{case}: " + ", ".join(changes))
+
+    for label, missing in (("only in base", base.keys() - new.keys()), ("only in new", new.keys() - base.keys())):
+        for case in sorted(missing):
+            print(f"{case}: {label}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""In-process fake OSRM server for benchmarks.
+
+Answers ``/route`` and ``/table`` requests with synthetic but well-formed
+responses of configurable size and latency, without any network access.
+Failures can be injected to exercise retries, circuit breaking and hedging.
+
+It can also run as a real HTTP server, so a deployed or locally started API can
+be pointed at it with ``OSRM_SERVER_URL``:
+
+    python -m benchmarks.fake_osrm --port 5001 --points-per-leg 500 --latency 0.02
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import math
+
+import httpx
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+class FakeOSRM:
+    """Callable httpx handler emulating the OSRM HTTP API.
+
+    ``points_per_leg`` controls the geometry size of route responses and
+    ``latency`` (seconds) is awaited before every response. A ``tail_rate``
+    fraction of requests takes ``tail_latency`` instead, an ``error_rate``
+    fraction answers 503, and ``down`` makes every request fail to connect.
+    With ``capacity``, at most that many requests are served at once (like
+    OSRM's worker threads) and the rest queue.
+    """
+
+    def __init__(
+        self,
+        points_per_leg: int = 200,
+        latency: float = 0.0,
+        speed: float = 13.9,
+        error_rate: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 1.0,
+        down: bool = False,
+        capacity: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.points_per_leg = points_per_leg
+        self.latency = latency
+        self.speed = speed  # meters per second used to derive durations
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.down = down
+        self.requests = 0
+        self._slots = asyncio.Semaphore(capacity) if capacity else None
+        self._rng = np.random.default_rng(seed)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.down:
+            raise httpx.ConnectError("Connection refused", request=request)
+        if self._slots is None:
+            return await self._respond(request)
+        async with self._slots:
+            return await self._respond(request)
+
+    async def _respond(self, request: httpx.Request) -> httpx.Response:
+        latency = self.tail_latency if self.tail_rate and self._rng.random() < self.tail_rate else self.latency
+        if latency:
+            await asyncio.sleep(latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return httpx.Response(503, text="Service Unavailable")
+
+        parts = request.url.path.strip("/").split("/")
+        service, coordinates = parts[0], parts[-1]
+        points = [tuple(map(float, c.split(","))) for c in coordinates.split(";")]
+        if service == "route":
+            return httpx.Response(200, json=self._route(points))
+        if service == "table":
+            return httpx.Response(200, json=self._table(points, request.url.params))
+        if service == "nearest":
+            return httpx.Response(200, json={"code": "Ok", "waypoints": [{"location": list(points[0]), "name": ""}]})
+        return httpx.Response(400, json={"code": "InvalidService", "message": f"Unknown service {service}"})
+
+    def _route(self, points: List[Tuple[float, float]]) -> dict:
+        geometry = []
+        legs = []
+        for a, b in zip(points, points[1:]):
+            t = np.linspace(0.0, 1.0, self.points_per_leg, endpoint=False)
+            wiggle = 0.0005 * np.sin(t * 6 * np.pi)
+            lon = a[0] + (b[0] - a[0]) * t + wiggle
+            lat = a[1] + (b[1] - a[1]) * t
+            geometry.extend(np.round(np.column_stack((lon, lat)), 6).tolist())
+            distance = _haversine(a, b) * 1.3
+            legs.append({"distance": distance, "duration": distance / self.speed, "steps": [], "summary": ""})
+        geometry.append([round(points[-1][0], 6), round(points[-1][1], 6)])
+        distance = sum(leg["distance"] for leg in legs)
+        return {
+            "code": "Ok",
+            "routes": [{
+                "geometry": {"type": "LineString", "coordinates": geometry},
+                "legs": legs,
+                "distance": distance,
+                "duration": distance / self.speed,
+                "weight": distance / self.speed,
+                "weight_name": "routability",
+            }],
+            "waypoints": [{"location": list(p), "name": ""} for p in points],
+        }
+
+    def _table(self, points: List[Tuple[float, float]], params: httpx.QueryParams) -> dict:
+        def indices(name: str) -> List[int]:
+            value = params.get(name)
+            if not value or value == "all":
+                return list(range(len(points)))
+            return [int(i) for i in value.split(";")]
+
+        sources, destinations = indices("sources"), indices("destinations")
+        distances = [[_haversine(points[i], points[j]) * 1.3 for j in destinations] for i in sources]
+        return {
+            "code": "Ok",
+            "distances": distances,
+            "durations": [[d / self.speed for d in row] for row in distances],
+        }
+
+
+def multi_host_transport(servers: Dict[str, FakeOSRM]) -> httpx.MockTransport:
+    """One transport serving several fake OSRM servers, chosen by request host."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return await servers[request.url.host](request)
+
+    return httpx.MockTransport(handler)
+
+
+def asgi_app(fake: FakeOSRM) -> Callable:
+    """Serve a fake OSRM server as an ASGI application."""
+
+    async def app(scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        query = scope["query_string"].decode("latin-1")
+        request = httpx.Request(scope["method"], f"http://fake-osrm{scope['path']}?{query}")
+        try:
+            response = await fake(request)
+        except httpx.ConnectError:
+            # A running server can't refuse its own connections; answer like a dead backend behind a proxy
+            response = httpx.Response(502, text="Bad Gateway")
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(b"content-type", response.headers.get("content-type", "text/plain").encode())],
+        })
+        await send({"type": "http.response.body", "body": response.content})
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--points-per-leg", type=int, default=200, help="Geometry points per route leg")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before every response")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Share of responses delayed by --tail-latency")
+    parser.add_argument("--tail-latency", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--capacity", type=int, default=None, help="Requests served at once; the rest queue")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    fake = FakeOSRM(
+        points_per_leg=args.points_per_leg, latency=args.latency, error_rate=args.error_rate,
+        tail_rate=args.tail_rate, tail_latency=args.tail_latency, capacity=args.capacity, seed=args.seed,
+    )
+    uvicorn.run(asgi_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
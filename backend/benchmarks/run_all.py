@@ -0,0 +1,86 @@
+"""Run the benchmark suite and save the results for comparison across commits.
+
+Each benchmark runs in its own process (settings are read at import time) with
+the arguments of the chosen profile. Every result line is tagged with the git
+commit and written to ``--output``, by default
+``benchmarks/results/<commit>.jsonl``. Compare two runs with
+``python -m benchmarks.compare``.
+
+    python -m benchmarks.run_all                  # quick profile, every benchmark
+    python -m benchmarks.run_all --profile full   # the benchmarks' own defaults
+    python -m benchmarks.run_all --only load models
+"""
+from typing import Dict, List
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Arguments per benchmark for the quick profile; the full profile uses none
+QUICK: Dict[str, List[str]] = {
+    "load": ["--requests", "200"],
+    "models": ["--sizes", "100", "2000", "--repeat", "50"],
+    "geometry": ["--sizes", "1000", "10000", "--repeat", "10"],
+    "simplify": ["--sizes", "1000", "10000", "--repeat", "5"],
+    "db_concurrency": ["--calculations", "10", "--seed-routes", "50"],
+    "list_routes": ["--rows", "100000", "--repeat", "10"],
+    "local_routing": ["--grid", "100", "--repeat", "10"],
+    "resilience": ["--requests", "300"],
+    "osrm_balancing": ["--requests", "500"],
+    "logging": [],
+    "chunked_storage": ["--routes", "100", "--reads", "50"],
+    "route_edit": ["--edits", "50"],
+    "route_geometry": ["--routes", "10", "--requests", "50"],
+    "responses": ["--sizes", "1000", "10000", "--repeat", "10"],
+    "workers": ["--requests", "2000", "--pairs", "300"],
+}
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_commit() -> str:
+    """Short commit hash, with ``-dirty`` when the tree has uncommitted changes."""
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=BENCHMARK_DIR, capture_output=True, text=True).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return f"{commit}-dirty" if git("status", "--porcelain", "--untracked-files=no") else commit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=["quick", "full"], default="quick")
+    parser.add_argument("--only", nargs="+", choices=list(QUICK), help="Benchmarks to run (default: all)")
+    parser.add_argument("--output", help="JSONL file to write (default: benchmarks/results/<commit>.jsonl)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output = args.output or os.path.join(BENCHMARK_DIR, "results", f"{commit}.jsonl")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    failed = []
+    with open(output, "w") as out:
+        for name in args.only or QUICK:
+            extra = QUICK[name] if args.profile == "quick" else []
+            command = [sys.executable, "-m", f"benchmarks.bench_{name}", *extra]
+            print(f"# {' '.join(command[1:])}", file=sys.stderr, flush=True)
+            started = time.perf_counter()
+            result = subprocess.run(command, cwd=os.path.dirname(BENCHMARK_DIR), capture_output=True, text=True)
+            for line in result.stdout.splitlines():
+                if line.startswith("{"):
+                    record = {**json.loads(line), "commit": commit}
+                    out.write(json.dumps(record) + "\n")
+                    print(line, flush=True)
+            if result.returncode != 0:
+                failed.append(name)
+                print(result.stderr[-2000:], file=sys.stderr)
+            print(f"# {name}: {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+
+    print(f"# results written to {output}", file=sys.stderr)
+    if failed:
+        sys.exit(f"benchmarks failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
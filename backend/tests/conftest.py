@@ -0,0 +1,34 @@
+"""Shared fixtures: the app on a throwaway SQLite database, talking to an in-process fake OSRM."""
+import os
+import tempfile
+
+# Settings are read once at import, so point them at a scratch database first
+_tmp = tempfile.mkdtemp(prefix="routing-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+import pytest
+from app.main import app
+from app.services.cache import get_route_cache
+from app.services.osrm import init_osrm_client
+from benchmarks.fake_osrm import FakeOSRM
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fake_osrm():
+    return FakeOSRM(points_per_leg=50)
+
+
+@pytest.fixture
+async def client(fake_osrm):
+    async with app.router.lifespan_context(app):
+        await init_osrm_client(fake_osrm.transport())
+        get_route_cache().clear()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
@@ -0,0 +1,26 @@
+import pytest
+from app.db import models
+
+pytestmark = pytest.mark.anyio
+
+ROUTE = {
+    "title": "shared", "description": "",
+    "origin": {"latitude": 37.0, "longitude": -122.0},
+    "destination": {"latitude": 37.5, "longitude": -121.5},
+    "waypoints": [],
+    "route": [{"latitude": 37.0 + i * 0.0005, "longitude": -122.0 + i * 0.0005} for i in range(1000)],
+    "distance": 70000.0, "duration": 3600.0,
+}
+
+
+async def test_route_keeps_chunks_shared_with_a_deleted_route(client, monkeypatch):
+    monkeypatch.setattr(models.settings, "ROUTE_STORAGE_FORMAT", "chunked")
+    first = (await client.post("/api/v1/routes/", json=ROUTE)).json()["id"]
+    second = (await client.post("/api/v1/routes/", json=ROUTE)).json()["id"]
+    assert (await client.delete(f"/api/v1/routes/{first}")).status_code == 200
+
+    storage = (await client.get("/api/v1/routes/storage")).json()
+    assert storage["routes"]["chunked"] == 1
+    assert storage["chunks"]["unique_points"] == storage["chunks"]["referenced_points"] > 0
+    route = (await client.get(f"/api/v1/routes/{second}")).json()
+    assert route["route"] == ROUTE["route"]
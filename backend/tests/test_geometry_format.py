@@ -0,0 +1,51 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+ROUTE = {
+    "title": "test", "description": "",
+    "origin": {"latitude": 37.77, "longitude": -122.44},
+    "destination": {"latitude": 37.78, "longitude": -122.43},
+    "waypoints": [],
+    "route": [{"latitude": 37.77, "longitude": -122.44}, {"latitude": 37.78, "longitude": -122.43}],
+    "distance": 1500.0, "duration": 120.0,
+}
+WAYPOINTS = [
+    {"coordinates": {"latitude": 37.77, "longitude": -122.44}},
+    {"coordinates": {"latitude": 37.78, "longitude": -122.43}},
+]
+POLYLINE = {"Accept": "application/json; geometry=polyline6"}
+
+
+def varies_on_accept(response) -> bool:
+    return "accept" in [value.strip().lower() for value in response.headers.get("vary", "").split(",")]
+
+
+async def test_accept_selects_polyline(client):
+    response = await client.post("/api/v1/route/calculate/", json={"waypoints": WAYPOINTS}, headers=POLYLINE)
+    assert response.status_code == 200
+    assert response.json()["polyline"]
+    assert varies_on_accept(response)
+
+
+async def test_responses_that_depend_on_accept_vary_on_it(client):
+    saved = await client.post("/api/v1/routes/", json=ROUTE)
+    route_id = saved.json()["id"]
+    responses = [
+        saved,
+        await client.post("/api/v1/route/calculate/", json={"waypoints": WAYPOINTS}),
+        await client.get("/api/v1/routes/", params={"include_geometry": True}),
+        await client.get(f"/api/v1/routes/{route_id}", headers=POLYLINE),
+        await client.get("/api/v1/routes/export"),
+        await client.get(f"/api/v1/routes/{route_id}/geometry", params={"zoom": 5}),
+    ]
+    for response in responses:
+        assert response.status_code == 200, response.request.url
+        assert varies_on_accept(response), response.request.url
+
+    geometry = responses[-1]
+    not_modified = await client.get(
+        f"/api/v1/routes/{route_id}/geometry", params={"zoom": 5}, headers={"If-None-Match": geometry.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert varies_on_accept(not_modified)
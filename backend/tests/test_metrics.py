@@ -0,0 +1,14 @@
+import os
+import pytest
+from app.core import metrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_profiled_request_writes_folded_stacks(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics.settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(metrics.settings, "PROFILE_DIR", str(tmp_path))
+    response = await client.get("/api/v1/routes/", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert os.path.exists(tmp_path / f"{profile_id}.folded")
@@ -0,0 +1,44 @@
+import httpx
+import pytest
+from app.services.osrm import OSRMClient, _attempt
+from app.services.resilience import CircuitBreaker
+
+pytestmark = pytest.mark.anyio
+
+
+def half_open_client(handler) -> OSRMClient:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return OSRMClient("http://osrm", transport=httpx.MockTransport(handler), breaker=breaker)
+
+
+async def test_undecodable_response_counts_as_failure():
+    def handler(request):
+        raise httpx.DecodingError("bad gzip", request=request)
+
+    client = half_open_client(handler)
+    with pytest.raises(httpx.DecodingError):
+        await _attempt(client, "/route", None)
+    assert client.breaker.opened == 2
+
+
+async def test_unexpected_error_gives_back_the_trial_slot():
+    def handler(request):
+        raise RuntimeError("bug")
+
+    client = half_open_client(handler)
+    with pytest.raises(RuntimeError):
+        await _attempt(client, "/route", None)
+    # The next call may still be the trial instead of being rejected forever
+    assert client.breaker.allow()
+
+
+async def test_failed_call_is_timed():
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = OSRMClient("http://osrm", transport=httpx.MockTransport(handler))
+    with pytest.raises(httpx.ReadTimeout):
+        await _attempt(client, "/route", None)
+    assert len(client.latency) == 1
@@ -0,0 +1,25 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+WAYPOINTS = [
+    {"coordinates": {"latitude": 37.70 + i * 0.01, "longitude": -122.40 + i * 0.01}} for i in range(5)
+]
+
+
+async def test_cold_multi_waypoint_calculate_makes_one_upstream_call(client, fake_osrm):
+    response = await client.post("/api/v1/route/calculate/", json={"waypoints": WAYPOINTS})
+    assert response.status_code == 200
+    assert fake_osrm.requests == 1
+
+
+async def test_edit_fetches_legs_then_reuses_them(client, fake_osrm):
+    edit = {"op": "move", "index": 2, "waypoint": {"coordinates": {"latitude": 37.725, "longitude": -122.38}}}
+    first = await client.post("/api/v1/route/calculate/edit/", json={"waypoints": WAYPOINTS, "edit": edit})
+    assert first.status_code == 200
+    assert fake_osrm.requests == len(WAYPOINTS) - 1
+
+    edit = {"op": "move", "index": 2, "waypoint": {"coordinates": {"latitude": 37.726, "longitude": -122.38}}}
+    second = await client.post("/api/v1/route/calculate/edit/", json={"waypoints": first.json()["waypoints"], "edit": edit})
+    assert second.status_code == 200
+    assert fake_osrm.requests == len(WAYPOINTS) - 1 + 2
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.db import models
+from benchmarks.common import synthetic_route
+
+pytestmark = pytest.mark.anyio
+
+POINTS = synthetic_route(50_000)
+ROUTE = {
+    "title": "long", "description": "",
+    "origin": {"latitude": POINTS[0][0], "longitude": POINTS[0][1]},
+    "destination": {"latitude": POINTS[-1][0], "longitude": POINTS[-1][1]},
+    "waypoints": [],
+    "route": [{"latitude": lat, "longitude": lon} for lat, lon in POINTS.tolist()],
+    "distance": 150000.0, "duration": 7200.0,
+}
+# Extra time the levels take to build, well above a list request's latency
+BUILD_DELAY = 0.5
+
+
+async def test_saving_a_long_route_does_not_block_other_requests(client, monkeypatch):
+    started = threading.Event()
+    build_started = None
+    build_levels = models.build_levels
+
+    def slow_build_levels(*args):
+        nonlocal build_started
+        build_started = time.monotonic()
+        started.set()
+        time.sleep(BUILD_DELAY)
+        return build_levels(*args)
+
+    monkeypatch.setattr(models, "build_levels", slow_build_levels)
+
+    async def list_during_save() -> float:
+        await asyncio.to_thread(started.wait, 10)
+        response = await client.get("/api/v1/routes/")
+        assert response.status_code == 200
+        return time.monotonic()
+
+    saved, listed_at = await asyncio.gather(client.post("/api/v1/routes/", json=ROUTE), list_during_save())
+    assert saved.status_code == 200
+    assert saved.json()["route"][-1] == ROUTE["route"][-1]
+    # Answered while the levels were still being built, not queued behind them
+    assert listed_at - build_started < BUILD_DELAY / 2
@@ -0,0 +1,46 @@
+import json
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db import schema
+
+pytestmark = pytest.mark.anyio
+
+# The routes table as created before bounding boxes (and later columns) existed
+LEGACY_ROUTES = """
+CREATE TABLE routes (
+    id VARCHAR(36) PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR,
+    origin JSON NOT NULL, destination JSON NOT NULL, waypoints JSON NOT NULL,
+    route JSON NOT NULL, distance FLOAT NOT NULL, duration FLOAT NOT NULL, created_at DATETIME
+)
+"""
+
+
+async def insert_legacy_route(conn, route_id, points):
+    point = json.dumps({"latitude": 37.77, "longitude": -122.44})
+    await conn.execute(text(
+        "INSERT INTO routes (id, title, origin, destination, waypoints, route, distance, duration) "
+        "VALUES (:id, 't', :point, :point, '[]', :route, 1.0, 1.0)"
+    ), {"id": route_id, "point": point, "route": json.dumps(points)})
+
+
+async def test_route_bounds_are_backfilled_once(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp_path, 'legacy.db')}")
+    async with engine.begin() as conn:
+        await conn.execute(text(LEGACY_ROUTES))
+        await insert_legacy_route(conn, "a", [{"latitude": 37.77, "longitude": -122.44}, {"latitude": 37.78, "longitude": -122.42}])
+        await insert_legacy_route(conn, "empty", [])
+
+    backfills = []
+    monkeypatch.setitem(schema.COLUMN_BACKFILLS, ("routes", "min_lat"),
+                        lambda conn: backfills.append(schema.backfill_route_bounds(conn)))
+    await schema.init_db(engine)
+    async with engine.connect() as conn:
+        rows = dict((await conn.execute(text("SELECT id, max_lon FROM routes"))).all())
+    assert rows == {"a": pytest.approx(-122.42), "empty": None}
+
+    # The empty route keeps NULL bounds without being rescanned on every start
+    await schema.init_db(engine)
+    assert len(backfills) == 1
+    await engine.dispose()
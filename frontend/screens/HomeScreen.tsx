@@ -36,7 +36,7 @@ interface SavedRoute {
   description: string;
   origin: Coordinates;
   destination: Coordinates;
-  route: Coordinates[];
+  route?: Coordinates[];
   distance: number;
   duration: number;
   created_at: string;